@@ -3,14 +3,96 @@ from __future__ import annotations
 import json
 import os
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 import boto3
-import urllib.request
-import urllib.error
 from botocore.exceptions import ClientError
+import metrics
+import corridors
+from fetcher import FETCH_ERRORS, fetch_json, load_latency_history, save_latency_history, start_budget
+from change_feed import coalesce_changes, is_stream_event, item_data
+from history_store import HISTORY_FIELDS, append_day, extract_series
+from raw_store import get_latest_item, query_snapshots
+from run_tracker import claim_aggregation, get_run_timeline, pending_modules, record_completion, summarize_timeline
 
+MODULES = [
+    'fuel', 'freight', 'traffic', 'weather', 'border-wait-times',
+    'economic-data', 'air-traffic', 'ais-data', 'global-events', 'global-event-counts'
+]
+
+# Sections whose change percentages are computed against the previous day
+PREVIOUS_DAY_MODULES = ['fuel', 'freight']
+
+# Modules copied into the brief unchanged, under these keys
+PASSTHROUGH_SECTIONS = {
+    'border-wait-times': 'border_wait_times',
+    'economic-data': 'economic_data',
+    'air-traffic': 'air_traffic',
+    'ais-data': 'ais_data',
+    'global-events': 'global_events',
+    'global-event-counts': 'global_event_counts',
+}
+
+LIST_MODULES = [
+    'border-wait-times', 'economic-data', 'air-traffic',
+    'ais-data', 'global-events', 'alerts', 'forecasts'
+]
+
+# Brief sections that carry a news list alongside their data
+NEWS_SECTIONS = ['fuel', 'freight', 'traffic', 'weather']
+
+# Items joined per corridor: view key -> (brief section, list key within it or None, fields kept)
+CORRIDOR_ITEMS = {
+    'traffic': ('traffic', 'alerts', ['id', 'location', 'reason', 'severity']),
+    'weather': ('weather', 'forecasts', ['corridor', 'condition', 'severity']),
+    'border': ('border_wait_times', None, ['crossing_id', 'name', 'commercial_wait', 'status']),
+    'ports': ('ais_data', None, ['port_code', 'port_name', 'congestion_level']),
+    'hubs': ('air_traffic', 'major_hubs', ['code', 'name', 'status']),
+}
+
+MAX_UPDATE_ATTEMPTS = 3
+
+@metrics.instrumented('aggregator')
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    start_budget(context)
     session = boto3.Session()
+    
+    # Raw-table stream batches only rebuild the sections whose modules changed
+    if is_stream_event(event):
+        updated = run_incremental(session, event)
+        return {'statusCode': 200, 'body': json.dumps({'updated': updated})}
+    
+    raw_table = session.resource('dynamodb').Table(os.environ['RAW_DATA_TABLE'])
+    today = datetime.utcnow().strftime('%Y-%m-%d')
+    started_at = datetime.utcnow()
+    
+    # The last ingestor to finish claims the run before invoking us ('barrier'); the
+    # scheduled 'deadline' trigger only aggregates if nobody has claimed the day yet
+    if (event or {}).get('trigger') == 'deadline':
+        pending = pending_modules(raw_table, today)
+        if not claim_aggregation(raw_table, today, 'deadline'):
+            return {'statusCode': 200, 'body': json.dumps('Brief already aggregated')}
+        if pending:
+            metrics.count('ModulesMissing', len(pending))
+            print(f"Aggregation deadline reached without: {', '.join(pending)}")
+    
+    run_aggregation(session)
+    record_completion(raw_table, today, 'aggregator', 'ok', started_at)
+    report_timeline(raw_table, today)
+    return {'statusCode': 200, 'body': json.dumps('Brief aggregated')}
+
+def report_timeline(raw_table: Any, date: str) -> None:
+    summary = summarize_timeline(get_run_timeline(raw_table, date))
+    for name, value in summary.items():
+        metrics.put(''.join(part.title() for part in name[:-3].split('_')), value, 'Milliseconds')
+    if summary:
+        print(f"Run timeline for {date}: {json.dumps(summary)}")
+
+def run_aggregation(session: Any, fresh: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Builds, stores and publishes today's brief. Modules present in `fresh` are used
+    as-is (the orchestrator passes what it just fetched); the rest are read from the raw table.
+    """
+    fresh = fresh or {}
     dynamodb = session.resource('dynamodb')
     s3 = session.client('s3')
     ssm = session.client('ssm')
@@ -21,31 +103,235 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     today = datetime.utcnow().strftime('%Y-%m-%d')
     yesterday = (datetime.utcnow() - timedelta(days=1)).strftime('%Y-%m-%d')
     
-    # Fetch raw data for existing and new modules
-    fuel = get_module_data(raw_table, today, 'fuel')
-    freight = get_module_data(raw_table, today, 'freight')
-    traffic = get_module_data(raw_table, today, 'traffic')
-    weather = get_module_data(raw_table, today, 'weather')
+    load_latency_history(raw_table)
+    # Taken before the reads: a raw write landing while the brief is built is newer than
+    # aggregated_at, so run_incremental() still applies it
+    read_started = datetime.utcnow().isoformat()
+    with metrics.timer('ReadTime'):
+        # Fetch raw data for existing and new modules
+        modules = {
+            module: fresh[module] if module in fresh else get_module_data(raw_table, today, module)
+            for module in MODULES
+        }
+
+        # Get yesterday's data for changes
+        previous = {module: get_module_data(raw_table, yesterday, module) for module in PREVIOUS_DAY_MODULES}
     
-    border_wait_times = get_module_data(raw_table, today, 'border-wait-times')
-    economic_data = get_module_data(raw_table, today, 'economic-data')
-    air_traffic = get_module_data(raw_table, today, 'air-traffic')
-    ais_data = get_module_data(raw_table, today, 'ais-data')
-    global_events = get_module_data(raw_table, today, 'global-events')
+    sections = {module: build_section(module, modules[module], previous.get(module, {})) for module in MODULES}
+    brief = assemble_brief(today, sections)
+    
+    # Generate AI insight
+    with metrics.timer('InsightTime'):
+        brief['ai_insight'] = generate_ai_insight(ssm, brief)
+    
+    with metrics.timer('StorageTime'):
+        # Store in DynamoDB as JSON string. aggregated_at marks which raw writes the
+        # brief already reflects; later writes are applied by run_incremental()
+        briefs_table.put_item(Item={
+            'date': today,
+            'brief': json.dumps(brief),
+            'timestamp': datetime.utcnow().isoformat(),
+            'aggregated_at': read_started
+        })
+        
+        # Store in S3 for dashboard
+        publish_brief(s3, data_bucket, today, brief, sections)
+    
+    with metrics.timer('HistoryTime'):
+        archive_history(s3, data_bucket, today, modules)
+    
+    save_latency_history(raw_table)
+    return brief
 
-    # Get yesterday's data for changes
-    fuel_prev = get_module_data(raw_table, yesterday, 'fuel')
-    freight_prev = get_module_data(raw_table, yesterday, 'freight')
+def run_incremental(session: Any, event: Dict[str, Any]) -> List[str]:
+    """
+    Applies a batch of raw-table changes to already published briefs. Only the sections
+    of changed modules are rebuilt; the AI insight is kept from the last full aggregation.
+    """
+    dynamodb = session.resource('dynamodb')
+    raw_table = dynamodb.Table(os.environ['RAW_DATA_TABLE'])
+    briefs_table = dynamodb.Table(os.environ['BRIEFS_TABLE'])
+    s3 = session.client('s3')
     
-    # Compute changes
+    changes_by_date: Dict[str, Dict[str, Any]] = {}
+    for (date, module), item in coalesce_changes(event).items():
+        if module in MODULES:
+            changes_by_date.setdefault(date, {})[module] = item
+    
+    updated = []
+    for date, changes in sorted(changes_by_date.items()):
+        updated += apply_changes(raw_table, briefs_table, s3, os.environ['DATA_BUCKET'], date, changes)
+    return updated
+
+def apply_changes(raw_table: Any, briefs_table: Any, s3: Any, data_bucket: str,
+                  date: str, changes: Dict[str, Any]) -> List[str]:
+    previous: Dict[str, Any] = {}
+    if any(module in PREVIOUS_DAY_MODULES for module in changes):
+        yesterday = (datetime.strptime(date, '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
+        previous = {module: get_module_data(raw_table, yesterday, module)
+                    for module in PREVIOUS_DAY_MODULES if module in changes}
+    
+    for _ in range(MAX_UPDATE_ATTEMPTS):
+        item = briefs_table.get_item(Key={'date': date}).get('Item')
+        if not item:
+            # Nothing published yet; the full aggregation will pick these changes up
+            metrics.count('ChangesSkipped', len(changes))
+            return []
+        
+        brief = json.loads(item['brief']) if isinstance(item['brief'], str) else item['brief']
+        versions = dict(item.get('section_versions') or {})
+        aggregated_at = item.get('aggregated_at', item.get('timestamp', ''))
+        stale = {
+            module: change for module, change in changes.items()
+            if change.get('timestamp', '') > max(aggregated_at, versions.get(module, ''))
+        }
+        metrics.count('ChangesSkipped', len(changes) - len(stale))
+        if not stale:
+            return []
+        
+        sections = {}
+        for module, change in stale.items():
+            sections[module] = build_section(module, item_data(change, module_default(module)), previous.get(module, {}))
+            brief.update(sections[module])
+            versions[module] = change.get('timestamp', '')
+        brief['entity_links'] = link_entities(brief)
+        brief['corridors'] = link_corridors(brief)
+        
+        now = datetime.utcnow().isoformat()
+        brief['updated_at'] = now
+        try:
+            # The read timestamp doubles as a version: a concurrent full or incremental
+            # write changes it and this update is retried against the new brief
+            briefs_table.update_item(
+                Key={'date': date},
+                UpdateExpression='SET brief = :brief, #ts = :now, section_versions = :versions',
+                ConditionExpression='#ts = :read_ts',
+                ExpressionAttributeNames={'#ts': 'timestamp'},
+                ExpressionAttributeValues={
+                    ':brief': json.dumps(brief),
+                    ':now': now,
+                    ':versions': versions,
+                    ':read_ts': item.get('timestamp', '')
+                }
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                metrics.count('UpdateConflicts')
+                continue
+            print(f"Error updating brief for {date}: {e}")
+            return []
+        
+        with metrics.timer('StorageTime'):
+            publish_brief(s3, data_bucket, date, brief, sections)
+        metrics.count('SectionsRecomputed', len(sections))
+        print(f"Updated {', '.join(sorted(sections))} in the {date} brief")
+        return sorted(sections)
+    
+    print(f"Gave up updating the {date} brief after {MAX_UPDATE_ATTEMPTS} conflicting writes")
+    return []
+
+def archive_history(s3: Any, data_bucket: str, date: str, modules: Dict[str, Any]) -> None:
+    """ Appends today's numeric fields to each module's columnar history partition. """
+    for module in HISTORY_FIELDS:
+        try:
+            append_day(s3, data_bucket, module, date, extract_series(module, modules.get(module)))
+        except (ClientError, ValueError) as e:
+            print(f"Error archiving {module} history for {date}: {e}")
+
+def publish_brief(s3: Any, data_bucket: str, date: str, brief: Dict[str, Any], sections: Dict[str, Any]) -> None:
+    """ Writes the dashboard document plus one fragment per rebuilt section (fragments/<date>/<module>.json). """
+    s3.put_object(
+        Bucket=data_bucket,
+        Key=f'{date}.json',
+        Body=json.dumps(brief),
+        ContentType='application/json'
+    )
+    for module, section in sections.items():
+        s3.put_object(
+            Bucket=data_bucket,
+            Key=f'fragments/{date}/{module}.json',
+            Body=json.dumps(section),
+            ContentType='application/json'
+        )
+
+def assemble_brief(today: str, sections: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    brief: Dict[str, Any] = {'date': today}
+    for module in MODULES:
+        brief.update(sections[module])
+    brief['entity_links'] = link_entities(brief)
+    brief['corridors'] = link_corridors(brief)
+    return brief
+
+def link_entities(brief: Dict[str, Any]) -> Dict[str, List[str]]:
+    """
+    Maps gazetteer entity ids (port:USSAV, crossing:otay-mesa, ...) to the titles of the
+    events and news items tagged with them, so other sections join on their own keys.
+    """
+    items = list(brief.get('global_events') or [])
+    for section in NEWS_SECTIONS:
+        items += (brief.get(section) or {}).get('news', [])
+    
+    links: Dict[str, List[str]] = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        for entity_id in item.get('entities', []):
+            titles = links.setdefault(entity_id, [])
+            if item.get('title') and item['title'] not in titles:
+                titles.append(item['title'])
+    return links
+
+def link_corridors(brief: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Per-corridor view: every interstate and state with traffic alerts, forecasts, border
+    crossings, ports or hubs on it, so one entry can read 'I-10 TX: storm and closure'.
+    """
+    items_by_kind = {}
+    for kind, (section, key, _) in CORRIDOR_ITEMS.items():
+        data = brief.get(section) or ({} if key else [])
+        items = data.get(key, []) if key and isinstance(data, dict) else data
+        items_by_kind[kind] = items if isinstance(items, list) else []
+    
+    view = corridors.join(items_by_kind)
+    for entry in view:
+        for kind, (_, _, fields) in CORRIDOR_ITEMS.items():
+            entry[kind] = [{field: item[field] for field in fields if field in item} for item in entry[kind]]
+    return view
+
+def build_section(module: str, data: Any, previous: Dict[str, Any]) -> Dict[str, Any]:
+    """ Returns the brief keys derived from a single module, so a changed module can be rebuilt on its own. """
+    if module in PASSTHROUGH_SECTIONS:
+        return {PASSTHROUGH_SECTIONS[module]: data}
+    if module == 'fuel':
+        return build_fuel_section(data, previous)
+    if module == 'freight':
+        return build_freight_section(data, previous)
+    if module == 'traffic':
+        return {
+            'traffic': {'alerts': data.get('alerts', []), 'news': data.get('news', [])},
+            'traffic_score': calc_traffic_score(data.get('alerts', []))
+        }
+    if module == 'weather':
+        return {
+            'weather': {'forecasts': data.get('forecasts', []), 'news': data.get('news', [])},
+            'weather_score': calc_weather_score(data.get('forecasts', [])),
+            'disruption_risk': data.get('disruption_risk', {'level': 'LOW', 'reason': 'No data'})
+        }
+    return {}
+
+def build_fuel_section(fuel: Dict[str, Any], fuel_prev: Dict[str, Any]) -> Dict[str, Any]:
     fuel_data = {
         'national_avg': fuel.get('national_avg', 0),
         'national_change': calc_change(fuel.get('national_avg'), fuel_prev.get('national_avg')),
         'diesel': fuel.get('diesel', 0),
         'diesel_change': calc_change(fuel.get('diesel'), fuel_prev.get('diesel')),
+        'regions': fuel.get('regions', {}),
+        'as_of': fuel.get('as_of'),
         'news': fuel.get('news', [])
     }
-    
+    return {'fuel': fuel_data, 'fuel_score': calc_fuel_score(fuel_data)}
+
+def build_freight_section(freight: Dict[str, Any], freight_prev: Dict[str, Any]) -> Dict[str, Any]:
     freight_data = {
         'dry_van': freight.get('dry_van', 0),
         'dry_van_change': calc_change(freight.get('dry_van'), freight_prev.get('dry_van')),
@@ -55,63 +341,24 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         'flatbed_change': calc_change(freight.get('flatbed'), freight_prev.get('flatbed')),
         'news': freight.get('news', [])
     }
-    
-    brief = {
-        'date': today,
-        'fuel': fuel_data,
-        'fuel_score': calc_fuel_score(fuel_data),
-        'freight': freight_data,
-        'freight_score': calc_freight_score(freight_data),
-        'traffic': {'alerts': traffic.get('alerts', []), 'news': traffic.get('news', [])},
-        'traffic_score': calc_traffic_score(traffic.get('alerts', [])),
-        'weather': {'forecasts': weather.get('forecasts', []), 'news': weather.get('news', [])},
-        'weather_score': calc_weather_score(weather.get('forecasts', [])),
-        'disruption_risk': weather.get('disruption_risk', {'level': 'LOW', 'reason': 'No data'}),
-        # Add new data to the brief
-        'border_wait_times': border_wait_times,
-        'economic_data': economic_data,
-        'air_traffic': air_traffic,
-        'ais_data': ais_data,
-        'global_events': global_events,
-    }
-    
-    # Generate AI insight
-    brief['ai_insight'] = generate_ai_insight(ssm, brief)
-    
-    # Store in DynamoDB as JSON string
-    briefs_table.put_item(Item={
-        'date': today,
-        'brief': json.dumps(brief),
-        'timestamp': datetime.utcnow().isoformat()
-    })
-    
-    # Store in S3 for dashboard
-    s3.put_object(
-        Bucket=data_bucket,
-        Key=f'{today}.json',
-        Body=json.dumps(brief),
-        ContentType='application/json'
-    )
-    
-    return {'statusCode': 200, 'body': json.dumps('Brief aggregated')}
+    return {'freight': freight_data, 'freight_score': calc_freight_score(freight_data)}
+
+def module_default(module: str) -> Dict[str, Any] | list:
+    # New modules are list-based, original ones are dict-based.
+    return [] if module in LIST_MODULES else {}
 
 def get_module_data(raw_table: Any, date: str, module: str) -> Dict[str, Any] | list:
     """
-    Fetches data for a specific module and date from the raw_data table.
+    Fetches the latest data for a specific module and date from the raw_data table.
     Returns a dict or a list, with a sensible empty default.
     """
-    # New modules are list-based, original ones are dict-based.
-    is_list_based = module in [
-        'border-wait-times', 'economic-data', 'air-traffic', 
-        'ais-data', 'global-events', 'alerts', 'forecasts'
-    ]
-    default_return = [] if is_list_based else {}
+    default_return = module_default(module)
 
     try:
-        response = raw_table.get_item(Key={'date': date, 'module': module})
-        item = response.get('Item')
+        item = get_latest_item(raw_table, date, module)
 
         if not item or 'data' not in item:
+            metrics.count('MissingModules', Source=module)
             print(f"No data found for {module} on {date}")
             return default_return
 
@@ -129,6 +376,11 @@ def get_module_data(raw_table: Any, date: str, module: str) -> Dict[str, Any] |
         print(f"Error fetching {module} data for {date}: {e}")
         return default_return
 
+def get_module_snapshots(raw_table: Any, date: str, module: str,
+                         start: Optional[str] = None, end: Optional[str] = None) -> List[Dict[str, Any]]:
+    """ Intraday history for a module: [{'bucket': 'HH:MM', 'timestamp': ..., 'data': ...}], oldest first. """
+    return query_snapshots(raw_table, date, module, start, end)
+
 def calc_change(current: Optional[float], previous: Optional[float]) -> float:
     if current is None or previous is None or previous == 0:
         return 0
@@ -212,7 +464,7 @@ Extended Context:
 Highlight the most critical, cross-functional insight. What is the single most important takeaway from this combined data? Be concise and actionable."""
 
     try:
-        req = urllib.request.Request(
+        result = fetch_json(
             'https://api.openai.com/v1/chat/completions',
             data=json.dumps({
                 'model': 'gpt-4o-mini',
@@ -223,12 +475,12 @@ Highlight the most critical, cross-functional insight. What is the single most i
             headers={
                 'Authorization': f'Bearer {api_key}',
                 'Content-Type': 'application/json'
-            }
+            },
+            timeout=30,
+            # Completions are billed and not idempotent: one attempt, then the templated insight
+            attempts=1
         )
-        
-        with urllib.request.urlopen(req, timeout=30) as response:
-            result = json.loads(response.read())
-            return result['choices'][0]['message']['content'].strip()
-    except (urllib.error.URLError, json.JSONDecodeError, KeyError) as e:
+        return result['choices'][0]['message']['content'].strip()
+    except FETCH_ERRORS + (json.JSONDecodeError, KeyError) as e:
         print(f"OpenAI API error: {e}")
         return f"Market conditions show diesel at ${brief.get('fuel', {}).get('diesel', 0):.2f} with freight rates averaging ${brief.get('freight', {}).get('dry_van', 0):.2f}/mile. Monitor conditions and plan accordingly."
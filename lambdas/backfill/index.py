@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import argparse
+import contextvars
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, Callable, List, Tuple
+import boto3
+import metrics
+import eia
+import fred
+from fetcher import FETCH_ERRORS, start_budget
+from history_store import append_rows, column_name
+
+SOURCES = ['eia', 'fred']
+# National retail series; regional history is filled by the daily fuel runs
+EIA_BACKFILL_AREAS = ['NUS']
+
+Rows = Dict[str, Dict[str, float]]
+
+@metrics.instrumented('backfill')
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """ Event: {"start": "2022-01-01", "end": "2024-01-01", "sources": ["eia", "fred"]}; end defaults to today. """
+    start_budget(context)
+    event = event or {}
+    summary = run_backfill(
+        boto3.Session().client('s3'),
+        os.environ['DATA_BUCKET'],
+        event['start'],
+        event.get('end') or datetime.utcnow().strftime('%Y-%m-%d'),
+        event.get('sources') or SOURCES
+    )
+    return {'statusCode': 200, 'body': json.dumps(summary)}
+
+def run_backfill(s3: Any, data_bucket: str, start: str, end: str,
+                 sources: List[str] = SOURCES, workers: int = 8) -> Dict[str, int]:
+    """
+    Pulls whole date ranges per series in bulk (EIA offset pages, FRED observation ranges),
+    concurrently across series, then writes each module's rows to the history store with
+    one read/write per yearly partition. Returns the number of days written per module.
+    """
+    jobs: Dict[str, Tuple[str, Callable[[], Rows]]] = {}
+
+    if 'eia' in sources:
+        eia_key = os.environ.get('EIA_API_KEY')
+        if eia_key:
+            jobs['eia'] = ('fuel', lambda: backfill_eia(eia_key, start, end))
+        else:
+            print("EIA_API_KEY not set; skipping EIA backfill")
+
+    if 'fred' in sources:
+        fred_key = fred.get_api_key()
+        for indicator in fred.INDICATORS if fred_key else []:
+            jobs[f"fred:{indicator['series']}"] = (
+                'economic-data', lambda indicator=indicator: backfill_fred(fred_key, indicator, start, end)
+            )
+
+    rows: Dict[str, Rows] = {}
+    try:
+        if jobs:
+            with ThreadPoolExecutor(max_workers=min(workers, len(jobs)), thread_name_prefix='backfill') as executor:
+                futures = {
+                    name: (module, executor.submit(contextvars.copy_context().run, job))
+                    for name, (module, job) in jobs.items()
+                }
+                for name, (module, future) in futures.items():
+                    try:
+                        series_rows = future.result()
+                    except FETCH_ERRORS + (ValueError, KeyError) as e:
+                        metrics.count('BackfillErrors', Source=name)
+                        print(f"Backfill of {name} failed: {e}")
+                        continue
+                    metrics.count('BackfillRows', len(series_rows), Source=name)
+                    for day, values in series_rows.items():
+                        rows.setdefault(module, {}).setdefault(day, {}).update(values)
+    finally:
+        # Series that succeeded are written even if another one fails unexpectedly
+        with metrics.timer('StorageTime'):
+            for module, module_rows in rows.items():
+                append_rows(s3, data_bucket, module, module_rows)
+
+    return {module: len(module_rows) for module, module_rows in rows.items()}
+
+def backfill_eia(api_key: str, start: str, end: str) -> Rows:
+    rows: Rows = {}
+    fetched = eia.fetch_rows(api_key, list(eia.PRODUCTS), EIA_BACKFILL_AREAS, start, end)
+    for (period, _, product), value in eia.parse_rows(fetched).items():
+        if product in eia.PRODUCTS:
+            rows.setdefault(period, {})[column_name(eia.PRODUCTS[product])] = value
+    return rows
+
+def backfill_fred(api_key: str, indicator: Dict[str, str], start: str, end: str) -> Rows:
+    column = column_name(indicator['name'], 'value')
+    observations = fred.fetch_observations(api_key, indicator['series'], start, end)
+    return {observation['date']: {column: observation['value']} for observation in observations}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Backfill the history archive from EIA and FRED')
+    parser.add_argument('--start', required=True, help='first date, YYYY-MM-DD')
+    parser.add_argument('--end', default=datetime.utcnow().strftime('%Y-%m-%d'), help='last date, YYYY-MM-DD')
+    parser.add_argument('--sources', nargs='+', choices=SOURCES, default=SOURCES)
+    parser.add_argument('--bucket', default=os.environ.get('DATA_BUCKET'), help='data bucket (default $DATA_BUCKET)')
+    args = parser.parse_args()
+
+    metrics.configure('backfill')
+    started = datetime.utcnow()
+    written = run_backfill(boto3.client('s3'), args.bucket, args.start, args.end, args.sources)
+    metrics.flush()
+    print(json.dumps({'written': written, 'seconds': round((datetime.utcnow() - started).total_seconds(), 1)}))
@@ -0,0 +1,36 @@
+""" Benchmarks point-to-corridor assignment, with and without numpy. """
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'layer', 'python'))
+
+from corridors import INDEX, MAX_DISTANCE_KM, nearest_segments, np  # noqa: E402
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark point-to-corridor assignment')
+    parser.add_argument('--points', type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    points = [(rng.uniform(25, 49), rng.uniform(-124, -67)) for _ in range(args.points)]
+    segments = len(INDEX['ax'])
+
+    runs = [('pure python', False)] + ([('numpy', True)] if np is not None else [])
+    results = {}
+    for name, vectorized in runs:
+        started = time.perf_counter()
+        results[name] = nearest_segments(points, vectorized=vectorized)
+        seconds = time.perf_counter() - started
+        print(f"{name}: {len(points)} points x {segments} segments in {seconds:.2f}s "
+              f"({len(points) / seconds:,.0f} points/s)")
+    if np is None:
+        print('numpy not installed; vectorized path skipped')
+    else:
+        assert [[m['corridor'] for m in r] for r in results['numpy']] == [[m['corridor'] for m in r] for r in results['pure python']]
+    matched = sum(1 for matches in results['pure python'] if matches)
+    print(f"{matched / len(points):.0%} of random US points lie within {MAX_DISTANCE_KM:.0f} km of a corridor")
@@ -0,0 +1,74 @@
+""" Benchmarks LSH title clustering against the all-pairs reference. """
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Dict, List, Sequence
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'layer', 'python'))
+
+from dedup import THRESHOLD, cluster_titles, jaccard, normalize_title, shingles  # noqa: E402
+
+def _pairwise_clusters(titles: Sequence[str], threshold: float = THRESHOLD) -> List[List[int]]:
+    """ Reference O(n^2) clustering over every pair, as the benchmark baseline. """
+    shingle_sets = [shingles(normalize_title(title)) for title in titles]
+    parent = list(range(len(titles)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            i = parent[i]
+        return i
+
+    for i in range(len(titles)):
+        for j in range(i):
+            if jaccard(shingle_sets[i], shingle_sets[j]) >= threshold:
+                parent[find(i)] = find(j)
+
+    clusters: Dict[int, List[int]] = {}
+    for i in range(len(titles)):
+        clusters.setdefault(find(i), []).append(i)
+    return list(clusters.values())
+
+def synthetic_titles(count: int, copies: int = 5, seed: int = 7) -> List[str]:
+    """ `count` headlines: stories syndicated `copies` times with bylines, case and small edits. """
+    rng = random.Random(seed)
+    words = ['port', 'strike', 'freight', 'rates', 'diesel', 'border', 'delays', 'rail', 'union', 'cargo',
+             'shipping', 'tariff', 'container', 'backlog', 'trucking', 'sanctions', 'canal', 'drought',
+             'warehouse', 'capacity', 'carriers', 'imports', 'exports', 'surge', 'slump', 'talks', 'deal']
+    outlets = ['Reuters', 'AP News', 'Bloomberg', 'FreightWaves', 'CNBC', 'Journal of Commerce']
+    titles = []
+    for _ in range(count // copies):
+        story = [rng.choice(words) for _ in range(rng.randint(6, 11))]
+        for copy in range(copies):
+            variant = list(story)
+            if copy % 2:
+                variant[rng.randrange(len(variant))] = rng.choice(words)
+            title = ' '.join(variant).capitalize() if copy % 3 else ' '.join(variant).title()
+            titles.append(f'{title} - {rng.choice(outlets)}' if copy else title)
+    rng.shuffle(titles)
+    return titles
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark near-duplicate title clustering')
+    parser.add_argument('--titles', type=int, default=10000)
+    parser.add_argument('--pairwise', type=int, default=2000, help='titles used for the O(n^2) reference')
+    args = parser.parse_args()
+
+    titles = synthetic_titles(args.titles)
+    started = time.perf_counter()
+    clusters = cluster_titles(titles)
+    seconds = time.perf_counter() - started
+    print(f"minhash/lsh: {len(titles)} titles -> {len(clusters)} clusters in {seconds:.2f}s")
+
+    sample = titles[:args.pairwise]
+    started = time.perf_counter()
+    reference = _pairwise_clusters(sample)
+    reference_seconds = time.perf_counter() - started
+    lsh = cluster_titles(sample)
+    agree = {tuple(c) for c in lsh} == {tuple(c) for c in reference}
+    estimate = reference_seconds * (len(titles) / len(sample)) ** 2
+    print(f"pairwise:    {len(sample)} titles -> {len(reference)} clusters in {reference_seconds:.2f}s "
+          f"(~{estimate:.0f}s at {len(titles)}); lsh finds {len(lsh)}{', identical' if agree else ''}")
@@ -0,0 +1,72 @@
+""" Benchmarks streaming aggregation of a GDELT export zip against extracting it in memory. """
+from __future__ import annotations
+
+import argparse
+import io
+import os
+import sys
+import time
+import tracemalloc
+import zipfile
+from typing import Any, Dict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'layer', 'python'))
+
+from gdelt_export import EXPORTS, aggregate_lines, iter_zip_lines  # noqa: E402
+
+def synthetic_export(rows: int) -> bytes:
+    """ A zipped event export of `rows` rows with realistic widths, for benchmarking without a capture. """
+    codes = ['010', '042', '143', '1431', '163', '190', '191', '036', '172', '0874']
+    places = [('US', 'USCA'), ('US', 'USTX'), ('CH', 'CH30'), ('UK', 'UKH9'), ('MX', 'MX19'), ('NL', 'NL07')]
+    buffer = io.StringIO()
+    for i in range(rows):
+        fields = [str(1000000000 + i), '20240101', '202401', '2024', '2024.0027'] + ['USA', 'UNITED STATES'] + [''] * 18
+        fields += ['1', codes[i % len(codes)], codes[i % len(codes)][:3], codes[i % len(codes)][:2], '3', '-5.0', '4', '1', '4', '-3.2']
+        fields += ['3', 'Los Angeles, California, United States', 'US', 'USCA', 'CA037', '34.05', '-118.24', '1662328'] * 2
+        country, adm1 = places[i % len(places)]
+        fields += ['3', 'Somewhere', country, adm1, '', '34.05', '-118.24', '1662328', '20240101000000']
+        fields.append(f'https://news.example.com/{i}/a-long-story-slug-about-logistics-and-trade')
+        buffer.write('\t'.join(fields) + '\n')
+
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('20240101000000.export.CSV', buffer.getvalue())
+    return archive.getvalue()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark streaming aggregation of a GDELT export zip')
+    parser.add_argument('path', nargs='?', help='captured export zip (default: a synthetic events export)')
+    parser.add_argument('--kind', choices=list(EXPORTS), default='events')
+    parser.add_argument('--rows', type=int, default=200000, help='rows in the synthetic export')
+    args = parser.parse_args()
+
+    if args.path:
+        with open(args.path, 'rb') as f:
+            data = f.read()
+    else:
+        data = synthetic_export(args.rows)
+
+    def in_memory() -> Dict[str, Any]:
+        # Baseline: extract the whole member, then aggregate its rows
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            text = zf.read(zf.namelist()[0])
+        return aggregate_lines([line for line in text.split(b'\n') if line], args.kind)
+
+    def streaming() -> Dict[str, Any]:
+        return aggregate_lines(iter_zip_lines(io.BytesIO(data)), args.kind)
+
+    results = {}
+    for name, run in (('in-memory', in_memory), ('streaming', streaming)):
+        started = time.perf_counter()
+        summary = run()
+        seconds = time.perf_counter() - started
+        # Peak memory from a second, traced pass so tracing does not skew the timing
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results[name] = summary
+        print(f"{name}: {seconds:.2f}s, {summary['rows_scanned'] / seconds:,.0f} rows/s, peak {peak / 1e6:.1f} MB")
+
+    assert results['in-memory']['regions'] == results['streaming']['regions']
+    print(f"{summary['rows_scanned']} rows, {summary['rows_matched']} matched, {len(data) / 1e6:.1f} MB zipped")
@@ -0,0 +1,58 @@
+""" Benchmarks the compiled keyword classifier against per-term substring tests. """
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Dict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'layer', 'python'))
+
+from keywords import IMPACT_LEXICON, IMPACT_TERMS, LEVELS, classify, compile_terms  # noqa: E402
+
+def _substring_level(title: str, terms: Dict[str, str]) -> str:
+    """ The previous approach, one `in` test per word per title, kept as the benchmark baseline. """
+    title_lower = title.lower()
+    for level in LEVELS[:-1]:
+        if any(term in title_lower for term, term_level in terms.items() if term_level == level):
+            return level
+    return 'LOW'
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the compiled keyword classifier')
+    parser.add_argument('--titles', type=int, default=100000)
+    parser.add_argument('--vocabulary', type=int, default=500, help='terms in the large-vocabulary run')
+    args = parser.parse_args()
+
+    # Mostly routine headlines, as in a GDELT or RSS feed; about one in five carries an impact term
+    rng = random.Random(11)
+    filler = ['port', 'rates', 'freight', 'carriers', 'rail', 'lane', 'cargo', 'trucks', 'ocean', 'air',
+              'warehouse', 'award', 'imports', 'volumes', 'spot', 'contract', 'union', 'talks', 'season',
+              'outlook', 'demand', 'quarter', 'earnings', 'capacity', 'market', 'shippers', 'growth']
+    titles = []
+    for _ in range(args.titles):
+        words = [rng.choice(filler) for _ in range(rng.randint(6, 12))]
+        if rng.random() < 0.2:
+            words[rng.randrange(len(words))] = rng.choice(list(IMPACT_TERMS))
+        titles.append(' '.join(words).capitalize())
+
+    large = dict(IMPACT_TERMS)
+    while len(large) < args.vocabulary:
+        large[''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(4, 10)))] = 'MEDIUM'
+    large_lexicon = compile_terms(large)
+
+    for name, terms, lexicon in (('impact terms', IMPACT_TERMS, IMPACT_LEXICON), (f'{len(large)} terms', large, large_lexicon)):
+        started = time.perf_counter()
+        baseline = [_substring_level(title, terms) for title in titles]
+        baseline_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        compiled = [classify(title, lexicon)['impact_level'] for title in titles]
+        compiled_seconds = time.perf_counter() - started
+
+        # Substring matching also fires inside longer words ('war' in 'warehouse'), so levels can differ
+        differ = sum(1 for a, b in zip(baseline, compiled) if a != b)
+        print(f"{name}: substring {len(titles) / baseline_seconds:,.0f} titles/s, "
+              f"compiled {len(titles) / compiled_seconds:,.0f} titles/s, {differ} levels differ")
@@ -0,0 +1,92 @@
+""" Benchmarks road-reference extraction over traffic headlines. """
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from typing import Any, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'layer', 'python'))
+
+from roads import extract  # noqa: E402
+
+# One pattern per field, searched separately: the obvious alternative to the single scan, for the benchmark
+_FIELD_PATTERNS = [
+    re.compile(r'\b(?:I|IH|Interstate)[\s-]*(\d{1,3})\b'),
+    re.compile(r'\b(?:US|U\.S\.)(?:\s*(?:Highway|Hwy|Route|Rte))?[\s-]*(\d{1,3})\b'),
+    re.compile(r'\b(?:SR|State\s+(?:Route|Highway|Hwy)|Hwy|Highway|(?!NB|SB|EB|WB)[A-Z]{2}(?=-))[\s-]*(\d{1,3})\b'),
+    re.compile(r'\b(?:MP|M\.P\.|[Mm]ile\s*(?:[Pp]ost|[Mm]arker)|[Mm]ilepost|MM)\s*(\d{1,3}(?:\.\d+)?)\b'),
+    re.compile(r'\b(?:([Nn]orth|[Ss]outh|[Ee]ast|[Ww]est)(?:bound)|([NSEW])/?B)\b'),
+]
+
+def _per_field(headline: str) -> List[Any]:
+    return [pattern.search(headline) for pattern in _FIELD_PATTERNS]
+
+def _split_location(headline: str) -> Optional[str]:
+    """ The previous chained-split parsing, kept as the benchmark baseline. """
+    for prefix in ('I-', 'US-', 'SR-'):
+        if prefix in headline:
+            parts = headline.split(prefix)[1].split()[0:2]
+            return f"{prefix}{' '.join(parts)}"
+    return None
+
+def synthetic_headlines(count: int, seed: int = 5) -> List[str]:
+    """ Headlines in the shapes the 511 feeds use, for benchmarking without a capture. """
+    rng = random.Random(seed)
+    routes = ['I-{}', 'I {}', 'Interstate {}', 'IH-{}', 'US-{}', 'US {}', 'US Highway {}', 'SR-{}', 'SR {}',
+              'State Route {}', 'CA-{}', 'Hwy {}']
+    directions = ['Northbound', 'southbound', 'EB', 'W/B', 'North', 'West', '']
+    shapes = [
+        'Crash on {route} {direction} at {street}',
+        '{direction} {route} closed between exits {a} and {b}',
+        'Roadwork on {route} {direction} near MP {mp}',
+        'Disabled vehicle {route} {direction} at mile marker {mp}',
+        '{route} {direction}: lane closure at {street} for emergency repairs',
+        'Jackknifed tractor-trailer blocking lanes on {street} near {route}',
+        'Special event traffic expected downtown near {street}',
+    ]
+    streets = ['7th St', 'Main St', 'Market St', 'Broadway', 'Route 1 Connector', 'Airport Blvd', 'Exit 23']
+    headlines = []
+    for _ in range(count):
+        route = rng.choice(routes).format(rng.choice([5, 8, 10, 15, 17, 50, 80, 84, 87, 95, 99, 101, 280, 880]))
+        headlines.append(rng.choice(shapes).format(
+            route=route, direction=rng.choice(directions), street=rng.choice(streets),
+            a=rng.randint(1, 90), b=rng.randint(91, 200), mp=round(rng.uniform(0, 400), rng.choice([0, 1]))
+        ).replace('  ', ' '))
+    return headlines
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark road-reference extraction over traffic headlines')
+    parser.add_argument('path', nargs='?', help='captured headlines, one per line (default: synthetic)')
+    parser.add_argument('--headlines', type=int, default=200000, help='synthetic headlines to generate')
+    args = parser.parse_args()
+
+    if args.path:
+        with open(args.path) as f:
+            headlines = [line.strip() for line in f if line.strip()]
+    else:
+        headlines = synthetic_headlines(args.headlines)
+
+    started = time.perf_counter()
+    baseline = [_split_location(headline) for headline in headlines]
+    baseline_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for headline in headlines:
+        _per_field(headline)
+    per_field_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    refs = [extract(headline) for headline in headlines]
+    compiled_seconds = time.perf_counter() - started
+
+    # The split chain does almost no work, but only sees hyphenated I-/US-/SR- routes
+    share = lambda found: f"{sum(1 for value in found if value) / len(headlines):.0%}"
+    print(f"split:     {len(headlines) / baseline_seconds:,.0f} headlines/s, route found in {share(baseline)}")
+    print(f"per-field: {len(headlines) / per_field_seconds:,.0f} headlines/s")
+    print(f"compiled:  {len(headlines) / compiled_seconds:,.0f} headlines/s, "
+          f"route found in {share(ref['road'] for ref in refs)}, direction in {share(ref['direction'] for ref in refs)}, "
+          f"milepost in {share(ref['milepost'] is not None for ref in refs)}")
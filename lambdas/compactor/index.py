@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Any, List
+import boto3
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+import metrics
+from raw_store import DAILY_BUCKET, SNAPSHOT_SEPARATOR, is_snapshot_key, snapshot_key
+from state_store import STATE_PARTITION
+
+ARCHIVE_PREFIX = 'archive/raw'
+TTL_ATTRIBUTE = 'expires_at'
+# Snapshots are only needed until they are rolled up and archived; latest pointers,
+# daily summaries and run markers stay around for day-over-day comparisons
+SNAPSHOT_RETENTION_DAYS = int(os.environ.get('SNAPSHOT_RETENTION_DAYS', '3'))
+RAW_RETENTION_DAYS = int(os.environ.get('RAW_RETENTION_DAYS', '35'))
+
+@metrics.instrumented('compactor')
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    session = boto3.Session()
+    table = session.resource('dynamodb').Table(os.environ['RAW_DATA_TABLE'])
+    date = (event or {}).get('date') or (datetime.utcnow() - timedelta(days=1)).strftime('%Y-%m-%d')
+
+    summary = compact_day(table, session.client('s3'), os.environ['DATA_BUCKET'], date)
+    return {'statusCode': 200, 'body': json.dumps(summary)}
+
+def compact_day(table: Any, s3: Any, data_bucket: str, date: str) -> Dict[str, Any]:
+    """
+    Rolls a finished day's snapshots into <module>#daily items, archives every raw item
+    for the day to S3 and only then gives the items a TTL, so nothing expires unarchived.
+    A day already archived is not archived or rolled up again: a rerun after its snapshots
+    expired would overwrite both with partial data. It only gets its missing TTLs.
+    """
+    if date == STATE_PARTITION:
+        return {}
+
+    archive_key = f'{ARCHIVE_PREFIX}/{date}.jsonl.gz'
+    try:
+        s3.head_object(Bucket=data_bucket, Key=archive_key)
+        already_archived = True
+    except ClientError as e:
+        if e.response['Error']['Code'] not in ('404', 'NoSuchKey', 'NotFound'):
+            print(f"Error checking the {date} archive: {e}")
+            return {'date': date, 'archived': False}
+        already_archived = False
+
+    with metrics.timer('ReadTime'):
+        items = query_partition(table, date)
+    if not items:
+        return {'date': date, 'items': 0, 'archived': already_archived}
+
+    snapshots: Dict[str, List[Any]] = {}
+    if already_archived:
+        print(f"{date} already archived; only setting missing TTLs")
+    else:
+        with metrics.timer('ArchiveTime'):
+            body = gzip.compress('\n'.join(json.dumps(item, default=str) for item in items).encode())
+            try:
+                s3.put_object(
+                    Bucket=data_bucket,
+                    Key=archive_key,
+                    Body=body,
+                    ContentType='application/x-ndjson',
+                    ContentEncoding='gzip'
+                )
+            except ClientError as e:
+                print(f"Error archiving raw items for {date}: {e}")
+                return {'date': date, 'items': len(items), 'archived': False}
+        metrics.add_bytes('ArchiveBytes', len(body))
+
+        for item in items:
+            module = item['module']
+            if is_snapshot_key(module) and not _is_daily(module):
+                snapshots.setdefault(module.split(SNAPSHOT_SEPARATOR, 1)[0], []).append(_data(item))
+
+    now = int(time.time())
+    snapshot_expiry = now + SNAPSHOT_RETENTION_DAYS * 86400
+    raw_expiry = now + RAW_RETENTION_DAYS * 86400
+
+    with metrics.timer('StorageTime'):
+        with table.batch_writer() as batch:
+            for module, values in snapshots.items():
+                batch.put_item(Item={
+                    'date': date,
+                    'module': snapshot_key(module, DAILY_BUCKET),
+                    'data': json.dumps(rollup(values)),
+                    'snapshots': len(values),
+                    'timestamp': datetime.utcnow().isoformat(),
+                    TTL_ATTRIBUTE: raw_expiry
+                })
+        # Only the TTL attribute is written, and never over one already set: a full put
+        # would double the write cost and replay every item onto the raw-table stream
+        for item in items:
+            module = item['module']
+            if TTL_ATTRIBUTE in item or _is_daily(module):
+                continue
+            expire_item(table, date, module, snapshot_expiry if is_snapshot_key(module) else raw_expiry)
+
+    if already_archived:
+        return {'date': date, 'items': len(items), 'archived': True, 'skipped': True}
+    metrics.count('ItemsArchived', len(items))
+    metrics.count('SnapshotsRolledUp', sum(len(values) for values in snapshots.values()))
+    return {'date': date, 'items': len(items), 'archived': True, 'rolled_up': sorted(snapshots)}
+
+def expire_item(table: Any, date: str, module: str, expiry: int) -> None:
+    try:
+        table.update_item(
+            Key={'date': date, 'module': module},
+            UpdateExpression='SET #ttl = :expiry',
+            ConditionExpression='attribute_exists(#m) AND attribute_not_exists(#ttl)',
+            ExpressionAttributeNames={'#ttl': TTL_ATTRIBUTE, '#m': 'module'},
+            ExpressionAttributeValues={':expiry': expiry}
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            print(f"Error setting TTL on {date} {module}: {e}")
+
+def query_partition(table: Any, date: str) -> List[Dict[str, Any]]:
+    items: List[Dict[str, Any]] = []
+    kwargs: Dict[str, Any] = {'KeyConditionExpression': Key('date').eq(date)}
+    while True:
+        response = table.query(**kwargs)
+        items.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return items
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def rollup(values: List[Any]) -> Any:
+    """
+    Merges a day of snapshots (oldest first) into one value: numbers become
+    {'min', 'max', 'mean', 'last'}, lists become their de-duplicated union, dicts are
+    merged key by key and anything else keeps its last value.
+    """
+    present = [value for value in values if value is not None]
+    if not present:
+        return None
+
+    if all(_is_number(value) for value in present):
+        return {
+            'min': min(present),
+            'max': max(present),
+            'mean': round(sum(present) / len(present), 4),
+            'last': present[-1]
+        }
+
+    if all(isinstance(value, list) for value in present):
+        seen = set()
+        union = []
+        for value in present:
+            for entry in value:
+                fingerprint = json.dumps(entry, sort_keys=True, default=str)
+                if fingerprint not in seen:
+                    seen.add(fingerprint)
+                    union.append(entry)
+        return union
+
+    if all(isinstance(value, dict) for value in present):
+        keys: List[str] = []
+        for value in present:
+            keys.extend(key for key in value if key not in keys)
+        return {key: rollup([value.get(key) for value in present]) for key in keys}
+
+    return present[-1]
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _is_daily(module: str) -> bool:
+    return module.endswith(SNAPSHOT_SEPARATOR + DAILY_BUCKET)
+
+def _data(item: Dict[str, Any]) -> Any:
+    data = item.get('data')
+    if isinstance(data, str):
+        try:
+            return json.loads(data)
+        except json.JSONDecodeError:
+            return None
+    return data
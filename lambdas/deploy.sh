@@ -32,4 +32,14 @@ for func in "${FUNCTIONS[@]}"; do
     cd ..
 done
 
+# The orchestrator imports every ingestor, the aggregator and the compactor, so its
+# package keeps the function directories side by side
+echo "Packaging orchestrator..."
+zip -q -r orchestrator.zip orchestrator/index.py aggregator/index.py compactor/index.py ingestor-*/*.py
+aws lambda update-function-code \
+    --function-name "${PROJECT_NAME}-orchestrator-${ENVIRONMENT}" \
+    --zip-file "fileb://orchestrator.zip" \
+    > /dev/null
+echo "✓ Deployed orchestrator"
+
 echo "All functions deployed successfully!"
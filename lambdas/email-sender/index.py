@@ -6,7 +6,9 @@ from datetime import datetime
 from typing import Dict, Any, List
 import boto3
 from botocore.exceptions import ClientError
+import metrics
 
+@metrics.instrumented('email-sender')
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     session = boto3.Session()
     dynamodb = session.resource('dynamodb')
@@ -37,11 +39,14 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     sent_count = 0
     for subscriber in subscribers:
         try:
-            send_email(ses, subscriber['email'], brief, sender_email, dashboard_url)
+            with metrics.timer('SendTime'):
+                send_email(ses, subscriber['email'], brief, sender_email, dashboard_url)
             sent_count += 1
         except ClientError as e:
+            metrics.count('SendErrors')
             print(f"Failed to send to {subscriber['email']}: {e}")
     
+    metrics.count('EmailsSent', sent_count)
     return {'statusCode': 200, 'body': json.dumps(f'Sent {sent_count} emails')}
 
 def get_active_subscribers(subscribers_table: Any) -> List[Dict[str, Any]]:
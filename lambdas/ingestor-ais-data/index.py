@@ -5,24 +5,27 @@ import os
 from datetime import datetime
 from typing import Dict, Any, List
 import boto3
-import urllib.request
 from botocore.exceptions import ClientError
+import metrics
+from raw_store import put_module_data
+from run_tracker import record_completion, trigger_aggregation_if_ready
 
+@metrics.instrumented('ais-data')
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    started_at = datetime.utcnow()
     session = boto3.Session()
     dynamodb = session.resource('dynamodb')
     table = dynamodb.Table(os.environ['RAW_DATA_TABLE'])
     
     today = datetime.utcnow().strftime('%Y-%m-%d')
-    ais_data = fetch_maritime_data()
+    with metrics.timer('FetchTime'):
+        ais_data = fetch_maritime_data()
     
-    table.put_item(Item={
-        'date': today,
-        'module': 'ais-data',
-        'data': json.dumps(ais_data),
-        'timestamp': datetime.utcnow().isoformat()
-    })
+    with metrics.timer('StorageTime'):
+        put_module_data(table, today, 'ais-data', ais_data)
     
+    record_completion(table, today, 'ais-data', 'ok', started_at)
+    trigger_aggregation_if_ready(table, today)
     return {'statusCode': 200, 'body': json.dumps('AIS maritime data ingested')}
 
 def fetch_maritime_data() -> List[Dict[str, Any]]:
@@ -52,7 +55,8 @@ def fetch_maritime_data() -> List[Dict[str, Any]]:
                 'cargo_vessels': int(vessel_count * 0.7),  # ~70% cargo
                 'congestion_level': congestion,
                 'avg_wait_time': _get_wait_time(congestion),
-                'coordinates': {'lat': port['lat'], 'lon': port['lon']}
+                'coordinates': {'lat': port['lat'], 'lon': port['lon']},
+                'data_source': 'Mock Data'
             })
         
         return results
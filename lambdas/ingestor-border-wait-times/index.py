@@ -2,80 +2,202 @@ from __future__ import annotations
 
 import json
 import os
-from datetime import datetime
-from typing import Dict, Any, List
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
 import boto3
-import urllib.request
 from botocore.exceptions import ClientError
+import metrics
+import cbp
+from fetcher import fetch_bytes, load_latency_history, save_latency_history, start_budget
+from raw_store import put_module_data
+from run_tracker import record_completion, trigger_aggregation_if_ready
+from state_store import get_state, put_state
 
+# Commercial truck crossings, keyed by the crossing_id other modules join on (see gazetteer.py).
+# port_number is CBP's identifier for the crossing in the wait-times feed.
+CROSSINGS = {
+    'ambassador-bridge': {'port_number': '380001', 'name': 'Ambassador Bridge', 'location': 'Detroit, MI', 'country': 'Canada', 'lat': 42.31, 'lon': -83.07},
+    'blue-water-bridge': {'port_number': '380301', 'name': 'Blue Water Bridge', 'location': 'Port Huron, MI', 'country': 'Canada', 'lat': 42.99, 'lon': -82.42},
+    'peace-bridge': {'port_number': '090101', 'name': 'Peace Bridge', 'location': 'Buffalo, NY', 'country': 'Canada', 'lat': 42.91, 'lon': -78.90},
+    'lewiston-bridge': {'port_number': '090401', 'name': 'Lewiston Bridge', 'location': 'Lewiston, NY', 'country': 'Canada', 'lat': 43.15, 'lon': -79.04},
+    'laredo-world-trade-bridge': {'port_number': '230404', 'name': 'Laredo World Trade Bridge', 'location': 'Laredo, TX', 'country': 'Mexico', 'lat': 27.60, 'lon': -99.53},
+    'laredo-colombia-solidarity': {'port_number': '230403', 'name': 'Colombia Solidarity Bridge', 'location': 'Laredo, TX', 'country': 'Mexico', 'lat': 27.70, 'lon': -99.74},
+    'pharr-international-bridge': {'port_number': '230501', 'name': 'Pharr International Bridge', 'location': 'Pharr, TX', 'country': 'Mexico', 'lat': 26.10, 'lon': -98.18},
+    'ysleta': {'port_number': '240221', 'name': 'Ysleta-Zaragoza Bridge', 'location': 'El Paso, TX', 'country': 'Mexico', 'lat': 31.67, 'lon': -106.33},
+    'nogales-mariposa': {'port_number': '260402', 'name': 'Nogales Mariposa', 'location': 'Nogales, AZ', 'country': 'Mexico', 'lat': 31.33, 'lon': -110.97},
+    'calexico-east': {'port_number': '250301', 'name': 'Calexico East', 'location': 'Calexico, CA', 'country': 'Mexico', 'lat': 32.67, 'lon': -115.39},
+    'otay-mesa': {'port_number': '250601', 'name': 'Otay Mesa', 'location': 'San Diego, CA', 'country': 'Mexico', 'lat': 32.55, 'lon': -116.94},
+}
+DEFAULT_CROSSINGS = 'ambassador-bridge,peace-bridge,laredo-world-trade-bridge,otay-mesa,pharr-international-bridge'
+# Crossing ids, or bare CBP port numbers for crossings not listed above
+BORDER_CROSSINGS = os.environ.get('BORDER_CROSSINGS', DEFAULT_CROSSINGS)
+
+# The parsed feed with CBP's newest report time and a checksum of the payload it came
+# from: date = 'state', module = 'cbp#bwt'
+CBP_STATE_KEY = 'cbp#bwt'
+# CBP refreshes its figures about hourly; polls closer together than this reuse the cache
+CBP_POLL_MINUTES = int(os.environ.get('CBP_POLL_MINUTES', '15'))
+
+@metrics.instrumented('border-wait-times')
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    started_at = datetime.utcnow()
+    start_budget(context)
     session = boto3.Session()
     dynamodb = session.resource('dynamodb')
     table = dynamodb.Table(os.environ['RAW_DATA_TABLE'])
     
     today = datetime.utcnow().strftime('%Y-%m-%d')
-    border_data = fetch_border_wait_times()
+    load_latency_history(table)
+    with metrics.timer('FetchTime'):
+        border_data = fetch_border_wait_times(table)
     
-    table.put_item(Item={
-        'date': today,
-        'module': 'border-wait-times',
-        'data': json.dumps(border_data),
-        'timestamp': datetime.utcnow().isoformat()
-    })
+    with metrics.timer('StorageTime'):
+        put_module_data(table, today, 'border-wait-times', border_data)
+    
+    record_completion(table, today, 'border-wait-times', 'ok', started_at)
+    trigger_aggregation_if_ready(table, today)
     
+    save_latency_history(table)
     return {'statusCode': 200, 'body': json.dumps('Border wait times ingested')}
 
-def fetch_border_wait_times() -> List[Dict[str, Any]]:
-    # Major commercial truck crossings
-    crossings = [
-        {'name': 'Ambassador Bridge', 'location': 'Detroit, MI', 'country': 'Canada'},
-        {'name': 'Peace Bridge', 'location': 'Buffalo, NY', 'country': 'Canada'},
-        {'name': 'Laredo World Trade Bridge', 'location': 'Laredo, TX', 'country': 'Mexico'},
-        {'name': 'Otay Mesa', 'location': 'San Diego, CA', 'country': 'Mexico'},
-        {'name': 'Pharr International Bridge', 'location': 'Pharr, TX', 'country': 'Mexico'}
-    ]
+def fetch_border_wait_times(table: Optional[Any] = None) -> List[Dict[str, Any]]:
+    crossings = configured_crossings(BORDER_CROSSINGS)
+    table = table or boto3.Session().resource('dynamodb').Table(os.environ['RAW_DATA_TABLE'])
+    cached = get_state(table, CBP_STATE_KEY)
+    now = datetime.utcnow()
+    
+    if cached and cached.get('fetched_at', '') > (now - timedelta(minutes=CBP_POLL_MINUTES)).isoformat():
+        metrics.count('CacheHits', Source='cbp')
+        return select_crossings(cached['ports'], crossings)
     
     try:
-        # CBP Border Wait Times API (if available)
-        url = "https://bwt.cbp.gov/api/waitTimes"
-        
-        with urllib.request.urlopen(url, timeout=10) as response:
-            data = json.loads(response.read())
-            
-            results = []
-            for crossing in crossings:
-                # Find matching data or use mock
-                wait_time = _get_mock_wait_time(crossing['name'])
-                
-                results.append({
-                    'name': crossing['name'],
-                    'location': crossing['location'],
-                    'country': crossing['country'],
-                    'commercial_wait': wait_time,
-                    'status': _get_status(wait_time),
-                    'last_updated': datetime.utcnow().strftime('%H:%M UTC')
-                })
-            
-            return results
-            
+        payload = fetch_bytes(cbp.CBP_WAIT_TIMES_URL, timeout=10)
     except Exception as e:
         print(f"CBP API error: {e}")
+        if cached:
+            return select_crossings(cached['ports'], crossings)
+        return _mock_results(crossings)
+    
+    digest = f"{zlib.crc32(payload):08x}"
+    if cached and cached.get('digest') == digest:
+        # Byte-identical feed: not even the JSON needs decoding
+        metrics.count('CacheHits', Source='cbp')
+        ports, updated = cached['ports'], cached.get('updated')
+    else:
+        try:
+            with metrics.timer('ParseTime', Upstream='bwt.cbp.gov'):
+                feed = json.loads(payload)
+                updated = cbp.feed_updated(feed)
+                if cached and updated and cached.get('updated') == updated:
+                    # CBP has not published since the last poll: nothing to re-parse
+                    metrics.count('CacheHits', Source='cbp')
+                    ports = cached['ports']
+                else:
+                    ports = parse_ports(feed)
+        except (ValueError, TypeError, AttributeError) as e:
+            print(f"CBP payload error: {e}")
+            metrics.count('ParseErrors', Upstream='bwt.cbp.gov')
+            if cached:
+                return select_crossings(cached['ports'], crossings)
+            return _mock_results(crossings)
+    
+    put_state(table, CBP_STATE_KEY, {
+        'digest': digest,
+        'updated': updated,
+        'fetched_at': now.isoformat(),
+        'ports': ports
+    })
+    return select_crossings(ports, crossings)
+
+def configured_crossings(setting: str) -> List[Dict[str, Any]]:
+    """ Crossings named in BORDER_CROSSINGS, by crossing id or CBP port number. """
+    by_number = {crossing['port_number']: crossing_id for crossing_id, crossing in CROSSINGS.items()}
+    crossings: Dict[str, Dict[str, Any]] = {}
+    for key in (part.strip() for part in setting.split(',')):
+        crossing_id = key if key in CROSSINGS else by_number.get(key)
+        if crossing_id:
+            crossings[crossing_id] = {'id': crossing_id, **CROSSINGS[crossing_id]}
+        elif key.isdigit():
+            # Unlisted crossing: name and location come from the feed
+            crossings[f'cbp-{key}'] = {'id': f'cbp-{key}', 'port_number': key}
+        elif key:
+            print(f"Unknown border crossing {key}")
+    return list(crossings.values())
+
+def parse_ports(payload: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Reduces the CBP feed to what the brief uses: port number -> name, border and the
+    commercial lanes. The index is built in one pass over the feed, so each configured
+    crossing is then a dict lookup.
+    """
+    ports = {}
+    for number, port in cbp.index_ports(payload).items():
+        ports[number] = {
+            'name': port.get('crossing_name') or port.get('port_name'),
+            'port_name': port.get('port_name'),
+            'border': port.get('border'),
+            'last_updated': cbp.port_updated(port),
+            **cbp.commercial_lanes(port)
+        }
+    return ports
+
+def select_crossings(ports: Dict[str, Dict[str, Any]], crossings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    results = []
+    for crossing in crossings:
+        port = ports.get(crossing['port_number'])
+        if port is None:
+            metrics.count('CrossingsMissing')
+            print(f"CBP feed has no port {crossing['port_number']} ({crossing['id']})")
+            continue
         
-        # Fallback to mock data
-        results = []
-        for crossing in crossings:
-            wait_time = _get_mock_wait_time(crossing['name'])
-            
-            results.append({
-                'name': crossing['name'],
-                'location': crossing['location'],
-                'country': crossing['country'],
-                'commercial_wait': wait_time,
-                'status': _get_status(wait_time),
-                'last_updated': datetime.utcnow().strftime('%H:%M UTC')
-            })
-        
-        return results
+        wait_time = port['commercial_wait']
+        result = {
+            'crossing_id': crossing['id'],
+            'port_number': crossing['port_number'],
+            'name': crossing.get('name') or port['name'],
+            'location': crossing.get('location') or port['port_name'],
+            'country': crossing.get('country') or ('Canada' if 'canad' in (port['border'] or '').lower() else 'Mexico'),
+            'commercial_wait': wait_time,
+            'fast_wait': port['fast_wait'],
+            'lanes_open': port['lanes_open'],
+            'status': _lane_status(port['lane_state'], wait_time),
+            'last_updated': port['last_updated'],
+            'last_updated_tz': 'local'
+        }
+        if 'lat' in crossing:
+            result['coordinates'] = {'lat': crossing['lat'], 'lon': crossing['lon']}
+        results.append(result)
+    return results
+
+def _lane_status(lane_state: str, wait_time: Optional[int]) -> str:
+    if lane_state == 'closed':
+        return 'CLOSED'
+    if wait_time is None:
+        return 'NO DATA'
+    return _get_status(wait_time)
+
+def _mock_results(crossings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    results = []
+    for crossing in crossings:
+        wait_time = _get_mock_wait_time(crossing.get('name', ''))
+        result = {
+            'crossing_id': crossing['id'],
+            'port_number': crossing['port_number'],
+            'name': crossing.get('name', crossing['id']),
+            'location': crossing.get('location', ''),
+            'country': crossing.get('country', ''),
+            'commercial_wait': wait_time,
+            'status': _get_status(wait_time),
+            # Same format as CBP's reports, but there is no crossing clock to read here
+            'last_updated': datetime.utcnow().strftime('%Y-%m-%d %H:%M'),
+            'last_updated_tz': 'UTC',
+            'data_source': 'Mock Data'
+        }
+        if 'lat' in crossing:
+            result['coordinates'] = {'lat': crossing['lat'], 'lon': crossing['lon']}
+        results.append(result)
+    return results
 
 def _get_mock_wait_time(crossing_name: str) -> int:
     # Realistic wait times based on crossing
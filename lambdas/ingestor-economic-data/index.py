@@ -1,88 +1,120 @@
 from __future__ import annotations
 
+import contextvars
 import json
 import os
-from datetime import datetime
-from typing import Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
 import boto3
-import urllib.request
 from botocore.exceptions import ClientError
+import metrics
+import fred
+from fetcher import FETCH_ERRORS, load_latency_history, save_latency_history, start_budget
+from raw_store import put_module_data
+from release_calendar import count_poll, is_due, load_calendar, record_poll
+from run_tracker import record_completion, trigger_aggregation_if_ready
+from state_store import put_state, query_state
 
+# Per-series observation cache in the raw table's state partition: module = 'fred#<SERIES>'
+FRED_STATE_PREFIX = 'fred#'
+CACHED_OBSERVATIONS = 24
+
+@metrics.instrumented('economic-data')
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    started_at = datetime.utcnow()
+    start_budget(context)
     session = boto3.Session()
     dynamodb = session.resource('dynamodb')
     table = dynamodb.Table(os.environ['RAW_DATA_TABLE'])
     
     today = datetime.utcnow().strftime('%Y-%m-%d')
-    economic_data = fetch_economic_indicators()
+    load_latency_history(table)
+    with metrics.timer('FetchTime'):
+        economic_data = fetch_economic_indicators(table)
+    
+    with metrics.timer('StorageTime'):
+        put_module_data(table, today, 'economic-data', economic_data)
     
-    table.put_item(Item={
-        'date': today,
-        'module': 'economic-data',
-        'data': json.dumps(economic_data),
-        'timestamp': datetime.utcnow().isoformat()
-    })
+    record_completion(table, today, 'economic-data', 'ok', started_at)
+    trigger_aggregation_if_ready(table, today)
     
+    save_latency_history(table)
     return {'statusCode': 200, 'body': json.dumps('Economic data ingested')}
 
-def fetch_economic_indicators() -> List[Dict[str, Any]]:
-    # Get FRED API key from Parameter Store
-    try:
-        session = boto3.Session()
-        ssm = session.client('ssm')
-        response = ssm.get_parameter(
-            Name='/logistix/fred-api-key',
-            WithDecryption=True
-        )
-        fred_api_key = response['Parameter']['Value']
-    except Exception as e:
-        print(f"Failed to get FRED API key: {e}")
-        fred_api_key = None
-    
-    # Key economic indicators for logistics
-    indicators = [
-        {'series': 'UNRATE', 'name': 'Unemployment Rate', 'unit': '%'},
-        {'series': 'CPIAUCSL', 'name': 'Consumer Price Index', 'unit': 'Index'},
-        {'series': 'DCOILWTICO', 'name': 'WTI Crude Oil', 'unit': '$/barrel'},
-        {'series': 'DEXUSEU', 'name': 'USD/EUR Exchange', 'unit': 'Rate'},
-        {'series': 'INDPRO', 'name': 'Industrial Production', 'unit': 'Index'}
-    ]
-    
-    results = []
+def fetch_economic_indicators(table: Optional[Any] = None) -> List[Dict[str, Any]]:
+    fred_api_key = fred.get_api_key()
     
     if not fred_api_key:
         # Mock data when no API key
         return [
-            {'name': 'Unemployment Rate', 'value': 3.7, 'unit': '%', 'change': -0.1},
-            {'name': 'Consumer Price Index', 'value': 307.8, 'unit': 'Index', 'change': 0.2},
-            {'name': 'WTI Crude Oil', 'value': 71.2, 'unit': '$/barrel', 'change': -1.8},
-            {'name': 'USD/EUR Exchange', 'value': 1.05, 'unit': 'Rate', 'change': 0.01},
-            {'name': 'Industrial Production', 'value': 103.2, 'unit': 'Index', 'change': 0.3}
+            {'name': 'Unemployment Rate', 'value': 3.7, 'unit': '%', 'change': -0.1, 'data_source': 'Mock Data'},
+            {'name': 'Consumer Price Index', 'value': 307.8, 'unit': 'Index', 'change': 0.2, 'data_source': 'Mock Data'},
+            {'name': 'WTI Crude Oil', 'value': 71.2, 'unit': '$/barrel', 'change': -1.8, 'data_source': 'Mock Data'},
+            {'name': 'USD/EUR Exchange', 'value': 1.05, 'unit': 'Rate', 'change': 0.01, 'data_source': 'Mock Data'},
+            {'name': 'Industrial Production', 'value': 103.2, 'unit': 'Index', 'change': 0.3, 'data_source': 'Mock Data'}
         ]
     
-    for indicator in indicators:
-        try:
-            url = f"https://api.stlouisfed.org/fred/series/observations?series_id={indicator['series']}&api_key={fred_api_key}&file_type=json&limit=2&sort_order=desc"
-            
-            with urllib.request.urlopen(url, timeout=10) as response:
-                data = json.loads(response.read())
-                observations = data.get('observations', [])
-                
-                if len(observations) >= 2:
-                    current = float(observations[0]['value']) if observations[0]['value'] != '.' else 0
-                    previous = float(observations[1]['value']) if observations[1]['value'] != '.' else 0
-                    change = round(current - previous, 2)
-                    
-                    results.append({
-                        'name': indicator['name'],
-                        'value': current,
-                        'unit': indicator['unit'],
-                        'change': change
-                    })
-        except Exception as e:
-            print(f"Error fetching {indicator['name']}: {e}")
-            continue
+    # Cached observations for every series come back in a single Query
+    table = table or boto3.Session().resource('dynamodb').Table(os.environ['RAW_DATA_TABLE'])
+    cache = query_state(table, FRED_STATE_PREFIX)
+    calendar = load_calendar(table)
+    
+    with ThreadPoolExecutor(max_workers=len(fred.INDICATORS), thread_name_prefix='fred') as executor:
+        synced = list(executor.map(
+            lambda indicator, ctx: ctx.run(
+                sync_series, fred_api_key, indicator['series'], cache.get(indicator['series']), calendar
+            ),
+            fred.INDICATORS, [contextvars.copy_context() for _ in fred.INDICATORS]
+        ))
+    
+    results = []
+    for indicator, (series_cache, fetched, released) in zip(fred.INDICATORS, synced):
+        if fetched:
+            put_state(table, f"{FRED_STATE_PREFIX}{indicator['series']}", series_cache)
+            record_poll(table, calendar, f"fred:{indicator['series']}", released)
+        
+        observations = (series_cache or {}).get('observations', [])
+        if len(observations) >= 2:
+            current, previous = observations[-1][1], observations[-2][1]
+            results.append({
+                'name': indicator['name'],
+                'value': current,
+                'unit': indicator['unit'],
+                'change': round(current - previous, 2),
+                'as_of': observations[-1][0]
+            })
     
     return results if results else [
-        {'name': 'Economic Data', 'value': 0, 'unit': 'N/A', 'change': 0}
-    ]
\ No newline at end of file
+        {'name': 'Economic Data', 'value': 0, 'unit': 'N/A', 'change': 0, 'data_source': 'Mock Data'}
+    ]
+
+def sync_series(api_key: str, series: str, cached: Optional[Dict[str, Any]],
+                calendar: Dict[str, Dict[str, Any]]) -> Tuple[Optional[Dict[str, Any]], bool, bool]:
+    """
+    Brings one series' cached observations up to date. Only observations after the last
+    cached date are requested; a series already checked today, or whose next release
+    cannot be out yet, is not requested at all. Returns (cache, fetched, new release).
+    """
+    today = datetime.utcnow().strftime('%Y-%m-%d')
+    observations = (cached or {}).get('observations', [])
+    source = f'fred:{series}'
+    if cached and (cached.get('checked_on') == today or not is_due(calendar, source)):
+        count_poll(source, False)
+        return cached, False, False
+    count_poll(source, True)
+    
+    try:
+        if observations:
+            start = (datetime.strptime(observations[-1][0], '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+            new = fred.fetch_observations(api_key, series, start=start)
+        else:
+            new = fred.fetch_observations(api_key, series, limit=CACHED_OBSERVATIONS, sort_order='desc')[::-1]
+    except FETCH_ERRORS + (ValueError, KeyError) as e:
+        print(f"Error fetching {series}: {e}")
+        return cached, False, False
+    
+    metrics.count('NewObservations', len(new), Source=series)
+    released = bool(observations) and bool(new)
+    observations = (observations + [[o['date'], o['value']] for o in new])[-CACHED_OBSERVATIONS:]
+    return {'observations': observations, 'checked_on': today}, True, released
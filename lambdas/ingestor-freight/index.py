@@ -2,7 +2,11 @@ import json
 import os
 from datetime import datetime
 import boto3
+import metrics
+from fetcher import load_latency_history, save_latency_history, start_budget
 from news_fetcher import get_news_items
+from raw_store import put_module_data
+from run_tracker import record_completion, trigger_aggregation_if_ready
 
 dynamodb = boto3.resource('dynamodb')
 table = dynamodb.Table(os.environ['RAW_DATA_TABLE'])
@@ -16,17 +20,22 @@ FREIGHT_RATES = {
     'last_updated': '2025-12-01'
 }
 
+@metrics.instrumented('freight')
 def handler(event, context):
+    started_at = datetime.utcnow()
+    start_budget(context)
     today = datetime.utcnow().strftime('%Y-%m-%d')
-    freight_data = fetch_freight_rates()
+    load_latency_history(table)
+    with metrics.timer('FetchTime'):
+        freight_data = fetch_freight_rates()
     
-    table.put_item(Item={
-        'date': today,
-        'module': 'freight',
-        'data': json.dumps(freight_data),
-        'timestamp': datetime.utcnow().isoformat()
-    })
+    with metrics.timer('StorageTime'):
+        put_module_data(table, today, 'freight', freight_data)
     
+    record_completion(table, today, 'freight', 'ok', started_at)
+    trigger_aggregation_if_ready(table, today)
+    
+    save_latency_history(table)
     return {'statusCode': 200, 'body': json.dumps('Freight data ingested')}
 
 def fetch_freight_rates():
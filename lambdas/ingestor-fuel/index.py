@@ -2,74 +2,112 @@ from __future__ import annotations
 
 import json
 import os
-from datetime import datetime
-from typing import Dict, Any
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
 import boto3
-import urllib.request
-import urllib.error
 from botocore.exceptions import ClientError
+import metrics
+import eia
+from fetcher import FETCH_ERRORS, load_latency_history, save_latency_history, start_budget
 from news_fetcher import get_news_items
+from raw_store import put_module_data
+from release_calendar import count_poll, is_due, load_calendar, record_poll
+from run_tracker import record_completion, trigger_aggregation_if_ready
+from state_store import get_state, put_state
+
+# Region x product matrix used when EIA is unavailable and nothing is cached
+MOCK_REGIONS = {
+    'us': {'diesel': 4.12, 'gasoline': 3.45},
+    'east_coast': {'diesel': 4.21, 'gasoline': 3.52},
+    'midwest': {'diesel': 4.05, 'gasoline': 3.38},
+    'gulf_coast': {'diesel': 3.89, 'gasoline': 3.11},
+    'rocky_mountain': {'diesel': 4.18, 'gasoline': 3.41},
+    'west_coast': {'diesel': 4.92, 'gasoline': 4.58},
+}
+
+# Latest weekly region x product matrix: date = 'state', module = 'eia#gnd'
+EIA_STATE_KEY = 'eia#gnd'
+EIA_SOURCE = 'eia:gnd'
 
 MOCK_NEWS = [
     {'title': 'Diesel prices hold steady amid stable crude markets', 'url': 'https://www.eia.gov'},
     {'title': 'Weekly petroleum status report released', 'url': 'https://www.eia.gov'}
 ]
 
+@metrics.instrumented('fuel')
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    started_at = datetime.utcnow()
+    start_budget(context)
     session = boto3.Session()
     dynamodb = session.resource('dynamodb')
     table = dynamodb.Table(os.environ['RAW_DATA_TABLE'])
     today = datetime.utcnow().strftime('%Y-%m-%d')
-    fuel_data = fetch_fuel_prices()
+    load_latency_history(table)
+    with metrics.timer('FetchTime'):
+        fuel_data = fetch_fuel_prices(table)
     
-    table.put_item(Item={
-        'date': today,
-        'module': 'fuel',
-        'data': json.dumps(fuel_data),
-        'timestamp': datetime.utcnow().isoformat()
-    })
+    with metrics.timer('StorageTime'):
+        put_module_data(table, today, 'fuel', fuel_data)
     
+    record_completion(table, today, 'fuel', 'ok', started_at)
+    trigger_aggregation_if_ready(table, today)
+    
+    save_latency_history(table)
     return {'statusCode': 200, 'body': json.dumps('Fuel data ingested')}
 
-def fetch_fuel_prices() -> Dict[str, Any]:
+def fetch_fuel_prices(table: Optional[Any] = None) -> Dict[str, Any]:
     api_key = os.environ.get('EIA_API_KEY')
     news = get_news_items('https://www.eia.gov/rss/petroleum.xml', 3) or MOCK_NEWS
     
     if not api_key:
-        return {
-            'national_avg': 3.45,
-            'diesel': 4.12,
-            'regions': {'northeast': 3.52, 'midwest': 3.38, 'south': 3.41, 'west': 3.58},
-            'news': news
-        }
+        return fuel_result(MOCK_REGIONS, None, news)
+    
+    table = table or boto3.Session().resource('dynamodb').Table(os.environ['RAW_DATA_TABLE'])
+    cached = get_state(table, EIA_STATE_KEY)
+    calendar = load_calendar(table)
+    if cached and (is_current(cached) or not is_due(calendar, EIA_SOURCE)):
+        # Nothing new can be published yet: carry the cached week forward
+        count_poll(EIA_SOURCE, False)
+        return fuel_result(cached['matrix'], cached['period'], news)
+    count_poll(EIA_SOURCE, True)
     
     try:
-        url = f"https://api.eia.gov/v2/petroleum/pri/gnd/data/?api_key={api_key}&frequency=weekly&data[0]=value&facets[product][]=EPD2D&facets[product][]=EPMR&sort[0][column]=period&sort[0][direction]=desc&length=1"
-        
-        with urllib.request.urlopen(url) as response:
-            data = json.loads(response.read())
-            prices = {}
-            
-            for item in data.get('response', {}).get('data', []):
-                product = item.get('product-name', '')
-                value = float(item.get('value', 0))
-                
-                if 'Diesel' in product:
-                    prices['diesel'] = value
-                elif 'Regular' in product:
-                    prices['national_avg'] = value
-            
-            return {
-                'national_avg': prices.get('national_avg', 3.45),
-                'diesel': prices.get('diesel', 4.12),
-                'regions': {'northeast': 3.52, 'midwest': 3.38, 'south': 3.41, 'west': 3.58},
-                'news': news
-            }
-    except (urllib.error.URLError, json.JSONDecodeError, KeyError) as e:
+        # Every PADD region and both products in one request, parsed in one pass
+        rows = eia.fetch_latest(api_key, list(eia.PRODUCT_NAMES), list(eia.PADD_REGIONS), timeout=10)
+        period, matrix = eia.build_matrix(eia.parse_rows(rows))
+        if not matrix.get('us'):
+            raise KeyError('no national series in response')
+    except FETCH_ERRORS + (ValueError, KeyError) as e:
         print(f"EIA API error: {e}")
-        return {
-            'national_avg': 3.45,
-            'diesel': 4.12,
-            'regions': {'northeast': 3.52, 'midwest': 3.38, 'south': 3.41, 'west': 3.58},
-            'news': news
-        }
+        if cached:
+            return fuel_result(cached['matrix'], cached['period'], news)
+        return fuel_result(MOCK_REGIONS, None, news)
+    
+    record_poll(table, calendar, EIA_SOURCE, bool(cached) and (period or '') > (cached.get('period') or ''))
+    put_state(table, EIA_STATE_KEY, {
+        'period': period,
+        'matrix': matrix,
+        'checked_on': datetime.utcnow().strftime('%Y-%m-%d')
+    })
+    return fuel_result(matrix, period, news)
+
+def is_current(cached: Dict[str, Any]) -> bool:
+    """
+    EIA publishes one weekly period, dated the Monday of its week. Once the cache holds
+    this week's period, or was checked today, a new request cannot return anything new.
+    """
+    today = datetime.utcnow().date()
+    this_week = (today - timedelta(days=today.weekday())).isoformat()
+    return (cached.get('period') or '') >= this_week or cached.get('checked_on') == today.isoformat()
+
+def fuel_result(matrix: Dict[str, Dict[str, float]], period: Optional[str], news: List[Dict[str, str]]) -> Dict[str, Any]:
+    national = matrix.get('us', {})
+    return {
+        'national_avg': national.get('gasoline', 3.45),
+        'diesel': national.get('diesel', 4.12),
+        'regions': {region: prices for region, prices in matrix.items() if region != 'us'},
+        'as_of': period,
+        # Without an EIA period these are MOCK_REGIONS and defaults, kept out of the history archive
+        'data_source': 'EIA' if period else 'Mock Data',
+        'news': news
+    }
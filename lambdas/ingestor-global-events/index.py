@@ -3,84 +3,174 @@ from __future__ import annotations
 import json
 import os
 from datetime import datetime, timedelta
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import boto3
-import urllib.request
 from botocore.exceptions import ClientError
+import metrics
+import gdelt
+import gdelt_export
+from dedup import dedupe
+from fetcher import FETCH_ERRORS, load_latency_history, save_latency_history, start_budget
+from gazetteer import tag
+from keywords import classify, compile_terms, find_terms
+from raw_store import put_module_data
+from run_tracker import record_completion, trigger_aggregation_if_ready
+from state_store import get_state, put_state
 
+# Keywords related to logistics disruption
+KEYWORDS = ['port', 'shipping', 'supply chain', 'strike', 'border', 'trade war', 'sanctions']
+KEYWORD_LEXICON = compile_terms(dict.fromkeys(KEYWORDS))
+MAX_PER_KEYWORD = 2
+MAX_EVENTS = 5
+IMPACT_ORDER = {'HIGH': 0, 'MEDIUM': 1, 'LOW': 2}
+
+# Preferred copy of a syndicated story: wires and trade press first, then the earliest seen
+SOURCE_AUTHORITY = ['reuters.com', 'apnews.com', 'bloomberg.com', 'wsj.com', 'ft.com', 'joc.com',
+                    'freightwaves.com', 'supplychaindive.com', 'cnbc.com']
+
+# Articles for the current window, shared by every run inside it: date = 'state', module = 'gdelt#doc'
+GDELT_STATE_KEY = 'gdelt#doc'
+GDELT_WINDOW_MINUTES = int(os.environ.get('GDELT_WINDOW_MINUTES', '60'))
+ARTICLE_FIELDS = ['title', 'domain', 'url', 'seendate']
+
+# Bulk event exports: how many of the newest 15-minute files to stream (0 turns this off)
+GDELT_EXPORT_WINDOWS = int(os.environ.get('GDELT_EXPORT_WINDOWS', '0'))
+GDELT_EXPORT_STATE_KEY = 'gdelt#export'
+
+@metrics.instrumented('global-events')
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    started_at = datetime.utcnow()
+    start_budget(context)
     session = boto3.Session()
     dynamodb = session.resource('dynamodb')
     table = dynamodb.Table(os.environ['RAW_DATA_TABLE'])
     
     today = datetime.utcnow().strftime('%Y-%m-%d')
-    global_events = fetch_global_events()
+    load_latency_history(table)
+    with metrics.timer('FetchTime'):
+        global_events = fetch_global_events(table)
+    with metrics.timer('EventCountsTime'):
+        event_counts = fetch_event_counts(table, int((event or {}).get('export_windows', GDELT_EXPORT_WINDOWS)))
     
-    table.put_item(Item={
-        'date': today,
-        'module': 'global-events',
-        'data': json.dumps(global_events),
-        'timestamp': datetime.utcnow().isoformat()
-    })
+    with metrics.timer('StorageTime'):
+        put_module_data(table, today, 'global-events', global_events)
+        put_module_data(table, today, 'global-event-counts', event_counts)
     
+    record_completion(table, today, 'global-events', 'ok', started_at)
+    trigger_aggregation_if_ready(table, today)
+    
+    save_latency_history(table)
     return {'statusCode': 200, 'body': json.dumps('Global events data ingested')}
 
-def fetch_global_events() -> List[Dict[str, Any]]:
+def fetch_global_events(table: Optional[Any] = None) -> List[Dict[str, Any]]:
     # GDELT Project API for global events affecting logistics
     try:
-        # Last 24 hours of events related to logistics keywords
-        yesterday = (datetime.utcnow() - timedelta(days=1)).strftime('%Y%m%d%H%M%S')
-        today = datetime.utcnow().strftime('%Y%m%d%H%M%S')
-        
-        # Keywords related to logistics disruption
-        keywords = ['port', 'shipping', 'supply chain', 'strike', 'border', 'trade war', 'sanctions']
-        
-        events = []
+        # Last 24 hours of events, ending at the start of the current cache window
+        now = datetime.utcnow()
+        window_end = now.replace(minute=now.minute - now.minute % GDELT_WINDOW_MINUTES, second=0, microsecond=0)
+        window = window_end.strftime('%Y%m%d%H%M%S')
         
-        for keyword in keywords[:2]:  # Limit to avoid rate limits
+        table = table or boto3.Session().resource('dynamodb').Table(os.environ['RAW_DATA_TABLE'])
+        cached = get_state(table, GDELT_STATE_KEY)
+        if cached and cached.get('window') == window:
+            metrics.count('CacheHits', Source='gdelt')
+            articles = cached['articles']
+        else:
+            # All keywords in one OR query, attributed back to keywords locally
+            start = (window_end - timedelta(days=1)).strftime('%Y%m%d%H%M%S')
+            queries = gdelt.build_queries(KEYWORDS)
             try:
-                url = f"https://api.gdeltproject.org/api/v2/doc/doc?query={keyword}&mode=artlist&maxrecords=5&startdatetime={yesterday}&enddatetime={today}&format=json"
-                
-                with urllib.request.urlopen(url, timeout=10) as response:
-                    data = json.loads(response.read())
-                    articles = data.get('articles', [])
-                    
-                    for article in articles[:2]:  # Top 2 per keyword
-                        events.append({
-                            'title': article.get('title', 'Unknown Event')[:100],
-                            'source': article.get('domain', 'Unknown'),
-                            'url': article.get('url', ''),
-                            'keyword': keyword,
-                            'impact_level': _assess_impact(article.get('title', '')),
-                            'timestamp': article.get('seendate', today)
-                        })
-                        
-            except Exception as e:
-                print(f"Error fetching events for {keyword}: {e}")
-                continue
+                articles = [
+                    {field: article.get(field, '') for field in ARTICLE_FIELDS}
+                    for article in gdelt.fetch_articles(queries, start, window, timeout=10)
+                ]
+            except FETCH_ERRORS + (ValueError,) as e:
+                print(f"Error fetching GDELT articles: {e}")
+                articles = (cached or {}).get('articles', [])
+            else:
+                metrics.count('GdeltRequests', len(queries))
+                metrics.count('ArticlesFetched', len(articles))
+                put_state(table, GDELT_STATE_KEY, {'window': window, 'articles': articles})
+        
+        events = select_events(articles, window)
         
         # Add mock events if no real data
         if not events:
             events = _get_mock_events()
         
-        return events[:5]  # Max 5 events
+        return events
         
     except Exception as e:
         print(f"GDELT API error: {e}")
         return _get_mock_events()
 
-def _assess_impact(title: str) -> str:
-    high_impact_words = ['strike', 'shutdown', 'closure', 'blocked', 'suspended', 'war', 'sanctions']
-    medium_impact_words = ['delay', 'disruption', 'congestion', 'shortage', 'increase']
+def fetch_event_counts(table: Optional[Any] = None, windows: int = GDELT_EXPORT_WINDOWS) -> Dict[str, Any]:
+    """
+    Disruption counts per region from the newest `windows` 15-minute GDELT event exports,
+    streamed rather than downloaded. Reused while GDELT has not published a newer file.
+    """
+    if windows <= 0:
+        return {}
+    
+    table = table or boto3.Session().resource('dynamodb').Table(os.environ['RAW_DATA_TABLE'])
+    cached = get_state(table, GDELT_EXPORT_STATE_KEY)
+    try:
+        urls = gdelt_export.export_urls('events', windows)
+    except FETCH_ERRORS + (StopIteration, ValueError) as e:
+        print(f"Error listing GDELT exports: {e}")
+        return (cached or {}).get('counts', {})
+    
+    if cached and cached.get('urls') == urls:
+        metrics.count('CacheHits', Source='gdelt-export')
+        return cached['counts']
     
-    title_lower = title.lower()
+    summary = gdelt_export.fetch_export_counts(urls, 'events')
+    if not summary['files']:
+        return (cached or {}).get('counts', {})
+    
+    counts = {'regions': summary['regions'], 'files': summary['files'], 'latest': urls[0].rsplit('/', 1)[-1].split('.')[0]}
+    # A window with a failed file is retried on the next run rather than cached short
+    if summary['files'] == len(urls):
+        put_state(table, GDELT_EXPORT_STATE_KEY, {'urls': urls, 'counts': counts})
+    return counts
+
+def article_rank(article: Dict[str, Any]) -> Any:
+    domain = (article.get('domain') or '').lower()
+    domain = domain[4:] if domain.startswith('www.') else domain
+    authority = SOURCE_AUTHORITY.index(domain) if domain in SOURCE_AUTHORITY else len(SOURCE_AUTHORITY)
+    # seendate is YYYYMMDDTHHMMSSZ, so it sorts as a string; undated copies go last
+    return authority, article.get('seendate') or '~'
+
+def select_events(articles: List[Dict[str, Any]], default_timestamp: str) -> List[Dict[str, Any]]:
+    """
+    Collapses syndicated copies of a story into its best article (see article_rank),
+    attributes each to the keywords in its title, then takes one article per keyword in
+    turn, highest impact first, so every keyword gets a chance before any keyword gets a second.
+    """
+    by_keyword: Dict[str, List[Dict[str, Any]]] = {keyword: [] for keyword in KEYWORDS}
+    stories = dedupe(articles, source_key='domain', rank=article_rank)
+    metrics.count('DuplicatesRemoved', len(articles) - len(stories))
+    for article in stories:
+        matched = find_terms(article.get('title', ''), KEYWORD_LEXICON)
+        if matched:
+            by_keyword[matched[0]].append({
+                'title': (article.get('title') or 'Unknown Event')[:100],
+                'source': article.get('domain') or 'Unknown',
+                'url': article.get('url', ''),
+                'source_count': article['source_count'],
+                'keyword': matched[0],
+                'keywords': matched,
+                'entities': tag(article.get('title', '')),
+                'impact_level': classify(article.get('title', ''))['impact_level'],
+                'timestamp': article.get('seendate') or default_timestamp
+            })
     
-    if any(word in title_lower for word in high_impact_words):
-        return 'HIGH'
-    elif any(word in title_lower for word in medium_impact_words):
-        return 'MEDIUM'
-    else:
-        return 'LOW'
+    events = []
+    for rank in range(MAX_PER_KEYWORD):
+        candidates = [articles[rank] for articles in by_keyword.values() if rank < len(articles)]
+        candidates.sort(key=lambda event: IMPACT_ORDER[event['impact_level']])
+        events.extend(candidates[:MAX_EVENTS - len(events)])
+    return events
 
 def _get_mock_events() -> List[Dict[str, Any]]:
     return [
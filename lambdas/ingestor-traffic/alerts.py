@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import heapq
+import re
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import roads
+from dedup import normalize_title
+
+SEVERITY_RANK = {'major': 2, 'moderate': 1}
+
+# A selection is a min-heap of [score, sequence, key, alert] holding at most `k` alerts, plus
+# each held alert's entry by key. The weakest alert sits at the root, so deciding whether a
+# new one makes the cut is one comparison and admitting it is O(log k).
+Selection = Dict[str, Any]
+
+def normalize_alert(source: str, state: str, road_name: Optional[str], description: str, severity: str,
+                    updated: Any = None) -> Dict[str, Any]:
+    """
+    Maps one provider event onto the canonical alert. Route, direction and milepost come
+    from the road name when the provider has one and from the description otherwise, so the
+    same incident reads alike whichever feed reported it.
+    """
+    ref = roads.extract(description)
+    if road_name:
+        ref = roads.merge(roads.extract(road_name), ref)
+    road, direction = ref['road'], ref['direction']
+    if road:
+        location = f"{road} {direction} - {state}" if direction else f"{road} - {state}"
+    else:
+        location = f"{road_name} - {state}" if road_name else f"{state} Highway"
+    timestamp = parse_timestamp(updated)
+    return {
+        'id': alert_key(state, road or road_name, direction, ref['milepost'], description),
+        'location': location,
+        'road': road,
+        'route_type': ref['route_type'],
+        'direction': direction,
+        'milepost': ref['milepost'],
+        'state': state,
+        'reason': description[:80],
+        'severity': severity.lower(),
+        'updated': datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ') if timestamp else None,
+        'sources': [source],
+    }
+
+def alert_key(state: str, road: Optional[str], direction: Optional[str], milepost: Optional[float],
+              description: str) -> str:
+    """
+    Stable across providers and runs. An alert placed by route and milepost is keyed by where
+    it is, to the mile, since feeds word the same incident differently; otherwise by its
+    normalized description.
+    """
+    if road and milepost is not None:
+        return f"{state}:{road}:{direction or ''}:mp{int(milepost)}"
+    text = normalize_title(description)
+    return f"{state}:{road or ''}:{direction or ''}:{zlib.crc32(text.encode()):08x}"
+
+def parse_timestamp(value: Any) -> Optional[float]:
+    """ Epoch seconds from ISO 8601 strings, epoch seconds or milliseconds, or '/Date(ms)/'. """
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        digits = re.fullmatch(r'/Date\((\d+)[^)]*\)/', value)
+        if digits:
+            value = int(digits.group(1))
+        elif value.isdigit():
+            value = int(value)
+        else:
+            try:
+                parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+            except ValueError:
+                return None
+            return (parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)).timestamp()
+    if isinstance(value, (int, float)):
+        return value / 1000 if value > 1e11 else float(value)
+    return None
+
+def score(alert: Dict[str, Any]) -> Tuple[int, float]:
+    """ Severity first, then the most recently updated; undated alerts rank last within a severity. """
+    return SEVERITY_RANK.get(alert['severity'], 0), parse_timestamp(alert.get('updated')) or 0.0
+
+def new_selection(k: int) -> Selection:
+    return {'k': k, 'heap': [], 'entries': {}, 'sequence': 0, 'offered': 0}
+
+def offer(selection: Selection, alert: Dict[str, Any]) -> None:
+    """
+    Considers one alert. A duplicate of a held alert is merged into it, keeping the higher
+    severity, the later update and every source. Otherwise the alert is admitted only if it
+    beats the weakest held one, which is then evicted.
+    """
+    selection['offered'] += 1
+    heap, entries = selection['heap'], selection['entries']
+    entry = entries.get(alert['id'])
+    if entry is not None:
+        held = entry[3]
+        if SEVERITY_RANK.get(alert['severity'], 0) > SEVERITY_RANK.get(held['severity'], 0):
+            held['severity'] = alert['severity']
+        if (parse_timestamp(alert.get('updated')) or 0) > (parse_timestamp(held.get('updated')) or 0):
+            held['updated'] = alert['updated']
+        held['sources'] = sorted(set(held['sources']) | set(alert['sources']))
+        entry[0] = score(held)
+        heapq.heapify(heap)
+        return
+
+    selection['sequence'] += 1
+    # Ties go to the alert seen first
+    entry = [score(alert), -selection['sequence'], alert['id'], alert]
+    if len(heap) < selection['k']:
+        heapq.heappush(heap, entry)
+    elif entry[:2] > heap[0][:2]:
+        del entries[heapq.heapreplace(heap, entry)[2]]
+    else:
+        return
+    entries[alert['id']] = entry
+
+def merge(selection: Selection, other: Selection) -> None:
+    for entry in sorted(other['heap'], key=lambda entry: entry[:2], reverse=True):
+        offer(selection, entry[3])
+    selection['offered'] += other['offered'] - len(other['heap'])
+
+def selected(selection: Selection) -> List[Dict[str, Any]]:
+    """ Held alerts, strongest first. """
+    return [entry[3] for entry in sorted(selection['heap'], key=lambda entry: entry[:2], reverse=True)]
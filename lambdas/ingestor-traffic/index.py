@@ -1,54 +1,53 @@
 
 import json
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 import boto3
+import metrics
+from fetcher import load_latency_history, save_latency_history, start_budget
 from news_fetcher import get_news_items
-from traffic_apis import (
-    fetch_sf_bay_511_alerts,
-    fetch_az_511_alerts,
-    fetch_utah_511_alerts,
-    fetch_ny_511_alerts
-)
+from raw_store import put_module_data
+from run_tracker import record_completion, trigger_aggregation_if_ready
+from state_store import get_state, put_state
+from traffic_apis import fetch_all_alerts
 
 dynamodb = boto3.resource('dynamodb')
 table = dynamodb.Table(os.environ['RAW_DATA_TABLE'])
 
+# Incidents seen by recent runs, alert id -> [first seen, last seen]: date = 'state', module = 'traffic#alerts'
+ALERT_STATE_KEY = 'traffic#alerts'
+ALERT_MEMORY_HOURS = 24
+
+@metrics.instrumented('traffic')
 def handler(event, context):
+    started_at = datetime.utcnow()
+    start_budget(context)
     today = datetime.utcnow().strftime('%Y-%m-%d')
-    traffic_data = fetch_traffic_alerts()
+    load_latency_history(table)
+    with metrics.timer('FetchTime'):
+        traffic_data = fetch_traffic_alerts()
+    
+    with metrics.timer('StorageTime'):
+        put_module_data(table, today, 'traffic', traffic_data)
     
-    table.put_item(Item={
-        'date': today,
-        'module': 'traffic',
-        'data': json.dumps(traffic_data),
-        'timestamp': datetime.utcnow().isoformat()
-    })
+    record_completion(table, today, 'traffic', 'ok', started_at)
+    trigger_aggregation_if_ready(table, today)
     
+    save_latency_history(table)
     return {'statusCode': 200, 'body': json.dumps('Traffic data ingested')}
 
 def fetch_traffic_alerts():
-    sf_bay_511_key = os.environ.get('TRAFFIC_511_KEY')
-    az_511_key = os.environ.get('AZ_511_KEY')
-    utah_511_key = os.environ.get('UTAH_511_KEY')
-    ny_511_key = os.environ.get('NY_511_KEY')
-    
-    alerts = []
-    
-    if sf_bay_511_key:
-        alerts.extend(fetch_sf_bay_511_alerts(sf_bay_511_key))
-    if az_511_key:
-        alerts.extend(fetch_az_511_alerts(az_511_key))
-    if utah_511_key:
-        alerts.extend(fetch_utah_511_alerts(utah_511_key))
-    if ny_511_key:
-        alerts.extend(fetch_ny_511_alerts(ny_511_key))
+    # Every provider in traffic_apis.PROVIDERS with its key set is queried concurrently
+    alerts, failed = fetch_all_alerts()
+    metrics.count('ProvidersFailed', len(failed))
+    if alerts:
+        remember_alerts(alerts)
     
     if not alerts:
         alerts = [
-            {'location': 'I-95 North - VA', 'reason': 'Construction delays', 'severity': 'moderate'},
-            {'location': 'I-10 East - TX', 'reason': 'Heavy traffic', 'severity': 'low'},
-            {'location': 'I-80 West - NE', 'reason': 'Weather delays', 'severity': 'moderate'}
+            {'location': 'I-95 North - VA', 'road': 'I-95', 'state': 'VA', 'reason': 'Construction delays', 'severity': 'moderate'},
+            {'location': 'I-10 East - TX', 'road': 'I-10', 'state': 'TX', 'reason': 'Heavy traffic', 'severity': 'low'},
+            {'location': 'I-80 West - NE', 'road': 'I-80', 'state': 'NE', 'reason': 'Weather delays', 'severity': 'moderate'}
         ]
     
     news = get_news_items('https://www.ttnews.com/rss/trucking', 3) or [
@@ -57,3 +56,26 @@ def fetch_traffic_alerts():
     ]
     return {'alerts': alerts, 'news': news}
 
+def remember_alerts(alerts):
+    """
+    Stamps each alert with when its incident was first reported. Alert ids are stable across
+    providers and runs, so an incident still open from an earlier run keeps its original
+    first_seen rather than reading as new.
+    """
+    now = datetime.utcnow()
+    cutoff = (now - timedelta(hours=ALERT_MEMORY_HOURS)).isoformat()
+    now = now.isoformat()
+    seen = {
+        alert_id: times for alert_id, times in (get_state(table, ALERT_STATE_KEY) or {}).items()
+        if times[1] >= cutoff
+    }
+    
+    new = 0
+    for alert in alerts:
+        first_seen = seen.get(alert['id'], [now])[0]
+        new += first_seen == now
+        alert['first_seen'] = first_seen
+        seen[alert['id']] = [first_seen, now]
+    
+    metrics.count('AlertsNew', new)
+    put_state(table, ALERT_STATE_KEY, seen)
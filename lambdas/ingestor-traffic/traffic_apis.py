@@ -1,104 +1,209 @@
-import json
+from __future__ import annotations
+
+import contextvars
 import os
-import urllib.request
-
-def fetch_sf_bay_511_alerts(api_key):
-    """ Fetches traffic alerts from the 511 SF Bay API. """
-    alerts = []
-    try:
-        url = f"http://api.511.org/traffic/events?api_key={api_key}&format=json"
-        req = urllib.request.Request(url)
-        with urllib.request.urlopen(req, timeout=10) as response:
-            data = json.loads(response.read())
-            events = data.get('events', [])
-            for event in events[:10]:
-                severity = event.get('severity', 'Unknown')
-                if severity in ['Major', 'Moderate']:
-                    headline = event.get('headline', 'Traffic incident')
-                    # Extract highway and direction from headline
-                    location = 'CA Highway'
-                    if 'I-' in headline:
-                        parts = headline.split('I-')[1].split()[0:2]
-                        location = f"I-{' '.join(parts)} - CA"
-                    elif 'US-' in headline:
-                        parts = headline.split('US-')[1].split()[0:2]
-                        location = f"US-{' '.join(parts)} - CA"
-                    elif 'SR-' in headline:
-                        parts = headline.split('SR-')[1].split()[0:2]
-                        location = f"SR-{' '.join(parts)} - CA"
-                    
-                    alerts.append({
-                        'location': location,
-                        'reason': headline[:80],
-                        'severity': severity.lower()
-                    })
-    except Exception as e:
-        print(f"API request failed for url: {url} with error: {e}")
-    return alerts
-
-def fetch_az_511_alerts(api_key):
-    """ Fetches traffic alerts from the AZ511 API. """
-    alerts = []
-    if not api_key:
-        return alerts
-    try:
-        url = f"https://az511.com/api/v1/events?apiKey={api_key}"
-        req = urllib.request.Request(url)
-        with urllib.request.urlopen(req, timeout=10) as response:
-            data = json.loads(response.read())
-            events = data.get('results', [])
-            for event in events:
-                if event.get('Severity') in ['Major', 'Moderate']:
-                    alerts.append({
-                        'location': f"{event.get('RoadName')} - AZ",
-                        'reason': event.get('Description'),
-                        'severity': event.get('Severity').lower()
-                    })
-    except Exception as e:
-        print(f"API request failed for url: {url} with error: {e}")
-    return alerts
-
-def fetch_utah_511_alerts(api_key):
-    """ Fetches traffic alerts from the UDOT Traffic API. """
-    alerts = []
-    if not api_key:
-        return alerts
-    try:
-        url = f"https://www.udottraffic.utah.gov/api/v2/get/alerts"
-        headers = {'x-api-key': api_key}
-        req = urllib.request.Request(url, headers=headers)
-        with urllib.request.urlopen(req, timeout=10) as response:
-            data = json.loads(response.read())
-            events = data.get('Alerts', [])
-            for event in events:
-                if event.get('properties', {}).get('severity') in ['Major', 'Moderate']:
-                    properties = event.get('properties', {})
-                    alerts.append({
-                        'location': f"{properties.get('roadName')} - UT",
-                        'reason': properties.get('description'),
-                        'severity': properties.get('severity').lower()
-                    })
-    except Exception as e:
-        print(f"API request failed for url: {url} with error: {e}")
-    return alerts
-
-def fetch_ny_511_alerts(api_key):
-    """ Fetches traffic alerts from the 511NY API. """
-    alerts = []
-    if not api_key:
-        return alerts
-    try:
-        url = f"https://511ny.org/api/getevents?key={api_key}&format=json"
-        req = urllib.request.Request(url)
-        with urllib.request.urlopen(req, timeout=10) as response:
-            data = json.loads(response.read())
-            for event in data:
-                if event.get('Severity') in ['Major', 'Moderate']:
-                    alerts.append({
-                        'location': f"{event.get('RoadwayName')} - NY",
-                        'reason': event.get('Description'),
-                        'severity': event.get('Severity').lower()
-                    })
-    except Exception as e:
-        print(f"API request failed for url: {url} with error: {e}")
-    return alerts
\ No newline at end of file
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlencode
+
+import metrics
+from alerts import Selection, merge, new_selection, normalize_alert, offer, selected
+from fetcher import fetch_json, remaining_time, set_deadline
+
+SEVERE = {'Major', 'Moderate'}
+# Pages followed per provider at most, whatever the upstream says
+MAX_PAGES = 10
+PROVIDER_DEADLINE_SECONDS = float(os.environ.get('TRAFFIC_PROVIDER_DEADLINE_SECONDS', '15'))
+# Alerts kept per run, however many incidents the providers return
+MAX_ALERTS = int(os.environ.get('TRAFFIC_MAX_ALERTS', '10'))
+
+# One entry per state DOT 511 feed. Adding a state is a new entry, not new code:
+#   key_env     environment variable holding the API key; providers without one are skipped
+#   url         events endpoint
+#   auth        ('query', param) or ('header', name): where the key goes
+#   params      fixed query parameters
+#   records     dotted path to the event list in the response, None when the response is the list
+#   pagination  None, ('next_url', dotted path to the next page's URL)
+#               or ('offset', offset param, limit param, page size)
+#   fields      dotted paths of road, description, severity and last update in each event; a
+#               road of None derives the route from the description
+#   deadline    seconds this provider may take, overriding PROVIDER_DEADLINE_SECONDS (optional)
+PROVIDERS: Dict[str, Dict[str, Any]] = {
+    'sf-bay': {
+        'state': 'CA',
+        'key_env': 'TRAFFIC_511_KEY',
+        'url': 'http://api.511.org/traffic/events',
+        'auth': ('query', 'api_key'),
+        'params': {'format': 'json'},
+        'records': 'events',
+        'pagination': ('next_url', 'pagination.next_url'),
+        'fields': {'road': None, 'description': 'headline', 'severity': 'severity', 'updated': 'updated'},
+    },
+    'az': {
+        'state': 'AZ',
+        'key_env': 'AZ_511_KEY',
+        'url': 'https://az511.com/api/v1/events',
+        'auth': ('query', 'apiKey'),
+        'params': {},
+        'records': 'results',
+        'pagination': None,
+        'fields': {'road': 'RoadName', 'description': 'Description', 'severity': 'Severity', 'updated': 'LastUpdated'},
+    },
+    'utah': {
+        'state': 'UT',
+        'key_env': 'UTAH_511_KEY',
+        'url': 'https://www.udottraffic.utah.gov/api/v2/get/alerts',
+        'auth': ('header', 'x-api-key'),
+        'params': {},
+        'records': 'Alerts',
+        'pagination': None,
+        'fields': {
+            'road': 'properties.roadName', 'description': 'properties.description',
+            'severity': 'properties.severity', 'updated': 'properties.lastUpdated',
+        },
+    },
+    'ny': {
+        'state': 'NY',
+        'key_env': 'NY_511_KEY',
+        'url': 'https://511ny.org/api/getevents',
+        'auth': ('query', 'key'),
+        'params': {'format': 'json'},
+        'records': None,
+        'pagination': None,
+        'fields': {'road': 'RoadwayName', 'description': 'Description', 'severity': 'Severity', 'updated': 'LastUpdated'},
+    },
+}
+
+def configured_providers(providers: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Tuple[Dict[str, Any], str]]:
+    """ Providers whose API key is set, with that key. """
+    providers = PROVIDERS if providers is None else providers
+    configured = {}
+    for name, provider in providers.items():
+        api_key = os.environ.get(provider['key_env'])
+        if api_key:
+            configured[name] = (provider, api_key)
+    return configured
+
+def fetch_all_alerts(providers: Optional[Dict[str, Dict[str, Any]]] = None,
+                     top_k: int = MAX_ALERTS) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+    """
+    Queries every configured provider concurrently, each bounded by its own deadline, so
+    ingest time follows the slowest feed rather than the sum of them. Each provider streams
+    its events into its own top-k selection; those are merged, de-duplicating incidents
+    reported by more than one feed. Returns the top-k alerts, strongest first, and the
+    providers that failed or ran out of time.
+    """
+    configured = configured_providers(providers)
+    combined = new_selection(top_k)
+    failed: Dict[str, str] = {}
+    if not configured:
+        return [], failed
+
+    executor = ThreadPoolExecutor(max_workers=len(configured), thread_name_prefix='traffic')
+    started = time.monotonic()
+    futures = {}
+
+    for name, (provider, api_key) in configured.items():
+        deadline = _provider_deadline(provider)
+        ctx = contextvars.copy_context()
+        futures[name] = (executor.submit(ctx.run, _run_provider, name, provider, api_key, top_k, deadline), deadline)
+
+    for name, (future, deadline) in futures.items():
+        try:
+            merge(combined, future.result(timeout=max(0, started + deadline - time.monotonic())))
+        except FutureTimeout:
+            metrics.count('ProviderTimeouts', Source=name)
+            print(f"Traffic provider {name} missed its {deadline:.0f}s deadline")
+            failed[name] = 'deadline exceeded'
+        except Exception as e:
+            print(f"Traffic provider {name} failed: {e}")
+            failed[name] = str(e)
+
+    # Stragglers are abandoned; their requests are already clipped to the provider deadline
+    executor.shutdown(wait=False)
+    alerts = selected(combined)
+    metrics.count('AlertsDropped', combined['offered'] - len(alerts))
+    return alerts, failed
+
+def _run_provider(name: str, provider: Dict[str, Any], api_key: str, top_k: int, deadline: float) -> Selection:
+    set_deadline(deadline)
+    selection = new_selection(top_k)
+    with metrics.timer('ProviderTime', Source=name):
+        for alert in iter_provider_alerts(name, provider, api_key):
+            offer(selection, alert)
+    metrics.count('AlertsFetched', selection['offered'], Source=name)
+    return selection
+
+def _provider_deadline(provider: Dict[str, Any]) -> float:
+    deadline = provider.get('deadline', PROVIDER_DEADLINE_SECONDS)
+    remaining = remaining_time()
+    return deadline if remaining is None else max(0.0, min(deadline, remaining))
+
+def iter_provider_alerts(name: str, provider: Dict[str, Any], api_key: str) -> Iterator[Dict[str, Any]]:
+    """ Yields one provider's major and moderate events as canonical alerts, page by page. """
+    fields = provider['fields']
+    for event in iter_events(provider, api_key):
+        severity = get_field(event, fields['severity'])
+        if severity not in SEVERE:
+            continue
+        yield normalize_alert(
+            name, provider['state'],
+            get_field(event, fields['road']),
+            get_field(event, fields['description']) or 'Traffic incident',
+            severity,
+            get_field(event, fields.get('updated'))
+        )
+
+def iter_events(provider: Dict[str, Any], api_key: str) -> Iterator[Dict[str, Any]]:
+    """ Yields events page by page, following the provider's pagination. """
+    kind, auth_name = provider['auth']
+    params = dict(provider['params'])
+    headers = {}
+    if kind == 'header':
+        headers[auth_name] = api_key
+    else:
+        params[auth_name] = api_key
+
+    pagination = provider.get('pagination')
+    url: Optional[str] = f"{provider['url']}?{urlencode(params)}" if params else provider['url']
+    offset = 0
+    for page in range(MAX_PAGES):
+        if pagination and pagination[0] == 'offset':
+            _, offset_param, limit_param, page_size = pagination
+            url = f"{provider['url']}?{urlencode({**params, offset_param: offset, limit_param: page_size})}"
+        try:
+            data = fetch_json(url, headers=headers or None, timeout=provider.get('timeout', 10))
+        except Exception as e:
+            # A failed first page fails the provider; a later one keeps the pages already read
+            if not page:
+                raise
+            print(f"API request failed for url: {provider['url']} with error: {e}")
+            return
+        events = get_field(data, provider['records']) if provider['records'] else data
+        events = events or []
+        yield from events
+
+        if not pagination:
+            return
+        if pagination[0] == 'next_url':
+            url = get_field(data, pagination[1])
+            # Open511 next links omit the key
+            if url and kind == 'query' and f'{auth_name}=' not in url:
+                url = f"{url}{'&' if '?' in url else '?'}{urlencode({auth_name: api_key})}"
+            if not url:
+                return
+        else:
+            if len(events) < pagination[3]:
+                return
+            offset += len(events)
+
+def get_field(record: Any, path: Optional[str]) -> Any:
+    """ Follows a dotted path through nested dicts; None when any step is missing. """
+    if not path:
+        return None
+    for key in path.split('.'):
+        if not isinstance(record, dict):
+            return None
+        record = record.get(key)
+    return record
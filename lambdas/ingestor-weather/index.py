@@ -2,8 +2,12 @@ import json
 import os
 from datetime import datetime
 import boto3
-import urllib.request
+import metrics
+from fetcher import fetch_json, load_latency_history, save_latency_history, start_budget
+from keywords import compile_terms, find_terms
 from news_fetcher import get_news_items
+from raw_store import put_module_data
+from run_tracker import record_completion, trigger_aggregation_if_ready
 
 dynamodb = boto3.resource('dynamodb')
 table = dynamodb.Table(os.environ['RAW_DATA_TABLE'])
@@ -21,18 +25,24 @@ WEATHER_POINTS = [
 
 SEVERE_ALERT_TYPES = ['Winter Storm', 'Blizzard', 'Ice Storm', 'Flood', 'Flash Flood', 
                       'Tornado', 'Hurricane', 'High Wind', 'Extreme Cold', 'Heat']
+SEVERE_ALERT_LEXICON = compile_terms(dict.fromkeys(SEVERE_ALERT_TYPES))
 
+@metrics.instrumented('weather')
 def handler(event, context):
+    started_at = datetime.utcnow()
+    start_budget(context)
     today = datetime.utcnow().strftime('%Y-%m-%d')
-    weather_data = fetch_weather_forecasts()
+    load_latency_history(table)
+    with metrics.timer('FetchTime'):
+        weather_data = fetch_weather_forecasts()
     
-    table.put_item(Item={
-        'date': today,
-        'module': 'weather',
-        'data': json.dumps(weather_data),
-        'timestamp': datetime.utcnow().isoformat()
-    })
+    with metrics.timer('StorageTime'):
+        put_module_data(table, today, 'weather', weather_data)
     
+    record_completion(table, today, 'weather', 'ok', started_at)
+    trigger_aggregation_if_ready(table, today)
+    
+    save_latency_history(table)
     return {'statusCode': 200, 'body': json.dumps('Weather data ingested')}
 
 def fetch_weather_forecasts():
@@ -42,17 +52,17 @@ def fetch_weather_forecasts():
     for point in WEATHER_POINTS:
         try:
             url = f"https://api.open-meteo.com/v1/forecast?latitude={point['lat']}&longitude={point['lon']}&daily=weathercode,precipitation_sum,temperature_2m_max,temperature_2m_min&timezone=auto&forecast_days=3"
+            data = fetch_json(url, timeout=5)
+            condition = analyze_weather(data, point, nws_alerts)
             
-            with urllib.request.urlopen(url, timeout=5) as response:
-                data = json.loads(response.read())
-                condition = analyze_weather(data, point, nws_alerts)
-                
-                if condition:
-                    forecasts.append({
-                        'corridor': point['name'],
-                        'condition': condition['text'],
-                        'severity': condition['severity']
-                    })
+            if condition:
+                forecasts.append({
+                    'corridor': point['name'],
+                    'condition': condition['text'],
+                    'severity': condition['severity'],
+                    'state': point['state'],
+                    'coordinates': {'lat': point['lat'], 'lon': point['lon']}
+                })
         except Exception as e:
             print(f"Error fetching weather for {point['name']}: {e}")
     
@@ -89,24 +99,21 @@ def fetch_weather_forecasts():
 def fetch_nws_alerts():
     try:
         url = 'https://api.weather.gov/alerts/active?status=actual'
-        req = urllib.request.Request(url, headers={'User-Agent': 'LogisticsBriefing/1.0'})
+        data = fetch_json(url, headers={'User-Agent': 'LogisticsBriefing/1.0'}, timeout=10, hedge=True)
+        alerts = {}
         
-        with urllib.request.urlopen(req, timeout=10) as response:
-            data = json.loads(response.read())
-            alerts = {}
-            
-            for feature in data.get('features', []):
-                props = feature.get('properties', {})
-                event = props.get('event', '')
-                
-                if any(severe in event for severe in SEVERE_ALERT_TYPES):
-                    for area in props.get('areaDesc', '').split(';'):
-                        state = area.strip().split(',')[-1].strip() if ',' in area else ''
-                        if state not in alerts:
-                            alerts[state] = []
-                        alerts[state].append(event)
+        for feature in data.get('features', []):
+            props = feature.get('properties', {})
+            event = props.get('event', '')
             
-            return alerts
+            if find_terms(event, SEVERE_ALERT_LEXICON):
+                for area in props.get('areaDesc', '').split(';'):
+                    state = area.strip().split(',')[-1].strip() if ',' in area else ''
+                    if state not in alerts:
+                        alerts[state] = []
+                    alerts[state].append(event)
+        
+        return alerts
     except Exception as e:
         print(f"NWS alerts error: {e}")
         return {}
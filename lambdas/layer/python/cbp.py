@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+CBP_WAIT_TIMES_URL = 'https://bwt.cbp.gov/api/waitTimes'
+
+# Lane states that carry no usable delay
+CLOSED_STATES = {'lanes closed', 'closed'}
+NO_DATA_STATES = {'update pending', 'n/a', ''}
+
+def index_ports(ports: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """ CBP's port list keyed by port_number ('380001' = Ambassador Bridge), built in one pass. """
+    index: Dict[str, Dict[str, Any]] = {}
+    for port in ports:
+        number = str(port.get('port_number') or '').strip()
+        if number:
+            index[number] = port
+    return index
+
+def lane_delay(lane: Optional[Dict[str, Any]]) -> Optional[int]:
+    """ Minutes of delay on one lane type; None when the lanes are closed or not reporting. """
+    if not isinstance(lane, dict):
+        return None
+    state = (lane.get('operational_status') or '').strip().lower()
+    if state == 'no delay':
+        return 0
+    if state in CLOSED_STATES or state in NO_DATA_STATES:
+        return None
+    try:
+        return int(lane.get('delay_minutes'))
+    except (TypeError, ValueError):
+        return None
+
+def commercial_lanes(port: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Commercial-vehicle delays for a port: standard and FAST lanes, lanes open, and the state
+    CBP reports ('open', 'closed' or 'no data'). The headline wait is the standard lanes',
+    falling back to FAST where only FAST is reported.
+    """
+    lanes = port.get('commercial_vehicle_lanes') or {}
+    standard = lanes.get('standard_lanes') or {}
+    standard_wait = lane_delay(standard)
+    fast_wait = lane_delay(lanes.get('FAST_lanes'))
+    lane_state = (standard.get('operational_status') or '').strip().lower()
+
+    if (port.get('port_status') or '').strip().lower() == 'closed' or lane_state in CLOSED_STATES:
+        state = 'closed'
+    elif standard_wait is None and fast_wait is None:
+        state = 'no data'
+    else:
+        state = 'open'
+
+    try:
+        lanes_open = int(standard.get('lanes_open'))
+    except (TypeError, ValueError):
+        lanes_open = None
+    return {
+        'commercial_wait': standard_wait if standard_wait is not None else fast_wait,
+        'fast_wait': fast_wait,
+        'lanes_open': lanes_open,
+        'lane_state': state,
+    }
+
+def feed_updated(ports: List[Dict[str, Any]]) -> Optional[str]:
+    """ The newest port report time in the feed, the same way port_updated() formats it. """
+    return max((port_updated(port) or '' for port in ports if isinstance(port, dict)), default='') or None
+
+def port_updated(port: Dict[str, Any]) -> Optional[str]:
+    """ The port's report time as 'YYYY-MM-DD HH:MM', in the port's local time as CBP gives it. """
+    try:
+        stamp = datetime.strptime(f"{port.get('date', '')} {port.get('time', '')}".strip(), '%m/%d/%Y %H:%M:%S')
+    except ValueError:
+        return None
+    return stamp.strftime('%Y-%m-%d %H:%M')
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, Iterable, List, Tuple
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+from raw_store import is_snapshot_key
+from run_tracker import RUN_PREFIX
+from state_store import STATE_PARTITION
+
+# Bursts are collapsed twice: the event source mapping batches records for up to its
+# batching window, and coalesce_changes() keeps only the newest image per (date, module)
+CHANGE_EVENTS = ('INSERT', 'MODIFY')
+
+_deserializer = TypeDeserializer()
+_serializer = TypeSerializer()
+
+def is_stream_event(event: Any) -> bool:
+    records = event.get('Records') if isinstance(event, dict) else None
+    return bool(records) and records[0].get('eventSource') == 'aws:dynamodb'
+
+def coalesce_changes(event: Dict[str, Any]) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """
+    Reduces a batch of raw-table stream records to the newest item per (date, module).
+    Pipeline bookkeeping (state partition, run# markers), snapshots and deletes are ignored.
+    """
+    changes: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for record in event.get('Records', []):
+        if record.get('eventName') not in CHANGE_EVENTS:
+            continue
+        image = record.get('dynamodb', {}).get('NewImage')
+        if not image:
+            continue
+
+        item = {key: _deserializer.deserialize(value) for key, value in image.items()}
+        date, module = item.get('date'), item.get('module')
+        # Snapshots duplicate the latest-pointer write, which is the one acted on
+        if (not date or not module or date == STATE_PARTITION or module.startswith(RUN_PREFIX)
+                or is_snapshot_key(module)):
+            continue
+
+        key = (date, module)
+        if key not in changes or item.get('timestamp', '') >= changes[key].get('timestamp', ''):
+            changes[key] = item
+    return changes
+
+def local_stream_event(table: Any, date: str, modules: Iterable[str]) -> Dict[str, Any]:
+    """ Builds a stream-shaped event from the items currently stored, for running the incremental path locally. """
+    records: List[Dict[str, Any]] = []
+    for module in modules:
+        item = table.get_item(Key={'date': date, 'module': module}).get('Item')
+        if item:
+            records.append(stream_record(item))
+    return {'Records': records}
+
+def stream_record(item: Dict[str, Any], event_name: str = 'MODIFY') -> Dict[str, Any]:
+    return {
+        'eventSource': 'aws:dynamodb',
+        'eventName': event_name,
+        'dynamodb': {
+            'Keys': {key: _serializer.serialize(item[key]) for key in ('date', 'module')},
+            'NewImage': {key: _serializer.serialize(value) for key, value in item.items()},
+            'StreamViewType': 'NEW_IMAGE'
+        }
+    }
+
+def item_data(item: Dict[str, Any], default: Any = None) -> Any:
+    data = item.get('data')
+    if isinstance(data, str):
+        try:
+            return json.loads(data)
+        except json.JSONDecodeError:
+            return default
+    return data if data is not None else default
@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import math
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy is not in the default layer; the pure-Python scan gives the same answers
+    np = None
+
+# Interstate polylines through the cities they connect, as (state, lat, lon) waypoints. Coarse
+# on purpose: an item is matched to a corridor within MAX_DISTANCE_KM, not to a lane.
+CORRIDORS: Dict[str, List[Tuple[str, float, float]]] = {
+    'I-2': [('TX', 26.19, -97.70), ('TX', 26.19, -98.18), ('TX', 26.22, -98.33)],
+    'I-5': [
+        ('WA', 48.99, -122.75), ('WA', 47.61, -122.33), ('OR', 45.52, -122.68), ('OR', 44.05, -123.09),
+        ('CA', 40.59, -122.39), ('CA', 38.58, -121.49), ('CA', 37.96, -121.29), ('CA', 34.94, -118.92),
+        ('CA', 34.05, -118.24), ('CA', 33.75, -117.87), ('CA', 32.72, -117.16), ('CA', 32.54, -117.03),
+    ],
+    'I-10': [
+        ('CA', 34.05, -118.24), ('CA', 33.83, -116.54), ('AZ', 33.45, -112.07), ('AZ', 32.22, -110.97),
+        ('NM', 32.31, -106.78), ('TX', 31.76, -106.49), ('TX', 30.89, -102.88), ('TX', 29.42, -98.49),
+        ('TX', 29.76, -95.37), ('LA', 30.45, -91.19), ('LA', 29.95, -90.07), ('MS', 30.37, -89.09),
+        ('AL', 30.69, -88.04), ('FL', 30.42, -87.22), ('FL', 30.44, -84.28), ('FL', 30.33, -81.66),
+    ],
+    'I-15': [
+        ('CA', 32.72, -117.16), ('CA', 34.90, -117.02), ('NV', 36.17, -115.14), ('UT', 37.10, -113.58),
+        ('UT', 40.76, -111.89), ('ID', 42.87, -112.45), ('MT', 46.00, -112.53), ('MT', 47.50, -111.30),
+        ('MT', 48.99, -111.96),
+    ],
+    'I-35': [
+        ('TX', 27.51, -99.51), ('TX', 29.42, -98.49), ('TX', 30.27, -97.74), ('TX', 32.78, -96.80),
+        ('OK', 35.47, -97.52), ('KS', 37.69, -97.34), ('MO', 39.10, -94.58), ('IA', 41.59, -93.62),
+        ('MN', 44.98, -93.27), ('MN', 46.79, -92.10),
+    ],
+    'I-40': [
+        ('CA', 34.90, -117.02), ('AZ', 35.19, -114.05), ('AZ', 35.20, -111.65), ('NM', 35.08, -106.65),
+        ('TX', 35.22, -101.83), ('OK', 35.47, -97.52), ('AR', 35.39, -94.40), ('AR', 34.75, -92.29),
+        ('TN', 35.15, -90.05), ('TN', 36.16, -86.78), ('TN', 35.96, -83.92), ('NC', 35.60, -82.55),
+        ('NC', 36.10, -80.24), ('NC', 35.78, -78.64), ('NC', 34.23, -77.94),
+    ],
+    'I-65': [
+        ('IN', 41.59, -87.35), ('IN', 39.77, -86.16), ('KY', 38.25, -85.76), ('TN', 36.16, -86.78),
+        ('AL', 33.52, -86.80), ('AL', 32.37, -86.30), ('AL', 30.69, -88.04),
+    ],
+    'I-70': [
+        ('UT', 38.60, -112.59), ('UT', 38.99, -110.16), ('CO', 39.06, -108.55), ('CO', 39.74, -104.99),
+        ('KS', 38.84, -97.61), ('KS', 39.05, -95.68), ('MO', 39.10, -94.58), ('MO', 38.63, -90.20),
+        ('IL', 39.12, -88.54), ('IN', 39.77, -86.16), ('OH', 39.96, -83.00), ('WV', 40.06, -80.72),
+        ('PA', 40.17, -80.25), ('MD', 39.64, -77.72), ('MD', 39.31, -76.74),
+    ],
+    'I-75': [
+        ('MI', 42.33, -83.05), ('OH', 41.65, -83.54), ('OH', 39.76, -84.19), ('OH', 39.10, -84.51),
+        ('KY', 38.04, -84.50), ('TN', 35.96, -83.92), ('TN', 35.05, -85.31), ('GA', 33.75, -84.39),
+        ('GA', 32.84, -83.63), ('FL', 30.19, -82.64), ('FL', 27.95, -82.46), ('FL', 26.14, -81.79),
+        ('FL', 25.93, -80.33),
+    ],
+    'I-80': [
+        ('CA', 37.77, -122.42), ('CA', 38.58, -121.49), ('NV', 39.53, -119.81), ('NV', 40.83, -115.76),
+        ('UT', 40.76, -111.89), ('WY', 41.59, -109.20), ('WY', 41.14, -104.82), ('NE', 41.12, -100.77),
+        ('NE', 40.81, -96.68), ('NE', 41.26, -95.93), ('IA', 41.59, -93.62), ('IA', 41.52, -90.58),
+        ('IL', 41.53, -88.08), ('IN', 41.59, -87.35), ('OH', 41.65, -83.54), ('OH', 41.10, -80.65),
+        ('PA', 41.12, -78.76), ('PA', 40.99, -75.19), ('NJ', 40.89, -74.01),
+    ],
+    'I-87': [('NY', 40.85, -73.90), ('NY', 42.65, -73.75), ('NY', 44.99, -73.45)],
+    'I-90': [
+        ('WA', 47.61, -122.33), ('WA', 47.66, -117.43), ('MT', 46.87, -113.99), ('MT', 45.78, -108.50),
+        ('SD', 44.08, -103.23), ('SD', 43.55, -96.73), ('MN', 43.65, -93.37), ('WI', 43.07, -89.40),
+        ('IL', 41.88, -87.63), ('IN', 41.59, -87.35), ('OH', 41.65, -83.54), ('OH', 41.50, -81.69),
+        ('PA', 42.13, -80.09), ('NY', 42.89, -78.88), ('NY', 43.16, -77.61), ('NY', 43.05, -76.15),
+        ('NY', 42.65, -73.75), ('MA', 42.36, -71.06),
+    ],
+    'I-95': [
+        ('ME', 43.66, -70.26), ('MA', 42.36, -71.06), ('RI', 41.82, -71.41), ('CT', 41.31, -72.92),
+        ('NY', 40.85, -73.90), ('NJ', 40.74, -74.17), ('PA', 39.95, -75.17), ('DE', 39.74, -75.55),
+        ('MD', 39.29, -76.61), ('VA', 37.54, -77.44), ('NC', 35.05, -78.88), ('SC', 34.20, -79.76),
+        ('GA', 32.08, -81.09), ('FL', 30.33, -81.66), ('FL', 25.76, -80.19),
+    ],
+}
+
+MAX_DISTANCE_KM = 50.0
+KM_PER_DEGREE = 111.2
+
+def build_index(corridors: Dict[str, List[Tuple[str, float, float]]]) -> Dict[str, Any]:
+    """
+    Packs every polyline's segments into flat coordinate arrays, corridor after corridor:
+    ax/ay/bx/by are the segment end points (lon, lat in degrees), `offsets[i]` the first
+    segment of roads[i], and each segment keeps the state of both of its ends.
+    """
+    index: Dict[str, Any] = {
+        'roads': [], 'offsets': array('i'), 'states': {},
+        'ax': array('d'), 'ay': array('d'), 'bx': array('d'), 'by': array('d'),
+        'start_state': [], 'end_state': [],
+    }
+    for road, waypoints in corridors.items():
+        index['roads'].append(road)
+        index['offsets'].append(len(index['ax']))
+        index['states'][road] = {state for state, _, _ in waypoints}
+        for (start_state, lat_a, lon_a), (end_state, lat_b, lon_b) in zip(waypoints, waypoints[1:]):
+            index['ax'].append(lon_a)
+            index['ay'].append(lat_a)
+            index['bx'].append(lon_b)
+            index['by'].append(lat_b)
+            index['start_state'].append(start_state)
+            index['end_state'].append(end_state)
+    if np is not None:
+        for key in ('ax', 'ay', 'bx', 'by'):
+            index[f'np_{key}'] = np.frombuffer(index[key], dtype=np.float64)
+    return index
+
+INDEX = build_index(CORRIDORS)
+
+def segment_distances(points: List[Tuple[float, float]], index: Optional[Dict[str, Any]] = None,
+                      vectorized: bool = True) -> Tuple[List[List[float]], List[List[float]]]:
+    """
+    For each (lat, lon) point, the distance in km to every segment and the position (0..1)
+    of the closest point along each segment. Longitudes are scaled by cos(lat) at the query
+    point, which is accurate to well under a percent at corridor distances. With numpy all
+    points are computed as one points x segments matrix.
+    """
+    index = INDEX if index is None else index
+    if not points:
+        return [], []
+    if vectorized and np is not None:
+        distances, positions = _distance_arrays(points, index)
+        return distances.tolist(), positions.tolist()
+
+    all_distances, all_positions = [], []
+    segments = list(zip(index['ax'], index['ay'], index['bx'], index['by']))
+    for lat, lon in points:
+        scale = math.cos(math.radians(lat))
+        px = lon * scale
+        distances, positions = [], []
+        for ax, ay, bx, by in segments:
+            ax *= scale
+            dx, dy = bx * scale - ax, by - ay
+            length = dx * dx + dy * dy
+            t = min(1.0, max(0.0, ((px - ax) * dx + (lat - ay) * dy) / length)) if length else 0.0
+            distances.append(math.hypot(ax + t * dx - px, ay + t * dy - lat) * KM_PER_DEGREE)
+            positions.append(t)
+        all_distances.append(distances)
+        all_positions.append(positions)
+    return all_distances, all_positions
+
+def _distance_arrays(points: List[Tuple[float, float]], index: Dict[str, Any]) -> Tuple[Any, Any]:
+    lats = np.array([lat for lat, _ in points])[:, None]
+    lons = np.array([lon for _, lon in points])[:, None]
+    scale = np.cos(np.radians(lats))
+    ax, ay = index['np_ax'] * scale, index['np_ay']
+    dx, dy = index['np_bx'] * scale - ax, index['np_by'] - ay
+    px = lons * scale
+    length = dx * dx + dy * dy
+    t = np.clip(((px - ax) * dx + (lats - ay) * dy) / np.where(length == 0, 1, length), 0, 1)
+    return np.hypot(ax + t * dx - px, ay + t * dy - lats) * KM_PER_DEGREE, t
+
+def nearest_segments(points: List[Tuple[float, float]], index: Optional[Dict[str, Any]] = None,
+                     max_km: float = MAX_DISTANCE_KM, vectorized: bool = True) -> List[List[Dict[str, Any]]]:
+    """
+    For each point, the closest segment of every corridor passing within max_km, nearest
+    first. The state is that of the segment end the point projects closer to.
+    """
+    index = INDEX if index is None else index
+    bounds = list(index['offsets']) + [len(index['ax'])]
+    # Per corridor: the nearest segment of each point, its distance and the position along it
+    nearest: List[Tuple[str, int, List[int], List[float], List[float]]] = []
+    if vectorized and np is not None and points:
+        matrix, positions = _distance_arrays(points, index)
+        rows = np.arange(len(points))
+        for i, road in enumerate(index['roads']):
+            start, end = bounds[i], bounds[i + 1]
+            if start < end:
+                segments = start + np.argmin(matrix[:, start:end], axis=1)
+                nearest.append((road, start, segments.tolist(), matrix[rows, segments].tolist(),
+                                positions[rows, segments].tolist()))
+    else:
+        matrix, positions = segment_distances(points, index, vectorized=False)
+        for i, road in enumerate(index['roads']):
+            start, end = bounds[i], bounds[i + 1]
+            if start < end:
+                segments = [min(range(start, end), key=distances.__getitem__) for distances in matrix]
+                nearest.append((road, start, segments, [row[j] for row, j in zip(matrix, segments)],
+                                [row[j] for row, j in zip(positions, segments)]))
+
+    results: List[List[Dict[str, Any]]] = [[] for _ in points]
+    for road, start, segments, distances, along in nearest:
+        for matches, segment, distance, position in zip(results, segments, distances, along):
+            if distance <= max_km:
+                state = index['start_state' if position < 0.5 else 'end_state'][segment]
+                matches.append({'corridor': road, 'state': state, 'segment': segment - start,
+                                'distance_km': round(distance, 1)})
+    for matches in results:
+        matches.sort(key=lambda match: match['distance_km'])
+    return results
+
+def coordinates(item: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    """ (lat, lon) from an item's `coordinates` dict or its own lat/lon keys. """
+    point = item.get('coordinates') if isinstance(item.get('coordinates'), dict) else item
+    try:
+        return float(point['lat']), float(point['lon'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def assign(items: List[Dict[str, Any]], index: Optional[Dict[str, Any]] = None,
+           max_km: float = MAX_DISTANCE_KM) -> List[List[Tuple[str, str]]]:
+    """
+    The (corridor, state) pairs each item belongs to. Geolocated items go to every corridor
+    within max_km, located together in one pass; an item with a canonical road and state
+    (a traffic alert) goes to that corridor if it runs through that state.
+    """
+    index = INDEX if index is None else index
+    points = [coordinates(item) for item in items]
+    located = iter(nearest_segments([point for point in points if point is not None], index, max_km))
+    assignments = []
+    for item, point in zip(items, points):
+        if point is not None:
+            assignments.append([(match['corridor'], match['state']) for match in next(located)])
+            continue
+        road, state = item.get('road'), item.get('state')
+        assignments.append([(road, state)] if road in index['states'] and state in index['states'][road] else [])
+    return assignments
+
+def join(items_by_kind: Dict[str, List[Dict[str, Any]]], index: Optional[Dict[str, Any]] = None,
+         max_km: float = MAX_DISTANCE_KM) -> List[Dict[str, Any]]:
+    """
+    One entry per corridor and state with something on it, listing the items of every kind
+    assigned there. Corridors where the most kinds coincide (a storm and a closure on I-10 TX)
+    come first.
+    """
+    tagged = [(kind, item) for kind, items in items_by_kind.items() for item in items if isinstance(item, dict)]
+    view: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for (kind, item), pairs in zip(tagged, assign([item for _, item in tagged], index, max_km)):
+        for corridor, state in pairs:
+            entry = view.setdefault((corridor, state), {'corridor': corridor, 'state': state,
+                                                        **{name: [] for name in items_by_kind}})
+            if item not in entry[kind]:
+                entry[kind].append(item)
+    return sorted(
+        view.values(),
+        key=lambda entry: (-sum(1 for kind in items_by_kind if entry[kind]), entry['corridor'], entry['state'])
+    )
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import re
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set
+
+# Near-duplicate titles: character shingles, a one-permutation MinHash signature per title and
+# LSH bands over it. Only titles sharing a band are compared, so clustering stays linear.
+SHINGLE_SIZE = 4
+SIGNATURE_BITS = 5
+SIGNATURE_SIZE = 1 << SIGNATURE_BITS
+BANDS = 8
+ROWS = SIGNATURE_SIZE // BANDS
+THRESHOLD = 0.6
+# Members of one LSH bucket a new title is verified against before it gives up on that band.
+# This caps the work on crowded buckets at the cost of recall: a duplicate that only
+# collides past the first MAX_BUCKET_CHECKS members of every band it shares is missed.
+# Eight bands make that unlikely for headline-sized batches, but not impossible.
+MAX_BUCKET_CHECKS = 8
+
+EMPTY_BIN = 1 << 32
+DENSIFY_OFFSET = 0x9E3779B1
+
+# Trailing " - Reuters" / " | AP News" bylines added by syndicators
+SOURCE_SUFFIX = re.compile(r'\s+[-|–—]\s+[^-|–—]{2,40}$')
+NON_ALPHANUMERIC = re.compile(r'[^a-z0-9]+')
+
+def normalize_title(title: str) -> str:
+    return NON_ALPHANUMERIC.sub(' ', SOURCE_SUFFIX.sub('', title.strip()).lower()).strip()
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[int]:
+    if len(text) <= size:
+        return {zlib.crc32(text.encode())}
+    return {zlib.crc32(text[i:i + size].encode()) for i in range(len(text) - size + 1)}
+
+def signature(hashes: Set[int]) -> List[int]:
+    """
+    One-permutation MinHash: the low bits of each shingle hash pick a bin and the rest is
+    minimised within it, so a title costs one pass over its shingles. Empty bins borrow the
+    next filled bin's value, offset by the distance, to keep signatures comparable.
+    """
+    bins = [EMPTY_BIN] * SIGNATURE_SIZE
+    for value in hashes:
+        index = value & (SIGNATURE_SIZE - 1)
+        value >>= SIGNATURE_BITS
+        if value < bins[index]:
+            bins[index] = value
+
+    if EMPTY_BIN in bins and hashes:
+        filled = list(bins)
+        for i in range(SIGNATURE_SIZE):
+            if filled[i] != EMPTY_BIN:
+                continue
+            distance = 1
+            while filled[(i + distance) % SIGNATURE_SIZE] == EMPTY_BIN:
+                distance += 1
+            bins[i] = (filled[(i + distance) % SIGNATURE_SIZE] + distance * DENSIFY_OFFSET) & 0xFFFFFFFF
+    return bins
+
+def jaccard(a: Set[int], b: Set[int]) -> float:
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+def cluster_titles(titles: Sequence[str], threshold: float = THRESHOLD) -> List[List[int]]:
+    """
+    Groups near-duplicate titles. Returns clusters of indexes, each in input order, ordered
+    by their first member. Candidate pairs come from LSH buckets and are confirmed by the
+    exact Jaccard similarity of their shingle sets.
+    """
+    parent = list(range(len(titles)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i: int, j: int) -> None:
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    exact: Dict[str, int] = {}
+    buckets: Dict[Any, List[int]] = {}
+    shingle_sets: List[Set[int]] = []
+
+    for i, title in enumerate(titles):
+        normalized = normalize_title(title)
+        shingle_sets.append(shingles(normalized))
+        # Verbatim syndication is the common case and needs no hashing at all
+        if normalized in exact:
+            union(i, exact[normalized])
+            continue
+        exact[normalized] = i
+
+        bins = signature(shingle_sets[i])
+        checked = set()
+        for band in range(BANDS):
+            members = buckets.setdefault((band, *bins[band * ROWS:(band + 1) * ROWS]), [])
+            for j in members[:MAX_BUCKET_CHECKS]:
+                # A pair colliding in several bands is verified once
+                if j not in checked and find(i) != find(j):
+                    checked.add(j)
+                    if jaccard(shingle_sets[i], shingle_sets[j]) >= threshold:
+                        union(i, j)
+            members.append(i)
+
+    clusters: Dict[int, List[int]] = {}
+    for i in range(len(titles)):
+        clusters.setdefault(find(i), []).append(i)
+    return list(clusters.values())
+
+def dedupe(items: List[Dict[str, Any]], title_key: str = 'title', source_key: Optional[str] = 'source',
+           rank: Optional[Callable[[Dict[str, Any]], Any]] = None,
+           threshold: float = THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    Keeps one representative per cluster of near-duplicate items, in the order clusters
+    first appear. The representative is the first member, or the lowest `rank`. With a
+    source_key, it is returned as a copy carrying `source_count`, the number of distinct
+    sources that ran the story.
+    """
+    results = []
+    for members in cluster_titles([item.get(title_key) or '' for item in items], threshold):
+        best = min(members, key=lambda i: (rank(items[i]), i)) if rank else members[0]
+        if source_key is None:
+            results.append(items[best])
+            continue
+        sources = {items[i].get(source_key) or i for i in members}
+        results.append({**items[best], 'source_count': len(sources)})
+    return results
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from fetcher import fetch_json
+
+EIA_GASOLINE_DIESEL_URL = 'https://api.eia.gov/v2/petroleum/pri/gnd/data/'
+# EIA v2 returns at most 5000 rows per request
+MAX_LENGTH = 5000
+
+# Weekly retail products: EPD2D = No. 2 diesel, EPMR = regular gasoline
+PRODUCTS = {'EPD2D': 'diesel', 'EPMR': 'national_avg'}
+
+def build_url(api_key: str, products: List[str], duoareas: List[str], start: Optional[str] = None,
+              end: Optional[str] = None, offset: int = 0, length: int = MAX_LENGTH,
+              direction: str = 'asc') -> str:
+    # EIA expects repeated bracketed facet parameters, which urlencode would escape
+    parts = [f'api_key={api_key}', 'frequency=weekly', 'data[0]=value']
+    parts += [f'facets[product][]={product}' for product in products]
+    parts += [f'facets[duoarea][]={duoarea}' for duoarea in duoareas]
+    if start:
+        parts.append(f'start={start}')
+    if end:
+        parts.append(f'end={end}')
+    parts += ['sort[0][column]=period', f'sort[0][direction]={direction}', f'offset={offset}', f'length={length}']
+    return f"{EIA_GASOLINE_DIESEL_URL}?{'&'.join(parts)}"
+
+def fetch_rows(api_key: str, products: List[str], duoareas: List[str], start: Optional[str] = None,
+               end: Optional[str] = None, length: int = MAX_LENGTH, workers: int = 4,
+               timeout: float = 10) -> List[Dict[str, Any]]:
+    """
+    Pulls every row for the facets and period range. The first page reports the total,
+    then the remaining offset pages are requested concurrently.
+    """
+    first = fetch_json(build_url(api_key, products, duoareas, start, end, 0, length), timeout=timeout)
+    response = first.get('response', {})
+    rows = list(response.get('data', []))
+    total = int(response.get('total', len(rows)))
+
+    offsets = list(range(length, total, length))
+    if offsets:
+        with ThreadPoolExecutor(max_workers=min(workers, len(offsets))) as executor:
+            pages = executor.map(
+                lambda offset, ctx: ctx.run(
+                    fetch_json, build_url(api_key, products, duoareas, start, end, offset, length), timeout=timeout
+                ),
+                offsets, [contextvars.copy_context() for _ in offsets]
+            )
+            for page in pages:
+                rows.extend(page.get('response', {}).get('data', []))
+    return rows
+
+def parse_rows(rows: List[Dict[str, Any]]) -> Dict[Tuple[str, str, str], float]:
+    """ Maps (period, duoarea, product) -> value in one pass, skipping rows without a value. """
+    values: Dict[Tuple[str, str, str], float] = {}
+    for row in rows:
+        try:
+            values[(row['period'], row['duoarea'], row['product'])] = float(row['value'])
+        except (KeyError, TypeError, ValueError):
+            continue
+    return values
+
+# PADD regions plus the national average, as returned in the duoarea facet
+PADD_REGIONS = {
+    'NUS': 'us',
+    'R10': 'east_coast',
+    'R20': 'midwest',
+    'R30': 'gulf_coast',
+    'R40': 'rocky_mountain',
+    'R50': 'west_coast',
+}
+PRODUCT_NAMES = {'EPD2D': 'diesel', 'EPMR': 'gasoline'}
+
+def fetch_latest(api_key: str, products: List[str], duoareas: List[str], periods: int = 2,
+                 timeout: float = 10) -> List[Dict[str, Any]]:
+    """ Newest `periods` weeks of every product x area series in a single request. """
+    url = build_url(api_key, products, duoareas, direction='desc', length=periods * len(products) * len(duoareas))
+    return fetch_json(url, timeout=timeout).get('response', {}).get('data', [])
+
+def build_matrix(values: Dict[Tuple[str, str, str], float]) -> Tuple[Optional[str], Dict[str, Dict[str, float]]]:
+    """
+    Folds parsed rows into {region: {product: price}} keeping each series' newest period.
+    Returns the newest period seen alongside the matrix.
+    """
+    newest: Dict[Tuple[str, str], str] = {}
+    matrix: Dict[str, Dict[str, float]] = {}
+    for (period, duoarea, product), value in values.items():
+        region, name = PADD_REGIONS.get(duoarea), PRODUCT_NAMES.get(product)
+        if not region or not name or newest.get((region, name), '') > period:
+            continue
+        newest[(region, name)] = period
+        matrix.setdefault(region, {})[name] = value
+    return max(newest.values(), default=None), matrix
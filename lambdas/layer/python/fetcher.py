@@ -0,0 +1,393 @@
+from __future__ import annotations
+
+import bisect
+import contextvars
+import http.client
+import json
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+
+import metrics
+from state_store import put_state, query_state
+
+MAX_ATTEMPTS = int(os.environ.get('FETCH_MAX_ATTEMPTS', '3'))
+BACKOFF_BASE_SECONDS = 0.25
+BACKOFF_CAP_SECONDS = 4.0
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get('BREAKER_FAILURE_THRESHOLD', '5'))
+BREAKER_COOLDOWN_SECONDS = float(os.environ.get('BREAKER_COOLDOWN_SECONDS', '60'))
+
+# Time kept back from the Lambda timeout so handlers can always write what they have
+WRITE_RESERVE_MS = int(os.environ.get('WRITE_RESERVE_MS', '3000'))
+
+# Hedging: duplicate a slow request once it outlives the host's observed p90 latency
+HEDGE_BUDGET = int(os.environ.get('HEDGE_BUDGET', '10'))
+HEDGE_PERCENTILE = 90
+HEDGE_MIN_SAMPLES = 10
+HEDGE_DEFAULT_DELAY_SECONDS = float(os.environ.get('HEDGE_DEFAULT_DELAY_SECONDS', '2.0'))
+
+# Adaptive timeouts: a percentile of the host's latency history times a safety factor, clamped
+TIMEOUT_PERCENTILE = float(os.environ.get('TIMEOUT_PERCENTILE', '99'))
+TIMEOUT_MULTIPLIER = float(os.environ.get('TIMEOUT_MULTIPLIER', '1.5'))
+TIMEOUT_FLOOR_SECONDS = float(os.environ.get('TIMEOUT_FLOOR_SECONDS', '2'))
+TIMEOUT_CEILING_SECONDS = float(os.environ.get('TIMEOUT_CEILING_SECONDS', '30'))
+MIN_LATENCY_SAMPLES = 20
+
+# Log-spaced histogram buckets (upper bounds in ms) from 10 ms to ~2 minutes
+LATENCY_BUCKETS_MS = [round(10 * 1.25 ** i, 1) for i in range(43)]
+# Once a histogram holds this many samples its counts are halved, so old runs fade out
+LATENCY_WINDOW = 1000
+LATENCY_STATE_PREFIX = 'latency#'
+
+class FetchError(Exception):
+    pass
+
+class CircuitOpenError(FetchError):
+    pass
+
+class DeadlineExceeded(FetchError):
+    pass
+
+# Everything fetch_bytes()/fetch_json() raise when an upstream fails once retries run out:
+# the breaker and budget errors above, plus the last transport error re-raised as is
+# (HTTPError is a URLError). Callers that fall back per source catch these.
+FETCH_ERRORS = (FetchError, urllib.error.URLError, OSError, http.client.HTTPException)
+
+# Absolute time.monotonic() deadline for the current invocation, None when unbounded
+_deadline: ContextVar[Optional[float]] = ContextVar('fetch_deadline', default=None)
+
+# Module-level so breaker state survives warm invocations of the same container
+_breakers: Dict[str, Dict[str, Any]] = {}
+_breaker_lock = threading.Lock()
+
+_histograms: Dict[str, List[float]] = {}
+_dirty_hosts: set = set()
+_history_loaded = False
+_latency_lock = threading.Lock()
+
+_hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='hedge')
+_hedges_remaining = HEDGE_BUDGET
+_hedge_lock = threading.Lock()
+
+def upstream_name(url: str) -> str:
+    return urlparse(url).hostname or 'unknown'
+
+def start_budget(context: Any, reserve_ms: int = WRITE_RESERVE_MS) -> None:
+    """ Derives the fetch deadline from the Lambda context and resets the hedge budget for the run. """
+    global _hedges_remaining
+    with _hedge_lock:
+        _hedges_remaining = HEDGE_BUDGET
+
+    # Local runs pass {} as the context and stay unbounded
+    get_remaining = getattr(context, 'get_remaining_time_in_millis', None)
+    if callable(get_remaining):
+        set_deadline((get_remaining() - reserve_ms) / 1000)
+    else:
+        set_deadline(None)
+
+def set_deadline(seconds: Optional[float]) -> None:
+    _deadline.set(None if seconds is None else time.monotonic() + seconds)
+
+def remaining_time() -> Optional[float]:
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+def fetch_json(url: str, headers: Optional[Dict[str, str]] = None, data: Optional[bytes] = None,
+               timeout: float = 10, attempts: int = MAX_ATTEMPTS, hedge: bool = False) -> Any:
+    """ Fetches and decodes a JSON document, recording latency, payload size and parse time per upstream. """
+    host = upstream_name(url)
+    body = fetch_bytes(url, headers=headers, data=data, timeout=timeout, attempts=attempts, hedge=hedge)
+
+    try:
+        with metrics.timer('ParseTime', Upstream=host):
+            return json.loads(body)
+    except json.JSONDecodeError:
+        metrics.count('ParseErrors', Upstream=host)
+        raise
+
+def fetch_bytes(url: str, headers: Optional[Dict[str, str]] = None, data: Optional[bytes] = None,
+                timeout: float = 10, attempts: int = MAX_ATTEMPTS, hedge: bool = False) -> bytes:
+    """
+    Fetches a URL with capped exponential backoff and full jitter, guarded by a
+    per-host circuit breaker. Every attempt's timeout is clipped to the time left
+    in the invocation budget. With hedge=True, GET requests to tail-heavy upstreams
+    are duplicated once they run past the host's p90 latency.
+    """
+    host = upstream_name(url)
+    timeout = adaptive_timeout(host, timeout)
+    # Checked before the breaker so an exhausted budget never claims a half-open trial
+    attempt_timeout = _clip_timeout(host, timeout)
+
+    if not _allow_request(host):
+        metrics.count('CircuitOpen', Upstream=host)
+        raise CircuitOpenError(f"Circuit open for {host}")
+
+    try:
+        for attempt in range(attempts):
+            if attempt:
+                attempt_timeout = _clip_timeout(host, timeout)
+
+            try:
+                if hedge and data is None:
+                    body = _hedged_request(url, headers, attempt_timeout)
+                else:
+                    body = _request(url, headers, data, attempt_timeout)
+                _record_success(host)
+                return body
+            except urllib.error.HTTPError as e:
+                metrics.count('UpstreamErrors', Upstream=host)
+                if e.code not in RETRYABLE_STATUS:
+                    # The upstream answered; a 4xx says nothing about its health
+                    _record_success(host)
+                    raise
+                error: Exception = e
+            except (urllib.error.URLError, OSError, http.client.HTTPException) as e:
+                metrics.count('UpstreamErrors', Upstream=host)
+                error = e
+
+            _record_failure(host)
+            if attempt + 1 >= attempts or not _allow_request(host):
+                raise error
+
+            delay = random.uniform(0, min(BACKOFF_CAP_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+            remaining = remaining_time()
+            if remaining is not None and delay >= remaining:
+                raise error
+
+            metrics.count('Retries', Upstream=host)
+            time.sleep(delay)
+    finally:
+        # Any exit that recorded neither outcome must not leave the breaker waiting on this trial
+        _release_trial(host)
+
+    raise FetchError(f"No attempts made for {url}")
+
+@contextmanager
+def open_stream(url: str, headers: Optional[Dict[str, str]] = None, timeout: float = 10) -> Iterator[Any]:
+    """
+    Opens a URL for incremental reads under the same circuit breaker and deadline as
+    fetch_bytes(). Not retried: a partly consumed body cannot be replayed.
+    """
+    host = upstream_name(url)
+    timeout = _clip_timeout(host, timeout)
+    if not _allow_request(host):
+        metrics.count('CircuitOpen', Upstream=host)
+        raise CircuitOpenError(f"Circuit open for {host}")
+
+    try:
+        response = urllib.request.urlopen(urllib.request.Request(url, headers=headers or {}), timeout=timeout)
+    except urllib.error.HTTPError as e:
+        metrics.count('UpstreamErrors', Upstream=host)
+        if e.code in RETRYABLE_STATUS:
+            _record_failure(host)
+        else:
+            _record_success(host)
+        raise
+    except (urllib.error.URLError, OSError, http.client.HTTPException):
+        metrics.count('UpstreamErrors', Upstream=host)
+        _record_failure(host)
+        raise
+    else:
+        _record_success(host)
+    finally:
+        _release_trial(host)
+
+    with response:
+        yield response
+
+def _request(url: str, headers: Optional[Dict[str, str]], data: Optional[bytes], timeout: float,
+             record: bool = True) -> bytes:
+    """ One request. With record=False the caller owns the latency sample (hedged requests). """
+    host = upstream_name(url)
+    req = urllib.request.Request(url, data=data, headers=headers or {})
+    start = time.perf_counter()
+
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            body = response.read()
+    except Exception as e:
+        # A timed-out attempt took at least its timeout; dropping it would bias the p99 low
+        if record and _is_timeout(e):
+            _record_latency(host, timeout * 1000)
+        raise
+
+    elapsed_ms = round((time.perf_counter() - start) * 1000, 2)
+    if record:
+        _record_latency(host, elapsed_ms)
+    metrics.put('UpstreamLatency', elapsed_ms, 'Milliseconds', Upstream=host)
+    metrics.add_bytes('PayloadBytes', len(body), Upstream=host)
+    return body
+
+def _is_timeout(error: BaseException) -> bool:
+    # urlopen raises TimeoutError on a slow read and URLError(TimeoutError) on a slow connect
+    return isinstance(error, TimeoutError) or (
+        isinstance(error, urllib.error.URLError) and isinstance(error.reason, TimeoutError))
+
+def _hedged_request(url: str, headers: Optional[Dict[str, str]], timeout: float) -> bytes:
+    """ Records a single latency sample per hedged request: the time until the caller had its answer. """
+    host = upstream_name(url)
+    delay = _hedge_delay(host)
+    if delay >= timeout:
+        return _request(url, headers, None, timeout)
+
+    start = time.perf_counter()
+    try:
+        body = _race(url, headers, timeout, delay)
+    except Exception as e:
+        if _is_timeout(e):
+            _record_latency(host, timeout * 1000)
+        raise
+    _record_latency(host, round((time.perf_counter() - start) * 1000, 2))
+    return body
+
+def _race(url: str, headers: Optional[Dict[str, str]], timeout: float, delay: float) -> bytes:
+    host = upstream_name(url)
+    # Each submission needs its own context copy so metrics keep the caller's Module dimension
+    primary = _hedge_pool.submit(contextvars.copy_context().run, _request, url, headers, None, timeout, False)
+    try:
+        return primary.result(timeout=delay)
+    except FutureTimeout:
+        pass
+
+    if not _take_hedge():
+        return primary.result()
+
+    metrics.count('HedgesIssued', Upstream=host)
+    backup = _hedge_pool.submit(contextvars.copy_context().run, _request, url, headers, None, timeout - delay, False)
+    pending = {primary, backup}
+    error: Optional[BaseException] = None
+
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                # The loser keeps running until its own timeout; its result is discarded
+                metrics.count('HedgeWins', 1 if future is backup else 0, Upstream=host)
+                return future.result()
+            error = future.exception()
+
+    raise error
+
+def _hedge_delay(host: str) -> float:
+    p90 = latency_percentile(host, HEDGE_PERCENTILE)
+    return HEDGE_DEFAULT_DELAY_SECONDS if p90 is None else p90 / 1000
+
+def _take_hedge() -> bool:
+    global _hedges_remaining
+    with _hedge_lock:
+        if _hedges_remaining <= 0:
+            return False
+        _hedges_remaining -= 1
+        return True
+
+def _record_latency(host: str, elapsed_ms: float) -> None:
+    index = bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)
+    with _latency_lock:
+        counts = _histograms.setdefault(host, [0.0] * len(LATENCY_BUCKETS_MS))
+        counts[min(index, len(counts) - 1)] += 1
+        if sum(counts) > LATENCY_WINDOW:
+            _histograms[host] = [count / 2 for count in counts]
+        _dirty_hosts.add(host)
+
+def latency_percentile(host: str, percentile: float, min_samples: int = HEDGE_MIN_SAMPLES) -> Optional[float]:
+    """ Returns the bucket bound (ms) at the given latency percentile, or None until enough samples exist. """
+    with _latency_lock:
+        counts = list(_histograms.get(host, ()))
+
+    total = sum(counts)
+    if total < min_samples:
+        return None
+
+    target = total * percentile / 100
+    running = 0.0
+    for bound, count in zip(LATENCY_BUCKETS_MS, counts):
+        running += count
+        if running >= target:
+            return bound
+    return LATENCY_BUCKETS_MS[-1]
+
+def adaptive_timeout(host: str, default: float) -> float:
+    """ Timeout in seconds learned from the host's latency history; the call-site value until history exists. """
+    observed = latency_percentile(host, TIMEOUT_PERCENTILE, MIN_LATENCY_SAMPLES)
+    if observed is None:
+        timeout = default
+    else:
+        timeout = min(TIMEOUT_CEILING_SECONDS, max(TIMEOUT_FLOOR_SECONDS, observed / 1000 * TIMEOUT_MULTIPLIER))
+
+    metrics.put('UpstreamTimeout', round(timeout * 1000), 'Milliseconds', Upstream=host)
+    return timeout
+
+def load_latency_history(table: Any) -> None:
+    """ Seeds the per-host histograms from the raw table once per container. """
+    global _history_loaded
+    if _history_loaded:
+        return
+
+    stored = query_state(table, LATENCY_STATE_PREFIX)
+    with _latency_lock:
+        for host, state in stored.items():
+            counts = state.get('counts', [])
+            if host not in _histograms and len(counts) == len(LATENCY_BUCKETS_MS):
+                _histograms[host] = counts
+        _history_loaded = True
+
+def save_latency_history(table: Any) -> None:
+    """ Persists histograms for the hosts contacted since the last save. """
+    with _latency_lock:
+        pending = {host: list(_histograms[host]) for host in _dirty_hosts}
+        _dirty_hosts.clear()
+
+    for host, counts in pending.items():
+        put_state(table, f"{LATENCY_STATE_PREFIX}{host}", {'counts': counts, 'bounds_ms': LATENCY_BUCKETS_MS})
+
+def _clip_timeout(host: str, timeout: float) -> float:
+    remaining = remaining_time()
+    if remaining is None:
+        return timeout
+    if remaining <= 0:
+        metrics.count('DeadlineExceeded', Upstream=host)
+        raise DeadlineExceeded(f"No time budget left for {host}")
+    return min(timeout, remaining)
+
+def _allow_request(host: str) -> bool:
+    with _breaker_lock:
+        breaker = _breakers.get(host)
+        if not breaker or breaker['opened_at'] is None:
+            return True
+        if time.monotonic() - breaker['opened_at'] < BREAKER_COOLDOWN_SECONDS:
+            return False
+        # Half-open: let a single trial request through, keep everyone else out
+        if breaker['trial_in_flight']:
+            return False
+        breaker['trial_in_flight'] = True
+        breaker['trial_thread'] = threading.get_ident()
+        return True
+
+def _release_trial(host: str) -> None:
+    """ Frees a half-open trial claimed by this thread that ended without a recorded outcome. """
+    with _breaker_lock:
+        breaker = _breakers.get(host)
+        if breaker and breaker['trial_in_flight'] and breaker.get('trial_thread') == threading.get_ident():
+            breaker['trial_in_flight'] = False
+
+def _record_success(host: str) -> None:
+    with _breaker_lock:
+        _breakers.pop(host, None)
+
+def _record_failure(host: str) -> None:
+    with _breaker_lock:
+        breaker = _breakers.setdefault(host, {'failures': 0, 'opened_at': None, 'trial_in_flight': False})
+        breaker['failures'] += 1
+        if breaker['trial_in_flight'] or breaker['failures'] >= BREAKER_FAILURE_THRESHOLD:
+            breaker['opened_at'] = time.monotonic()
+            breaker['trial_in_flight'] = False
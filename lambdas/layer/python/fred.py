@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlencode
+
+import boto3
+
+from fetcher import fetch_json
+
+FRED_OBSERVATIONS_URL = 'https://api.stlouisfed.org/fred/series/observations'
+# FRED caps a single observations response at 100000 rows
+MAX_LIMIT = 100000
+
+# Key economic indicators for logistics
+INDICATORS = [
+    {'series': 'UNRATE', 'name': 'Unemployment Rate', 'unit': '%'},
+    {'series': 'CPIAUCSL', 'name': 'Consumer Price Index', 'unit': 'Index'},
+    {'series': 'DCOILWTICO', 'name': 'WTI Crude Oil', 'unit': '$/barrel'},
+    {'series': 'DEXUSEU', 'name': 'USD/EUR Exchange', 'unit': 'Rate'},
+    {'series': 'INDPRO', 'name': 'Industrial Production', 'unit': 'Index'}
+]
+
+def get_api_key() -> Optional[str]:
+    """ FRED_API_KEY for local runs, otherwise the SSM parameter named by FRED_API_KEY_PARAM_NAME. """
+    if os.environ.get('FRED_API_KEY'):
+        return os.environ['FRED_API_KEY']
+    try:
+        response = boto3.Session().client('ssm').get_parameter(
+            Name=os.environ.get('FRED_API_KEY_PARAM_NAME', '/logistix/fred-api-key'),
+            WithDecryption=True
+        )
+        return response['Parameter']['Value']
+    except Exception as e:
+        print(f"Failed to get FRED API key: {e}")
+        return None
+
+def fetch_observations(api_key: str, series: str, start: Optional[str] = None, end: Optional[str] = None,
+                       limit: int = MAX_LIMIT, sort_order: str = 'asc', timeout: float = 10) -> List[Dict[str, Any]]:
+    """
+    Returns [{'date': 'YYYY-MM-DD', 'value': float}] for observation_start..observation_end,
+    following offset pages when a range exceeds one response. FRED's '.' (missing) is dropped.
+    """
+    params: Dict[str, Any] = {
+        'series_id': series,
+        'api_key': api_key,
+        'file_type': 'json',
+        'sort_order': sort_order,
+        'limit': min(limit, MAX_LIMIT),
+    }
+    if start:
+        params['observation_start'] = start
+    if end:
+        params['observation_end'] = end
+
+    observations: List[Dict[str, Any]] = []
+    offset = 0
+    while True:
+        data = fetch_json(f"{FRED_OBSERVATIONS_URL}?{urlencode({**params, 'offset': offset})}", timeout=timeout)
+        page = data.get('observations', [])
+        for observation in page:
+            if observation.get('value') not in (None, '', '.'):
+                observations.append({'date': observation['date'], 'value': float(observation['value'])})
+
+        offset += len(page)
+        if not page or len(observations) >= limit or offset >= int(data.get('count', 0)):
+            return observations[:limit]
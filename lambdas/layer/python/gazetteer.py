@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List, Optional
+
+# Entity ids are '<type>:<key>', where key is the join key the owning module already
+# publishes: ais-data port_code, border-wait-times crossing_id, air-traffic hub code,
+# interstate number as written in traffic/weather corridors, and USPS state code.
+PORTS = {
+    'USLAX': ['Port of Los Angeles', 'Los Angeles port', 'San Pedro Bay'],
+    'USLGB': ['Port of Long Beach', 'Long Beach'],
+    'USNYC': ['Port of New York', 'Port of New York and New Jersey', 'New York/New Jersey', 'Port Newark', 'Port Elizabeth'],
+    'USSAV': ['Port of Savannah', 'Savannah', 'Garden City Terminal'],
+    'USSEA': ['Port of Seattle', 'Seattle port', 'Northwest Seaport Alliance'],
+    'USHOU': ['Port of Houston', 'Houston Ship Channel', 'Barbours Cut', 'Bayport'],
+}
+
+CROSSINGS = {
+    'ambassador-bridge': ['Ambassador Bridge', 'Detroit-Windsor'],
+    'peace-bridge': ['Peace Bridge', 'Buffalo-Fort Erie'],
+    'laredo-world-trade-bridge': ['World Trade Bridge', 'Laredo', 'Nuevo Laredo'],
+    'otay-mesa': ['Otay Mesa'],
+    'pharr-international-bridge': ['Pharr International Bridge', 'Pharr', 'Pharr-Reynosa'],
+    'blue-water-bridge': ['Blue Water Bridge', 'Port Huron', 'Port Huron-Sarnia'],
+    'lewiston-bridge': ['Lewiston Bridge', 'Lewiston-Queenston', 'Queenston-Lewiston'],
+    'laredo-colombia-solidarity': ['Colombia Solidarity Bridge', 'Colombia Bridge'],
+    'ysleta': ['Ysleta-Zaragoza', 'Zaragoza Bridge', 'Ysleta Bridge'],
+    'nogales-mariposa': ['Mariposa', 'Nogales Mariposa', 'Nogales'],
+    'calexico-east': ['Calexico East', 'Calexico', 'Mexicali'],
+}
+
+HUBS = {
+    'MEM': ['Memphis', 'Memphis International', 'FedEx World Hub'],
+    'SDF': ['Louisville', 'UPS Worldport', 'Worldport'],
+    'ANC': ['Anchorage', 'Ted Stevens Anchorage'],
+    'MIA': ['Miami International'],
+}
+
+INTERSTATES = [5, 10, 15, 20, 25, 26, 35, 40, 45, 55, 64, 65, 69, 70, 75, 76, 77, 78, 80, 81, 84, 85, 87, 90, 94, 95]
+
+STATES = {
+    'AL': 'Alabama', 'AK': 'Alaska', 'AZ': 'Arizona', 'AR': 'Arkansas', 'CA': 'California',
+    'CO': 'Colorado', 'CT': 'Connecticut', 'DE': 'Delaware', 'FL': 'Florida', 'GA': 'Georgia',
+    'HI': 'Hawaii', 'ID': 'Idaho', 'IL': 'Illinois', 'IN': 'Indiana', 'IA': 'Iowa',
+    'KS': 'Kansas', 'KY': 'Kentucky', 'LA': 'Louisiana', 'ME': 'Maine', 'MD': 'Maryland',
+    'MA': 'Massachusetts', 'MI': 'Michigan', 'MN': 'Minnesota', 'MS': 'Mississippi', 'MO': 'Missouri',
+    'MT': 'Montana', 'NE': 'Nebraska', 'NV': 'Nevada', 'NH': 'New Hampshire', 'NJ': 'New Jersey',
+    'NM': 'New Mexico', 'NY': 'New York', 'NC': 'North Carolina', 'ND': 'North Dakota', 'OH': 'Ohio',
+    'OK': 'Oklahoma', 'OR': 'Oregon', 'PA': 'Pennsylvania', 'RI': 'Rhode Island', 'SC': 'South Carolina',
+    'SD': 'South Dakota', 'TN': 'Tennessee', 'TX': 'Texas', 'UT': 'Utah', 'VT': 'Vermont',
+    'VA': 'Virginia', 'WA': 'Washington', 'WV': 'West Virginia', 'WI': 'Wisconsin', 'WY': 'Wyoming',
+}
+
+# 'Washington' alone is usually the federal government, not the state
+STATE_ALIASES = {'WA': ['Washington State']}
+# Codes that are also common words or abbreviations ('LA' is Los Angeles more often than Louisiana)
+AMBIGUOUS_CODES = {'LA', 'IN', 'OR', 'ME', 'OK', 'HI'}
+
+# City names that are also teams, people or places with no freight link. They only count with
+# a logistics word within CONTEXT_WINDOW tokens, as in 'Savannah port' or 'hub in Memphis'.
+BARE_NAMES = {'Savannah', 'Long Beach', 'Laredo', 'Nuevo Laredo', 'Pharr', 'Nogales', 'Mariposa',
+              'Calexico', 'Mexicali', 'Memphis', 'Louisville', 'Anchorage'}
+CONTEXT_WORDS = {
+    'port', 'ports', 'seaport', 'terminal', 'terminals', 'dock', 'docks', 'dockworkers', 'longshoremen',
+    'harbor', 'cargo', 'container', 'containers', 'freight', 'shipping', 'shipments', 'vessels', 'ships',
+    'crossing', 'crossings', 'border', 'bridge', 'customs', 'truck', 'trucks', 'trucking', 'hub', 'airport',
+    'air', 'warehouse', 'rail', 'railyard', 'logistics', 'imports', 'exports',
+}
+CONTEXT_WINDOW = 2
+
+TOKEN = re.compile(r'[A-Za-z0-9]+')
+# Marks a trie node where an alias ends; tokens are never empty, so neither can collide
+TERMINAL = ''
+IN_CONTEXT = '?'
+
+def tokenize(text: str, codes: bool = True) -> List[str]:
+    """
+    Lowercased alphanumeric tokens. With `codes`, two-letter all-caps tokens keep their case
+    so state codes ('TX', 'NC') only match as codes, never as ordinary words.
+    """
+    return [token if codes and len(token) == 2 and token.isupper() else token.lower()
+            for token in TOKEN.findall(text or '')]
+
+def default_entities() -> Dict[str, List[str]]:
+    entities: Dict[str, List[str]] = {}
+    for code, aliases in PORTS.items():
+        entities[f'port:{code}'] = aliases
+    for crossing_id, aliases in CROSSINGS.items():
+        entities[f'crossing:{crossing_id}'] = aliases
+    for code, aliases in HUBS.items():
+        entities[f'hub:{code}'] = aliases
+    for number in INTERSTATES:
+        entities[f'interstate:I-{number}'] = [f'I-{number}', f'I{number}', f'Interstate {number}']
+    for code, name in STATES.items():
+        aliases = STATE_ALIASES.get(code, [name])
+        entities[f'state:{code}'] = aliases if code in AMBIGUOUS_CODES else aliases + [code]
+    return entities
+
+def build_index(entities: Dict[str, List[str]]) -> Dict[str, Any]:
+    """
+    Word trie over every normalized alias; each alias end lists the entity ids it names,
+    under IN_CONTEXT instead of TERMINAL for BARE_NAMES.
+    """
+    root: Dict[str, Any] = {}
+    for entity_id, aliases in entities.items():
+        for alias in aliases:
+            node = root
+            for token in tokenize(alias):
+                node = node.setdefault(token, {})
+            ids = node.setdefault(IN_CONTEXT if alias in BARE_NAMES else TERMINAL, [])
+            if entity_id not in ids:
+                ids.append(entity_id)
+    return root
+
+INDEX = build_index(default_entities())
+
+def tag(text: str, index: Optional[Dict[str, Any]] = None) -> List[str]:
+    """
+    Entity ids mentioned in the text, in order of first mention. One left-to-right pass
+    over the tokens; at each position the trie is walked for the longest alias, so
+    'Port of New York and New Jersey' is one port rather than a port plus two states.
+    Bare city names need a CONTEXT_WORDS token nearby, and state codes are ignored in
+    all-caps text, where every word looks like one.
+    """
+    index = INDEX if index is None else index
+    tokens = tokenize(text, codes=not (text or '').isupper())
+    found: Dict[str, None] = {}
+    i = 0
+    while i < len(tokens):
+        node, matched, end = index, None, i
+        for j in range(i, len(tokens)):
+            node = node.get(tokens[j])
+            if node is None:
+                break
+            ids = node.get(TERMINAL, [])
+            if IN_CONTEXT in node and _in_context(tokens, i, j + 1):
+                ids = ids + node[IN_CONTEXT]
+            if ids:
+                matched, end = ids, j + 1
+        if matched:
+            for entity_id in matched:
+                found[entity_id] = None
+            i = end
+        else:
+            i += 1
+    return list(found)
+
+def _in_context(tokens: List[str], start: int, end: int) -> bool:
+    nearby = tokens[max(0, start - CONTEXT_WINDOW):start] + tokens[end:end + CONTEXT_WINDOW]
+    return any(token in CONTEXT_WORDS for token in nearby)
+
+def tag_items(items: List[Dict[str, Any]], key: str = 'title') -> List[Dict[str, Any]]:
+    """ Adds `entities` to each item from its `key` text, in place. """
+    for item in items:
+        item['entities'] = tag(item.get(key) or '')
+    return items
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List
+from urllib.parse import urlencode
+
+from fetcher import fetch_json
+
+GDELT_DOC_URL = 'https://api.gdeltproject.org/api/v2/doc/doc'
+# The DOC API returns at most 250 articles per request
+MAX_RECORDS = 250
+# Long OR-lists are rejected by the DOC API, so keywords are split across queries above this
+MAX_QUERY_CHARS = 200
+
+def build_queries(keywords: List[str], max_chars: int = MAX_QUERY_CHARS) -> List[str]:
+    """ Packs keywords into as few `(a OR "b c" OR ...)` queries as fit within max_chars each. """
+    terms = [f'"{keyword}"' if ' ' in keyword else keyword for keyword in keywords]
+    groups: List[List[str]] = []
+    for term in terms:
+        if groups and len(' OR '.join(groups[-1] + [term])) + 2 <= max_chars:
+            groups[-1].append(term)
+        else:
+            groups.append([term])
+    # A single term must not be parenthesised
+    return [f"({' OR '.join(group)})" if len(group) > 1 else group[0] for group in groups]
+
+def build_url(query: str, start: str, end: str, max_records: int = MAX_RECORDS) -> str:
+    params = {
+        'query': query,
+        'mode': 'artlist',
+        'maxrecords': max_records,
+        'startdatetime': start,
+        'enddatetime': end,
+        'format': 'json',
+    }
+    return f"{GDELT_DOC_URL}?{urlencode(params)}"
+
+def fetch_articles(queries: List[str], start: str, end: str, max_records: int = MAX_RECORDS,
+                   timeout: float = 10) -> List[Dict[str, Any]]:
+    """ Runs each query and returns the union of their articles, de-duplicated by URL. """
+    articles: Dict[str, Dict[str, Any]] = {}
+    for query in queries:
+        data = fetch_json(build_url(query, start, end, max_records), timeout=timeout, hedge=True)
+        for article in data.get('articles', []):
+            articles.setdefault(article.get('url') or article.get('title', ''), article)
+    return list(articles.values())
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import struct
+import zipfile
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import metrics
+from fetcher import FETCH_ERRORS, fetch_bytes, open_stream
+
+GDELT_LASTUPDATE_URL = 'http://data.gdeltproject.org/gdeltv2/lastupdate.txt'
+GDELT_EXPORT_URL = 'http://data.gdeltproject.org/gdeltv2/{stamp}.{suffix}'
+EXPORT_INTERVAL_MINUTES = 15
+CHUNK_SIZE = 64 * 1024
+
+LOCAL_HEADER = struct.Struct('<IHHHHHIIIHH')
+LOCAL_HEADER_SIGNATURE = 0x04034b50
+DATA_DESCRIPTOR_FLAG = 0x08
+
+# CAMEO event codes (first three digits) that disrupt freight movements
+CAMEO_CATEGORIES = {
+    '143': 'strike',     # Conduct strike or boycott
+    '145': 'unrest',     # Protest violently, riot
+    '163': 'sanctions',  # Impose embargo, boycott, or sanctions
+    '172': 'sanctions',  # Impose administrative sanctions
+    '191': 'blockade',   # Impose blockade, restrict movement
+}
+
+# GKG themes mapped onto the same categories
+GKG_THEMES = {
+    'STRIKE': 'strike',
+    'BLOCKADE': 'blockade',
+    'SANCTIONS': 'sanctions',
+    'MARITIME_INCIDENT': 'maritime',
+    'PROTEST': 'unrest',
+}
+
+# FIPS country codes of the lanes the brief covers; US events are counted per state
+COUNTRIES = {'US', 'CA', 'MX', 'CH', 'JA', 'KS', 'TW', 'VM', 'SN', 'GM', 'NL', 'PM', 'EG'}
+
+# Column positions in the GDELT 2.0 event export (61 columns) and GKG 2.1 (27 columns)
+EVENT_CODE_COLUMN = 26
+ACTION_COUNTRY_COLUMN = 53
+ACTION_ADM1_COLUMN = 54
+GKG_THEMES_COLUMN = 7
+GKG_LOCATIONS_COLUMN = 9
+
+Classifier = Callable[[List[bytes], set], Iterable[Tuple[str, str]]]
+
+def iter_zip_lines(stream: Any, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Yields the lines of a zip's first member straight from a non-seekable stream: the
+    local header is parsed by hand and the deflate data inflated chunk by chunk, so at
+    most one chunk and one partial line are held at a time.
+    """
+    header = _read_exact(stream, LOCAL_HEADER.size)
+    signature, _, flags, method, _, _, _, compressed_size, _, name_length, extra_length = LOCAL_HEADER.unpack(header)
+    if signature != LOCAL_HEADER_SIGNATURE:
+        raise ValueError('Not a zip stream')
+    _read_exact(stream, name_length + extra_length)
+
+    if method == zipfile.ZIP_DEFLATED:
+        decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+        inflate = decompressor.decompress
+        finished = lambda: decompressor.eof
+    elif method == zipfile.ZIP_STORED and not flags & DATA_DESCRIPTOR_FLAG:
+        remaining = [compressed_size]
+        def inflate(chunk: bytes) -> bytes:
+            chunk = chunk[:remaining[0]]
+            remaining[0] -= len(chunk)
+            return chunk
+        finished = lambda: remaining[0] <= 0
+    else:
+        raise ValueError(f'Unsupported zip compression method {method}')
+
+    pending = b''
+    while not finished():
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            raise ValueError('Truncated zip stream')
+        lines = (pending + inflate(chunk)).split(b'\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line.rstrip(b'\r')
+    if pending:
+        yield pending.rstrip(b'\r')
+
+def _read_exact(stream: Any, size: int) -> bytes:
+    data = b''
+    while len(data) < size:
+        chunk = stream.read(size - len(data))
+        if not chunk:
+            raise ValueError('Truncated zip stream')
+        data += chunk
+    return data
+
+def classify_event(fields: List[bytes], countries: set) -> Iterable[Tuple[str, str]]:
+    category = CAMEO_CATEGORIES.get(fields[EVENT_CODE_COLUMN][:3].decode())
+    if not category:
+        return ()
+    country = fields[ACTION_COUNTRY_COLUMN].decode()
+    if country not in countries:
+        return ()
+    return ((_region(country, fields[ACTION_ADM1_COLUMN].decode()), category),)
+
+def classify_gkg(fields: List[bytes], countries: set) -> Iterable[Tuple[str, str]]:
+    themes = fields[GKG_THEMES_COLUMN]
+    if not themes:
+        return ()
+    categories = {GKG_THEMES[theme] for theme in themes.decode().split(';') if theme in GKG_THEMES}
+    if not categories:
+        return ()
+    # The first covered location mentioned in the document stands for it
+    for location in fields[GKG_LOCATIONS_COLUMN].decode().split(';'):
+        parts = location.split('#')
+        if len(parts) > 3 and parts[2] in countries:
+            region = _region(parts[2], parts[3])
+            return ((region, category) for category in categories)
+    return ()
+
+def _region(country: str, adm1: str) -> str:
+    return adm1 if country == 'US' and len(adm1) == 4 else country
+
+# Per export kind: file suffix, the highest column read, and the row classifier
+EXPORTS: Dict[str, Tuple[str, int, Classifier]] = {
+    'events': ('export.CSV.zip', ACTION_ADM1_COLUMN, classify_event),
+    'gkg': ('gkg.csv.zip', GKG_LOCATIONS_COLUMN, classify_gkg),
+}
+
+def aggregate_lines(lines: Iterable[bytes], kind: str = 'events', countries: Optional[set] = None) -> Dict[str, Any]:
+    """
+    Counts matching rows per region and category. Rows are split only up to the last
+    column read and only the projected fields are decoded.
+    """
+    _, last_column, classify = EXPORTS[kind]
+    countries = COUNTRIES if countries is None else countries
+    counts: Dict[str, Dict[str, int]] = {}
+    scanned = matched = 0
+
+    for line in lines:
+        scanned += 1
+        fields = line.split(b'\t', last_column + 1)
+        if len(fields) <= last_column:
+            continue
+        for region, category in classify(fields, countries):
+            matched += 1
+            region_counts = counts.setdefault(region, {})
+            region_counts[category] = region_counts.get(category, 0) + 1
+
+    return {'regions': counts, 'rows_scanned': scanned, 'rows_matched': matched}
+
+def export_urls(kind: str = 'events', windows: int = 1, timeout: float = 10) -> List[str]:
+    """ URLs of the newest `windows` 15-minute export files, newest first. """
+    suffix = EXPORTS[kind][0]
+    listing = fetch_bytes(GDELT_LASTUPDATE_URL, timeout=timeout).decode()
+    latest = next(line.split()[-1] for line in listing.splitlines() if line.endswith(suffix))
+    stamp = datetime.strptime(latest.rsplit('/', 1)[-1].split('.')[0], '%Y%m%d%H%M%S')
+    return [
+        GDELT_EXPORT_URL.format(
+            stamp=(stamp - timedelta(minutes=EXPORT_INTERVAL_MINUTES * i)).strftime('%Y%m%d%H%M%S'), suffix=suffix
+        )
+        for i in range(windows)
+    ]
+
+def fetch_export_counts(urls: List[str], kind: str = 'events', countries: Optional[set] = None,
+                        timeout: float = 30) -> Dict[str, Any]:
+    """ Streams each export file through the aggregator; a failed file is skipped, not fatal. """
+    counts: Dict[str, Dict[str, int]] = {}
+    totals = {'files': 0, 'rows_scanned': 0, 'rows_matched': 0}
+    for url in urls:
+        try:
+            with metrics.timer('ExportTime', Source=kind), open_stream(url, timeout=timeout) as response:
+                summary = aggregate_lines(iter_zip_lines(response), kind, countries)
+        except FETCH_ERRORS + (ValueError, zlib.error) as e:
+            # Includes http.client.IncompleteRead from a connection dropped mid-body
+            print(f"Error streaming {url}: {e}")
+            continue
+        # Merged only once a file has been read to the end, so a broken download adds nothing
+        for region, categories in summary['regions'].items():
+            region_counts = counts.setdefault(region, {})
+            for category, count in categories.items():
+                region_counts[category] = region_counts.get(category, 0) + count
+        totals['files'] += 1
+        totals['rows_scanned'] += summary['rows_scanned']
+        totals['rows_matched'] += summary['rows_matched']
+
+    metrics.count('ExportRowsScanned', totals['rows_scanned'], Source=kind)
+    metrics.count('ExportRowsMatched', totals['rows_matched'], Source=kind)
+    return {'regions': counts, **totals}
@@ -0,0 +1,361 @@
+from __future__ import annotations
+
+import bisect
+import io
+import json
+import math
+import os
+import re
+import struct
+import sys
+from array import array
+from datetime import date as Date
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+import metrics
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is too large for the default layer; the array format needs nothing
+    pa = None
+    pq = None
+
+# One columnar file per module per year: history/<module>/<year>.parquet (or .lxc).
+# Rows are days; the 'date' column holds proleptic ordinals (date.toordinal()).
+HISTORY_PREFIX = 'history'
+HISTORY_FORMAT = os.environ.get('HISTORY_FORMAT', 'parquet' if pq else 'array')
+EXTENSIONS = {'parquet': 'parquet', 'array': 'lxc'}
+
+# Per-module zone map: history/<module>/_manifest.json holds, per yearly partition,
+# the date span and per-column min/max/count so queries can skip partitions unread
+MANIFEST_NAME = '_manifest.json'
+
+# Predicates understood by query_history(); anything else is a plain callable and cannot prune
+PREDICATES = {
+    '>': lambda value, bound: value > bound,
+    '>=': lambda value, bound: value >= bound,
+    '<': lambda value, bound: value < bound,
+    '<=': lambda value, bound: value <= bound,
+    '==': lambda value, bound: value == bound,
+    'between': lambda value, bound: bound[0] <= value <= bound[1],
+}
+
+# .lxc layout: magic, uint32 header length, JSON header, int32 dates, float64 per column
+ARRAY_MAGIC = b'LXC1'
+
+# Numeric fields archived per module. 'fields' are top-level keys; 'rows' pulls
+# (list key or None for a list-valued module, id key, value fields) out of lists,
+# giving columns named '<id>.<field>'; 'matrix' names a {row: {column: value}} dict
+# whose cells become '<row>.<column>'
+HISTORY_FIELDS: Dict[str, Dict[str, Any]] = {
+    'fuel': {'fields': ['national_avg', 'diesel'], 'matrix': 'regions'},
+    'freight': {'fields': ['dry_van', 'reefer', 'flatbed']},
+    'economic-data': {'rows': (None, 'name', ['value'])},
+    'border-wait-times': {'rows': (None, 'name', ['commercial_wait'])},
+    'ais-data': {'rows': (None, 'port_code', ['vessels_in_area', 'cargo_vessels'])},
+    'air-traffic': {'fields': ['total_flights_in_bbox', 'cargo_flights'], 'rows': ('major_hubs', 'name', ['flights'])},
+}
+
+# Payloads (or rows) an ingestor made up because its source was unavailable carry this
+# data_source; they are never archived, so history only holds observed values
+FALLBACK_SOURCE = 'Mock Data'
+
+def column_name(*parts: str) -> str:
+    """ 'WTI Crude Oil', 'value' -> 'wti_crude_oil.value' """
+    return '.'.join(re.sub(r'[^a-z0-9]+', '_', part.lower()).strip('_') for part in parts)
+
+def extract_series(module: str, data: Any) -> Dict[str, float]:
+    spec = HISTORY_FIELDS.get(module)
+    values: Dict[str, float] = {}
+    if not spec or not data or is_fallback(data):
+        return values
+
+    if isinstance(data, dict):
+        for field in spec.get('fields', []):
+            if _is_number(data.get(field)):
+                values[column_name(field)] = float(data[field])
+
+    matrix = data.get(spec['matrix']) if 'matrix' in spec and isinstance(data, dict) else None
+    for row_name, cells in (matrix or {}).items():
+        for cell_name, value in (cells if isinstance(cells, dict) else {}).items():
+            if _is_number(value):
+                values[column_name(row_name, cell_name)] = float(value)
+
+    if 'rows' in spec:
+        list_key, id_key, fields = spec['rows']
+        rows = data.get(list_key, []) if list_key else data
+        for row in rows if isinstance(rows, list) else []:
+            if not isinstance(row, dict) or not row.get(id_key) or is_fallback(row):
+                continue
+            for field in fields:
+                if _is_number(row.get(field)):
+                    values[column_name(str(row[id_key]), field)] = float(row[field])
+    return values
+
+def is_fallback(record: Any) -> bool:
+    return isinstance(record, dict) and record.get('data_source') == FALLBACK_SOURCE
+
+def partition_key(module: str, year: int, fmt: Optional[str] = None) -> str:
+    return f'{HISTORY_PREFIX}/{module}/{year}.{EXTENSIONS[fmt or HISTORY_FORMAT]}'
+
+def append_day(s3: Any, bucket: str, module: str, day: str, values: Dict[str, float]) -> Optional[Dict[str, Any]]:
+    """
+    Upserts one day's values into the module's yearly partition (read-modify-write of a
+    few KB). Columns first seen today are back-filled with NaN. Returns the partition.
+    """
+    if not values:
+        return None
+    return append_rows(s3, bucket, module, {day: values}).get(Date.fromisoformat(day).year)
+
+def append_rows(s3: Any, bucket: str, module: str, rows: Dict[str, Dict[str, float]]) -> Dict[int, Dict[str, Any]]:
+    """ Upserts many days at once: one read and one write per yearly partition touched, then one manifest write. """
+    by_year: Dict[int, Dict[int, Dict[str, float]]] = {}
+    for day, values in rows.items():
+        if values:
+            parsed = Date.fromisoformat(day)
+            by_year.setdefault(parsed.year, {})[parsed.toordinal()] = values
+    if not by_year:
+        return {}
+
+    manifest = load_manifest(s3, bucket, module) or {}
+    partitions = {}
+    for year, days in sorted(by_year.items()):
+        partition = load_partition(s3, bucket, module, year) or {'dates': array('i'), 'columns': {}}
+        for ordinal, values in sorted(days.items()):
+            _upsert(partition, ordinal, values)
+
+        body = encode_partition(partition)
+        s3.put_object(Bucket=bucket, Key=partition_key(module, year), Body=body, ContentType='application/octet-stream')
+        manifest[str(year)] = partition_stats(partition)
+        partitions[year] = partition
+
+    save_manifest(s3, bucket, module, manifest)
+    return partitions
+
+def _upsert(partition: Dict[str, Any], ordinal: int, values: Dict[str, float]) -> None:
+    dates, columns = partition['dates'], partition['columns']
+    for name in values:
+        if name not in columns:
+            columns[name] = array('d', [math.nan] * len(dates))
+
+    # Rows stay date-ordered so range reads can bisect
+    index = bisect.bisect_left(dates, ordinal)
+    if index == len(dates) or dates[index] != ordinal:
+        dates.insert(index, ordinal)
+        for column in columns.values():
+            column.insert(index, math.nan)
+
+    for name, value in values.items():
+        columns[name][index] = value
+
+def load_partition(s3: Any, bucket: str, module: str, year: int) -> Optional[Dict[str, Any]]:
+    """ Reads a whole yearly partition in one GET, whichever format it was written in. """
+    formats = [HISTORY_FORMAT] + [fmt for fmt in EXTENSIONS if fmt != HISTORY_FORMAT]
+    for fmt in formats:
+        if fmt == 'parquet' and not pq:
+            continue
+        try:
+            body = s3.get_object(Bucket=bucket, Key=partition_key(module, year, fmt))['Body'].read()
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+                continue
+            raise
+        return decode_partition(body, fmt)
+    return None
+
+def read_history(s3: Any, bucket: str, module: str, fields: List[str],
+                 start: str, end: str) -> Dict[str, array]:
+    """
+    Loads the requested columns between start and end (ISO dates, inclusive) into arrays:
+    {'date': array('i') of ordinals, <field>: array('d')}. Missing values are NaN.
+    """
+    first, last = Date.fromisoformat(start).toordinal(), Date.fromisoformat(end).toordinal()
+    result: Dict[str, array] = {'date': array('i')}
+    result.update({field: array('d') for field in fields})
+
+    for year in range(Date.fromisoformat(start).year, Date.fromisoformat(end).year + 1):
+        partition = load_partition(s3, bucket, module, year)
+        if partition:
+            _append_range(result, partition, fields, first, last)
+    return result
+
+def query_history(s3: Any, bucket: str, module: str, field: str, start: str, end: str,
+                  predicate: Any = None) -> Dict[str, array]:
+    """
+    Like read_history() for one column, but consults the module manifest first and only
+    reads partitions whose date span overlaps [start, end] and whose min/max can satisfy
+    the predicate. predicate is ('>', 4.0), ('between', (3.5, 4.0)) etc., or any callable
+    (applied to rows, but it cannot prune). Only matching rows are returned.
+    """
+    first, last = Date.fromisoformat(start).toordinal(), Date.fromisoformat(end).toordinal()
+    years = range(Date.fromisoformat(start).year, Date.fromisoformat(end).year + 1)
+    manifest = load_manifest(s3, bucket, module)
+
+    if manifest is None:
+        # No zone map yet (e.g. partitions written before it existed): scan the range
+        candidates = list(years)
+    else:
+        candidates = [year for year in years if _may_match(manifest.get(str(year)), field, first, last, predicate)]
+    metrics.count('PartitionsPruned', len(years) - len(candidates))
+    metrics.count('PartitionsScanned', len(candidates))
+
+    test = _row_test(predicate)
+    result: Dict[str, array] = {'date': array('i'), field: array('d')}
+    for year in candidates:
+        partition = load_partition(s3, bucket, module, year)
+        column = partition['columns'].get(field) if partition else None
+        if column is None:
+            continue
+        dates = partition['dates']
+        for i in range(bisect.bisect_left(dates, first), bisect.bisect_right(dates, last)):
+            if not math.isnan(column[i]) and test(column[i]):
+                result['date'].append(dates[i])
+                result[field].append(column[i])
+    return result
+
+def partition_stats(partition: Dict[str, Any]) -> Dict[str, Any]:
+    dates = partition['dates']
+    columns = {}
+    for name, column in partition['columns'].items():
+        present = [value for value in column if not math.isnan(value)]
+        columns[name] = {
+            'min': min(present) if present else None,
+            'max': max(present) if present else None,
+            'count': len(present)
+        }
+    return {
+        'rows': len(dates),
+        'first': dates[0] if dates else None,
+        'last': dates[-1] if dates else None,
+        'columns': columns
+    }
+
+def load_manifest(s3: Any, bucket: str, module: str) -> Optional[Dict[str, Any]]:
+    try:
+        body = s3.get_object(Bucket=bucket, Key=f'{HISTORY_PREFIX}/{module}/{MANIFEST_NAME}')['Body'].read()
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+            return None
+        raise
+    return json.loads(body)
+
+def save_manifest(s3: Any, bucket: str, module: str, manifest: Dict[str, Any]) -> None:
+    s3.put_object(
+        Bucket=bucket,
+        Key=f'{HISTORY_PREFIX}/{module}/{MANIFEST_NAME}',
+        Body=json.dumps(manifest, sort_keys=True),
+        ContentType='application/json'
+    )
+
+def rebuild_manifest(s3: Any, bucket: str, module: str, years: List[int]) -> Dict[str, Any]:
+    """ Recomputes the zone map from the partitions themselves, e.g. after copying partitions in by hand. """
+    manifest = {}
+    for year in years:
+        partition = load_partition(s3, bucket, module, year)
+        if partition:
+            manifest[str(year)] = partition_stats(partition)
+    save_manifest(s3, bucket, module, manifest)
+    return manifest
+
+def _may_match(stats: Optional[Dict[str, Any]], field: str, first: int, last: int, predicate: Any) -> bool:
+    if not stats or stats.get('first') is None or stats['last'] < first or stats['first'] > last:
+        return False
+    column = stats['columns'].get(field)
+    if not column or not column['count']:
+        return False
+    if not isinstance(predicate, tuple):
+        return True
+
+    op, bound = predicate
+    low, high = column['min'], column['max']
+    if op in ('>', '>='):
+        return PREDICATES[op](high, bound)
+    if op in ('<', '<='):
+        return PREDICATES[op](low, bound)
+    if op == '==':
+        return low <= bound <= high
+    if op == 'between':
+        return high >= bound[0] and low <= bound[1]
+    return True
+
+def _row_test(predicate: Any) -> Callable[[float], bool]:
+    if predicate is None:
+        return lambda value: True
+    if isinstance(predicate, tuple):
+        op, bound = predicate
+        if op not in PREDICATES:
+            raise ValueError(f'Unsupported predicate {op}')
+        return lambda value: PREDICATES[op](value, bound)
+    return predicate
+
+def _append_range(result: Dict[str, array], partition: Dict[str, Any], fields: List[str],
+                  first: int, last: int) -> None:
+    dates = partition['dates']
+    lo, hi = bisect.bisect_left(dates, first), bisect.bisect_right(dates, last)
+    result['date'].extend(dates[lo:hi])
+    for field in fields:
+        column = partition['columns'].get(field)
+        result[field].extend(column[lo:hi] if column is not None else array('d', [math.nan] * (hi - lo)))
+
+def encode_partition(partition: Dict[str, Any], fmt: Optional[str] = None) -> bytes:
+    fmt = fmt or HISTORY_FORMAT
+    dates, columns = partition['dates'], partition['columns']
+    names = sorted(columns)
+
+    if fmt == 'parquet':
+        table = pa.table({
+            'date': pa.array([Date.fromordinal(ordinal) for ordinal in dates], pa.date32()),
+            **{name: pa.array(columns[name].tolist(), pa.float64()) for name in names}
+        })
+        buffer = io.BytesIO()
+        pq.write_table(table, buffer, compression='zstd')
+        return buffer.getvalue()
+
+    header = json.dumps({'rows': len(dates), 'columns': names}).encode()
+    chunks = [ARRAY_MAGIC, struct.pack('<I', len(header)), header, _little_endian(dates)]
+    chunks.extend(_little_endian(columns[name]) for name in names)
+    return b''.join(chunks)
+
+def decode_partition(body: bytes, fmt: Optional[str] = None) -> Dict[str, Any]:
+    fmt = fmt or HISTORY_FORMAT
+    if fmt == 'parquet':
+        table = pq.read_table(io.BytesIO(body))
+        dates = array('i', [day.toordinal() for day in table.column('date').to_pylist()])
+        columns = {
+            name: array('d', [math.nan if value is None else value for value in table.column(name).to_pylist()])
+            for name in table.column_names if name != 'date'
+        }
+        return {'dates': dates, 'columns': columns}
+
+    if body[:4] != ARRAY_MAGIC:
+        raise ValueError('Not a history partition')
+    (header_length,) = struct.unpack_from('<I', body, 4)
+    header = json.loads(body[8:8 + header_length])
+    offset = 8 + header_length
+    rows = header['rows']
+
+    dates, offset = _read_array('i', body, offset, rows)
+    columns = {}
+    for name in header['columns']:
+        columns[name], offset = _read_array('d', body, offset, rows)
+    return {'dates': dates, 'columns': columns}
+
+def _read_array(typecode: str, body: bytes, offset: int, rows: int) -> Tuple[array, int]:
+    values = array(typecode)
+    end = offset + rows * values.itemsize
+    values.frombytes(body[offset:end])
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values, end
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and not math.isnan(value)
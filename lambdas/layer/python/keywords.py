@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+# Impact vocabulary for event and news titles: term -> level
+IMPACT_TERMS = {
+    'strike': 'HIGH',
+    'shutdown': 'HIGH',
+    'closure': 'HIGH',
+    'blocked': 'HIGH',
+    'suspended': 'HIGH',
+    'war': 'HIGH',
+    'sanction': 'HIGH',
+    'delay': 'MEDIUM',
+    'disruption': 'MEDIUM',
+    'congestion': 'MEDIUM',
+    'shortage': 'MEDIUM',
+    'increase': 'MEDIUM',
+}
+LEVELS = ['HIGH', 'MEDIUM', 'LOW']
+LEVEL_WEIGHTS = {'HIGH': 3.0, 'MEDIUM': 1.0}
+
+# Inflected forms a vocabulary word also matches as. Words not listed match themselves and
+# their regular plural; words already inflected ('blocked', 'shipping', 'ports') only themselves.
+WORD_FORMS = {
+    'strike': ['strikes', 'striking'],
+    'war': ['wars', 'warring'],
+    'sanction': ['sanctions', 'sanctioned'],
+    'sanctions': ['sanction', 'sanctioned'],
+    'delay': ['delays', 'delayed', 'delaying'],
+    'increase': ['increases', 'increased', 'increasing'],
+    'flood': ['floods', 'flooded', 'flooding'],
+    'tornado': ['tornadoes', 'tornados'],
+}
+TOKEN = re.compile(r'[a-z0-9]+')
+
+# Word trie flattened one level: first word -> [(remaining word forms, term)], longest first,
+# plus each lowercased term's level
+Lexicon = Tuple[Dict[str, List[Tuple[Tuple[FrozenSet[str], ...], str]]], Dict[str, Optional[str]]]
+
+def word_forms(word: str) -> FrozenSet[str]:
+    if word in WORD_FORMS:
+        return frozenset([word, *WORD_FORMS[word]])
+    if (word.endswith(('s', 'ed', 'ing')) and not word.endswith('ss')) or word.isdigit():
+        return frozenset([word])
+    if word.endswith(('ss', 'x', 'z', 'ch', 'sh')):
+        return frozenset([word, word + 'es'])
+    if word.endswith('y') and word[-2:-1] not in ('a', 'e', 'i', 'o', 'u'):
+        return frozenset([word, word[:-1] + 'ies'])
+    return frozenset([word, word + 's'])
+
+def compile_terms(terms: Dict[str, Optional[str]]) -> Lexicon:
+    """
+    Indexes a vocabulary by the surface forms of each term's first word. Only the last
+    word of a term is inflected, so 'supply chains' matches but 'supplies chain' does not.
+    """
+    index: Dict[str, List[Tuple[Tuple[FrozenSet[str], ...], str]]] = {}
+    for term in terms:
+        words = TOKEN.findall(term.lower())
+        canonical = ' '.join(words)
+        rest = tuple(frozenset([word]) for word in words[1:-1]) + ((word_forms(words[-1]),) if len(words) > 1 else ())
+        for form in (word_forms(words[0]) if len(words) == 1 else [words[0]]):
+            index.setdefault(form, []).append((rest, canonical))
+
+    for entries in index.values():
+        entries.sort(key=lambda entry: len(entry[0]), reverse=True)
+    return index, {' '.join(TOKEN.findall(term.lower())): level for term, level in terms.items()}
+
+def find_terms(text: str, lexicon: Lexicon) -> List[str]:
+    """
+    Distinct vocabulary terms in the text, in order of first appearance. The text is
+    tokenised once and each token costs one dict lookup, whatever the vocabulary size;
+    overlapping terms resolve to the longest, as in 'trade war' over 'war'.
+    """
+    index = lexicon[0]
+    tokens = TOKEN.findall((text or '').lower())
+    found: Dict[str, None] = {}
+    resume = 0
+    for i, token in enumerate(tokens):
+        entries = index.get(token)
+        if entries is None or i < resume:
+            continue
+        for rest, term in entries:
+            if not rest or all(i + 1 + j < len(tokens) and tokens[i + 1 + j] in forms for j, forms in enumerate(rest)):
+                found[term] = None
+                resume = i + 1 + len(rest)
+                break
+    return list(found)
+
+def classify(text: str, lexicon: Optional[Lexicon] = None) -> Dict[str, Any]:
+    """ Returns the matched terms, their summed weight and the highest impact level among them. """
+    lexicon = lexicon or IMPACT_LEXICON
+    terms = find_terms(text, lexicon)
+    if not terms:
+        return {'terms': terms, 'weight': 0.0, 'impact_level': 'LOW'}
+    levels = [lexicon[1][term] for term in terms]
+    return {
+        'terms': terms,
+        'weight': sum(LEVEL_WEIGHTS.get(level, 0.0) for level in levels),
+        'impact_level': next((level for level in LEVELS if level in levels), 'LOW'),
+    }
+
+IMPACT_LEXICON = compile_terms(IMPACT_TERMS)
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# CloudWatch Embedded Metric Format allows at most 100 values per metric per record
+MAX_VALUES_PER_RECORD = 100
+NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'Logistix')
+
+_module: ContextVar[str] = ContextVar('metrics_module', default='unknown')
+_lock = threading.Lock()
+_buffer: Dict[Tuple[Tuple[str, str], ...], Dict[str, Tuple[str, List[float]]]] = {}
+_sink: Optional[str] = None
+
+def configure(module: str, sink: Optional[str] = None) -> None:
+    """ Sets the Module dimension for the current context and optionally the sink ('emf', 'local' or 'none'). """
+    global _sink
+    _module.set(module)
+    if sink is not None:
+        _sink = sink
+
+def get_sink() -> str:
+    if _sink:
+        return _sink
+    configured = os.environ.get('METRICS_SINK')
+    if configured:
+        return configured
+    # Lambda ships stdout to CloudWatch Logs, which extracts EMF lines into metrics
+    return 'emf' if os.environ.get('AWS_LAMBDA_FUNCTION_NAME') else 'local'
+
+def put(name: str, value: float, unit: str = 'Count', **dimensions: Any) -> None:
+    if get_sink() == 'none':
+        return
+
+    dims = {'Module': _module.get()}
+    dims.update({key: str(val) for key, val in dimensions.items()})
+    key = tuple(sorted(dims.items()))
+
+    with _lock:
+        entry = _buffer.setdefault(key, {}).setdefault(name, (unit, []))
+        entry[1].append(value)
+
+def count(name: str, value: int = 1, **dimensions: Any) -> None:
+    put(name, value, 'Count', **dimensions)
+
+def add_bytes(name: str, size: int, **dimensions: Any) -> None:
+    put(name, size, 'Bytes', **dimensions)
+
+@contextmanager
+def timer(name: str, **dimensions: Any) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        put(name, round((time.perf_counter() - start) * 1000, 2), 'Milliseconds', **dimensions)
+
+def instrumented(module: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Decorates a Lambda handler: sets the Module dimension, counts an uncaught exception as
+    HandlerErrors and flushes on every exit, so a failed invocation still reports its metrics.
+    """
+    def decorate(handler: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(handler)
+        def wrapper(event: Any, context: Any) -> Any:
+            configure(module)
+            try:
+                return handler(event, context)
+            except Exception:
+                count('HandlerErrors')
+                raise
+            finally:
+                flush()
+        return wrapper
+    return decorate
+
+def flush() -> List[Dict[str, Any]]:
+    """ Emits everything recorded since the last flush and returns the EMF records. """
+    with _lock:
+        pending = dict(_buffer)
+        _buffer.clear()
+
+    records = []
+    for key, recorded in pending.items():
+        records.extend(_to_emf(dict(key), recorded))
+
+    sink = get_sink()
+    for record in records:
+        if sink == 'emf':
+            print(json.dumps(record))
+        elif sink == 'local':
+            print(_format_local(record))
+
+    return records
+
+def _to_emf(dimensions: Dict[str, str], recorded: Dict[str, Tuple[str, List[float]]]) -> List[Dict[str, Any]]:
+    records = []
+    longest = max(len(values) for _, values in recorded.values())
+
+    for offset in range(0, longest, MAX_VALUES_PER_RECORD):
+        chunk = {
+            name: (unit, values[offset:offset + MAX_VALUES_PER_RECORD])
+            for name, (unit, values) in recorded.items()
+            if values[offset:offset + MAX_VALUES_PER_RECORD]
+        }
+        record: Dict[str, Any] = {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': NAMESPACE,
+                    'Dimensions': [sorted(dimensions)],
+                    'Metrics': [{'Name': name, 'Unit': unit} for name, (unit, _) in chunk.items()]
+                }]
+            }
+        }
+        record.update(dimensions)
+        for name, (_, values) in chunk.items():
+            record[name] = values[0] if len(values) == 1 else values
+        records.append(record)
+
+    return records
+
+def _format_local(record: Dict[str, Any]) -> str:
+    directive = record['_aws']['CloudWatchMetrics'][0]
+    dims = ' '.join(f"{name}={record[name]}" for name in directive['Dimensions'][0])
+    values = ' '.join(
+        f"{metric['Name']}={_summarize(record[metric['Name']], metric['Unit'])}"
+        for metric in directive['Metrics']
+    )
+    return f"[metrics] {dims} {values}"
+
+def _summarize(value: Any, unit: str) -> str:
+    suffix = _UNIT_SUFFIX.get(unit, '')
+    if not isinstance(value, list):
+        return f"{value}{suffix}"
+    if unit in ('Count', 'Bytes'):
+        return f"{sum(value)}{suffix}"
+    return f"avg:{sum(value) / len(value):.1f}{suffix},max:{max(value)}{suffix},n:{len(value)}"
+
+_UNIT_SUFFIX = {'Milliseconds': 'ms', 'Bytes': 'B', 'Seconds': 's'}
@@ -4,18 +4,30 @@ import feedparser
 from datetime import datetime
 from typing import List, Dict, Any
 
-def get_news_items(url: str, max_items: int = 2) -> List[Dict[str, str]]:
+import metrics
+from dedup import dedupe
+from fetcher import fetch_bytes, upstream_name
+from gazetteer import tag_items
+
+def get_news_items(url: str, max_items: int = 2, timeout: float = 10) -> List[Dict[str, str]]:
+    host = upstream_name(url)
     try:
-        feed = feedparser.parse(url)
+        # Download through the shared fetcher so feeds get retries, breakers and the time budget
+        body = fetch_bytes(url, headers={'User-Agent': 'LogisticsBriefing/1.0'}, timeout=timeout)
+        with metrics.timer('ParseTime', Upstream=host):
+            feed = feedparser.parse(body)
+        if feed.get('bozo') and not feed.entries:
+            metrics.count('ParseErrors', Upstream=host)
         items = []
-        
-        for entry in feed.entries[:max_items]:
+
+        for entry in feed.entries:
             try:
                 items.append({"title": entry.title, "url": entry.link})
             except (AttributeError, KeyError):
                 continue
-        
-        return items
+
+        # Feeds often repeat a story under slightly different headlines
+        return tag_items(dedupe(items, source_key=None)[:max_items])
     except Exception as e:
         print(f"Feed parsing error for {url}: {e}")
         return []
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+
+from run_tracker import RUN_PREFIX
+
+# Every write lands twice in the day's partition of the raw table:
+#   module = '<module>'           latest pointer; holds the newest data so readers need one GetItem
+#   module = '<module>#<HH:MM>'   snapshot for the time bucket the write falls in
+SNAPSHOT_SEPARATOR = '#'
+# The compactor rolls a finished day's snapshots into '<module>#daily'
+DAILY_BUCKET = 'daily'
+DEFAULT_BUCKET_MINUTES = 60
+
+# Modules refreshed intraday keep finer buckets; override with e.g. SNAPSHOT_BUCKET_MINUTES="traffic=5,weather=30"
+BUCKET_MINUTES = {
+    'traffic': 15,
+    'border-wait-times': 15,
+    'air-traffic': 15,
+}
+for _entry in os.environ.get('SNAPSHOT_BUCKET_MINUTES', '').split(','):
+    if '=' in _entry:
+        _module, _minutes = _entry.split('=', 1)
+        BUCKET_MINUTES[_module.strip()] = int(_minutes)
+
+def snapshot_bucket(module: str, at: datetime) -> str:
+    """ Floors `at` to the module's bucket size, e.g. 14:37 -> '14:30' for 15-minute buckets. """
+    minutes = BUCKET_MINUTES.get(module, DEFAULT_BUCKET_MINUTES)
+    minute_of_day = (at.hour * 60 + at.minute) // minutes * minutes
+    return f'{minute_of_day // 60:02d}:{minute_of_day % 60:02d}'
+
+def snapshot_key(module: str, bucket: str) -> str:
+    return f'{module}{SNAPSHOT_SEPARATOR}{bucket}'
+
+def module_items(date: str, module: str, data: Any, at: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """ Returns the snapshot and latest-pointer items for one ingestor write. """
+    at = at or datetime.utcnow()
+    bucket = snapshot_bucket(module, at)
+    body = json.dumps(data)
+    timestamp = at.isoformat()
+    return [
+        {'date': date, 'module': snapshot_key(module, bucket), 'data': body, 'timestamp': timestamp},
+        {'date': date, 'module': module, 'data': body, 'timestamp': timestamp, 'bucket': bucket},
+    ]
+
+def put_module_data(table: Any, date: str, module: str, data: Any, at: Optional[datetime] = None) -> None:
+    snapshot, latest = module_items(date, module, data, at)
+    # Snapshot first: a reader that sees the pointer can always find its bucket
+    table.put_item(Item=snapshot)
+    try:
+        # Late or replayed writes still fill their bucket but never move the pointer backwards
+        table.put_item(
+            Item=latest,
+            ConditionExpression='attribute_not_exists(#ts) OR #ts <= :ts',
+            ExpressionAttributeNames={'#ts': 'timestamp'},
+            ExpressionAttributeValues={':ts': latest['timestamp']}
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        print(f"Kept newer latest {module} item for {date}")
+
+def get_latest_item(table: Any, date: str, module: str) -> Optional[Dict[str, Any]]:
+    return table.get_item(Key={'date': date, 'module': module}).get('Item')
+
+def query_snapshots(table: Any, date: str, module: str,
+                    start: Optional[str] = None, end: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Returns the module's snapshots for a day in bucket order, optionally limited to
+    buckets between start and end ('HH:MM', inclusive), using a single key-range Query.
+    """
+    prefix = snapshot_key(module, '')
+    # Bounded by time so the '<module>#daily' rollup never comes back as a bucket
+    condition = Key('module').between(prefix + (start or '00:00'), prefix + (end or '23:59'))
+
+    kwargs: Dict[str, Any] = {'KeyConditionExpression': Key('date').eq(date) & condition}
+    snapshots: List[Dict[str, Any]] = []
+    try:
+        while True:
+            response = table.query(**kwargs)
+            for item in response.get('Items', []):
+                snapshots.append({
+                    'bucket': item['module'][len(prefix):],
+                    'timestamp': item.get('timestamp'),
+                    'data': json.loads(item['data']) if isinstance(item.get('data'), str) else item.get('data')
+                })
+            if 'LastEvaluatedKey' not in response:
+                break
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    except (ClientError, json.JSONDecodeError) as e:
+        print(f"Error querying {module} snapshots for {date}: {e}")
+
+    return snapshots
+
+def is_snapshot_key(module: str) -> bool:
+    return SNAPSHOT_SEPARATOR in module and not module.startswith(RUN_PREFIX)
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import os
+from datetime import datetime, timedelta
+from statistics import median
+from typing import Any, Dict, Optional
+
+import metrics
+from state_store import put_state, query_state
+
+# Observed releases per source: date = 'state', module = 'release#<source>'
+RELEASE_STATE_PREFIX = 'release#'
+
+CADENCE_DAYS = {'daily': 1, 'weekly': 7, 'monthly': 30}
+
+# Configured cadence per upstream series; the observed gaps between changes refine it
+SOURCES = {
+    'eia:gnd': 'weekly',
+    'fred:UNRATE': 'monthly',
+    'fred:CPIAUCSL': 'monthly',
+    'fred:INDPRO': 'monthly',
+    'fred:DCOILWTICO': 'daily',
+    'fred:DEXUSEU': 'daily',
+}
+
+# A source is skipped until this fraction of its release interval has passed since the
+# last observed change; after that it is polled on every run until the next change lands
+RELEASE_SLACK = float(os.environ.get('RELEASE_SLACK', '0.8'))
+MAX_INTERVALS = 12
+MIN_OBSERVED_INTERVALS = 2
+
+def load_calendar(table: Any) -> Dict[str, Dict[str, Any]]:
+    return query_state(table, RELEASE_STATE_PREFIX)
+
+def expected_interval(source: str, entry: Optional[Dict[str, Any]]) -> float:
+    """ Days between releases: the median observed gap, kept within 0.5x-2x of the configured cadence. """
+    configured = CADENCE_DAYS[SOURCES.get(source, 'daily')]
+    intervals = (entry or {}).get('intervals', [])
+    if len(intervals) < MIN_OBSERVED_INTERVALS:
+        return configured
+    return min(max(median(intervals), configured * 0.5), configured * 2)
+
+def is_due(calendar: Dict[str, Dict[str, Any]], source: str, now: Optional[datetime] = None) -> bool:
+    """ False while no new release can exist yet. """
+    entry = calendar.get(source)
+    if not entry or not entry.get('last_change'):
+        return True
+    interval = expected_interval(source, entry)
+    return (now or datetime.utcnow()) >= datetime.fromisoformat(entry['last_change']) + timedelta(days=interval * RELEASE_SLACK)
+
+def count_poll(source: str, fetched: bool) -> None:
+    metrics.count('PollsFetched' if fetched else 'PollsSkipped', Source=source)
+
+def record_poll(table: Any, calendar: Dict[str, Dict[str, Any]], source: str, changed: bool,
+                now: Optional[datetime] = None) -> None:
+    """
+    Records the outcome of a fetch. Only a change against previously cached data counts
+    as a release, so a first fill never teaches the calendar a bogus release time.
+    """
+    if not changed:
+        return
+    now = now or datetime.utcnow()
+    entry = dict(calendar.get(source) or {})
+    intervals = list(entry.get('intervals', []))
+    if entry.get('last_change'):
+        gap = (now - datetime.fromisoformat(entry['last_change'])).total_seconds() / 86400
+        intervals = (intervals + [round(gap, 2)])[-MAX_INTERVALS:]
+
+    entry.update({'last_change': now.isoformat(), 'intervals': intervals})
+    calendar[source] = entry
+    put_state(table, f'{RELEASE_STATE_PREFIX}{source}', entry)
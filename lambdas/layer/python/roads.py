@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List, Optional
+
+# One compiled pattern finds every route, direction and milepost reference in a single scan:
+#   'I-80', 'I 80', 'I80', 'IH-10', 'Interstate 80'          -> I-80
+#   'US-101', 'US 101', 'U.S. 101', 'US Highway 101'         -> US-101
+#   'SR-99', 'SR 99', 'State Route 99', 'CA-99', 'Hwy 17'    -> SR-99, SR-17
+#   'northbound', 'NB', 'N/B', 'I-5 North', 'North I-5'      -> North
+# A bare 'North' only counts right beside a route and not before a place name, so
+# 'I-40 in North Carolina' and 'I-95 South Carolina' have no direction.
+#   'MP 150', 'M.P. 150.2', 'milepost 12', 'mile marker 45'  -> 150.0, 150.2, 12.0, 45.0
+REFERENCE = re.compile(
+    r'\b(?:'
+    r'(?P<interstate>I|IH|Interstate)[\s-]*(?P<interstate_number>\d{1,3})'
+    r'|(?:US|U\.S\.)(?:\s*(?:Highway|Hwy|Route|Rte))?[\s-]*(?P<us_number>\d{1,3})'
+    r'|(?:SR|State\s+(?:Route|Highway|Hwy)|Hwy|Highway|(?!NB|SB|EB|WB)[A-Z]{2}(?=-))[\s-]*(?P<state_number>\d{1,3})'
+    r'|(?:MP|M\.P\.|[Mm]ile\s*(?:[Pp]ost|[Mm]arker)|[Mm]ilepost|MM)\s*(?P<milepost>\d{1,3}(?:\.\d+)?)'
+    r'|(?P<direction>[Nn]orth|[Ss]outh|[Ee]ast|[Ww]est|NORTH|SOUTH|EAST|WEST)(?:bound|BOUND)'
+    r'|(?P<direction_word>[Nn]orth|[Ss]outh|[Ee]ast|[Ww]est|NORTH|SOUTH|EAST|WEST)(?![\s-]+[A-Z][a-z])'
+    r'|(?P<direction_code>[NSEW])/?B'
+    r')\b'
+)
+DIRECTIONS = {'n': 'North', 's': 'South', 'e': 'East', 'w': 'West'}
+ROUTE_PREFIXES = {'interstate_number': ('interstate', 'I'), 'us_number': ('us', 'US'), 'state_number': ('state', 'SR')}
+
+def extract(text: Optional[str]) -> Dict[str, Any]:
+    """
+    Structured road reference from free text: the first route (`road`, `route_type`, `number`),
+    the direction nearest after it (or the first one at all) and the first milepost. Fields
+    not found are None.
+    """
+    ref: Dict[str, Any] = {'road': None, 'route_type': None, 'number': None, 'direction': None, 'milepost': None}
+    if not text:
+        return ref
+    first_direction = direction_after_route = None
+    matches = list(REFERENCE.finditer(text))
+    for k, match in enumerate(matches):
+        group = match.lastgroup
+        if group in ROUTE_PREFIXES:
+            if ref['road'] is None:
+                route_type, prefix = ROUTE_PREFIXES[group]
+                number = int(match.group(group))
+                ref.update(road=f"{prefix}-{number}", route_type=route_type, number=number)
+        elif group == 'milepost':
+            if ref['milepost'] is None:
+                ref['milepost'] = float(match.group(group))
+        elif group != 'direction_word' or _beside_route(text, matches, k):
+            direction = DIRECTIONS[match.group(group)[0].lower()]
+            first_direction = first_direction or direction
+            if ref['road'] is not None and direction_after_route is None:
+                direction_after_route = direction
+    ref['direction'] = direction_after_route or first_direction
+    return ref
+
+def _beside_route(text: str, matches: List[Any], k: int) -> bool:
+    """ Whether matches[k] is separated from a route match on either side by spaces or a dash only. """
+    before = matches[k - 1] if k > 0 else None
+    after = matches[k + 1] if k + 1 < len(matches) else None
+    return ((before is not None and before.lastgroup in ROUTE_PREFIXES
+             and not text[before.end():matches[k].start()].strip(' -'))
+            or (after is not None and after.lastgroup in ROUTE_PREFIXES
+                and not text[matches[k].end():after.start()].strip(' -')))
+
+def merge(primary: Dict[str, Any], fallback: Dict[str, Any]) -> Dict[str, Any]:
+    """ Fills the fields missing from one reference (e.g. a road-name field) from another (its description). """
+    return {key: primary[key] if primary[key] is not None else fallback[key] for key in primary}
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import boto3
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+
+# Completion markers share the date partition of the raw table: date=<day>, module=run#<module>
+RUN_PREFIX = 'run#'
+AGGREGATION_MARKER = f'{RUN_PREFIX}aggregation'
+
+REQUIRED_MODULES = [
+    module.strip() for module in os.environ.get(
+        'REQUIRED_MODULES',
+        'fuel,freight,traffic,weather,border-wait-times,economic-data,air-traffic,ais-data,global-events'
+    ).split(',') if module.strip()
+]
+
+def record_completion(table: Any, date: str, module: str, status: str, started_at: datetime,
+                      completed_at: Optional[datetime] = None) -> None:
+    completed_at = completed_at or datetime.utcnow()
+    try:
+        table.put_item(Item={
+            'date': date,
+            'module': f'{RUN_PREFIX}{module}',
+            'data': json.dumps({
+                'module': module,
+                'status': status,
+                'started_at': started_at.isoformat(),
+                'completed_at': completed_at.isoformat(),
+                'duration_ms': int((completed_at - started_at).total_seconds() * 1000)
+            }),
+            'timestamp': completed_at.isoformat()
+        })
+    except ClientError as e:
+        print(f"Error recording completion for {module}: {e}")
+
+def get_run_timeline(table: Any, date: str) -> List[Dict[str, Any]]:
+    """ Returns the day's completion markers (ingestors and aggregation) ordered by completion time. """
+    try:
+        response = table.query(
+            KeyConditionExpression=Key('date').eq(date) & Key('module').begins_with(RUN_PREFIX)
+        )
+    except ClientError as e:
+        print(f"Error reading run timeline for {date}: {e}")
+        return []
+
+    markers = [json.loads(item['data']) for item in response.get('Items', [])]
+    return sorted(markers, key=lambda marker: marker.get('completed_at') or marker.get('claimed_at', ''))
+
+def pending_modules(table: Any, date: str) -> List[str]:
+    completed = {marker.get('module') for marker in get_run_timeline(table, date)}
+    return [module for module in REQUIRED_MODULES if module not in completed]
+
+def claim_aggregation(table: Any, date: str, trigger: str) -> bool:
+    """ Conditionally writes the day's aggregation marker; only the first caller gets True. """
+    try:
+        table.put_item(
+            Item={
+                'date': date,
+                'module': AGGREGATION_MARKER,
+                'data': json.dumps({'module': 'aggregation', 'trigger': trigger,
+                                    'claimed_at': datetime.utcnow().isoformat()}),
+                'timestamp': datetime.utcnow().isoformat()
+            },
+            ConditionExpression='attribute_not_exists(#m)',
+            ExpressionAttributeNames={'#m': 'module'}
+        )
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            print(f"Error claiming aggregation for {date}: {e}")
+        return False
+
+def release_aggregation(table: Any, date: str) -> None:
+    """ Drops the day's aggregation marker after a failed run, so a later trigger can claim it again. """
+    try:
+        table.delete_item(Key={'date': date, 'module': AGGREGATION_MARKER})
+    except ClientError as e:
+        print(f"Error releasing aggregation for {date}: {e}")
+
+def trigger_aggregation_if_ready(table: Any, date: str, function_name: Optional[str] = None) -> bool:
+    """
+    Called by each ingestor after recording its marker. The ingestor that completes the
+    set claims the aggregation and invokes the aggregator asynchronously.
+    """
+    function_name = function_name or os.environ.get('AGGREGATOR_FUNCTION')
+    if not function_name or pending_modules(table, date):
+        return False
+    if not claim_aggregation(table, date, 'barrier'):
+        return False
+
+    try:
+        boto3.client('lambda').invoke(
+            FunctionName=function_name,
+            InvocationType='Event',
+            Payload=json.dumps({'trigger': 'barrier', 'date': date}).encode()
+        )
+        return True
+    except ClientError as e:
+        print(f"Error invoking aggregator: {e}")
+        # Release the claim so the deadline trigger can still aggregate
+        table.delete_item(Key={'date': date, 'module': AGGREGATION_MARKER})
+        return False
+
+def summarize_timeline(markers: List[Dict[str, Any]]) -> Dict[str, int]:
+    """ Milliseconds spent ingesting, waiting on the barrier and from first fetch to published brief. """
+    ingest = [m for m in markers if m.get('module') in REQUIRED_MODULES and m.get('started_at')]
+    claim = next((m for m in markers if m.get('module') == 'aggregation'), None)
+    aggregator = next((m for m in markers if m.get('module') == 'aggregator'), None)
+    if not ingest:
+        return {}
+
+    first_start = min(datetime.fromisoformat(m['started_at']) for m in ingest)
+    last_done = max(datetime.fromisoformat(m['completed_at']) for m in ingest)
+    summary = {'ingest_span_ms': _ms(last_done - first_start)}
+
+    if claim:
+        summary['barrier_wait_ms'] = max(0, _ms(datetime.fromisoformat(claim['claimed_at']) - last_done))
+    if aggregator:
+        summary['time_to_brief_ms'] = _ms(datetime.fromisoformat(aggregator['completed_at']) - first_start)
+    return summary
+
+def _ms(delta: Any) -> int:
+    return int(delta.total_seconds() * 1000)
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import BotoCoreError, ClientError
+
+# Long-lived pipeline state shares the raw table under a partition no calendar date can collide with
+STATE_PARTITION = 'state'
+
+def get_state(table: Any, key: str) -> Optional[Dict[str, Any]]:
+    """ The state stored under key, or None when there is none or it cannot be read; callers refetch. """
+    try:
+        item = table.get_item(Key={'date': STATE_PARTITION, 'module': key}).get('Item')
+    except (ClientError, BotoCoreError) as e:
+        print(f"Error reading state {key}: {e}")
+        return None
+
+    if not item or 'data' not in item:
+        return None
+    try:
+        return json.loads(item['data'])
+    except (TypeError, ValueError) as e:
+        print(f"Unreadable state {key}: {e}")
+        return None
+
+def query_state(table: Any, prefix: str) -> Dict[str, Dict[str, Any]]:
+    """ Returns every state item whose key starts with prefix, keyed by the remainder of the key. """
+    results: Dict[str, Dict[str, Any]] = {}
+    kwargs: Dict[str, Any] = {
+        'KeyConditionExpression': Key('date').eq(STATE_PARTITION) & Key('module').begins_with(prefix)
+    }
+
+    try:
+        while True:
+            response = table.query(**kwargs)
+            for item in response.get('Items', []):
+                results[item['module'][len(prefix):]] = json.loads(item['data'])
+            if 'LastEvaluatedKey' not in response:
+                break
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    except (ClientError, BotoCoreError, ValueError) as e:
+        print(f"Error querying state {prefix}: {e}")
+
+    return results
+
+def put_state(table: Any, key: str, data: Dict[str, Any]) -> None:
+    try:
+        table.put_item(Item={
+            'date': STATE_PARTITION,
+            'module': key,
+            'data': json.dumps(data),
+            'timestamp': datetime.utcnow().isoformat()
+        })
+    except (ClientError, BotoCoreError) as e:
+        print(f"Error writing state {key}: {e}")
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import contextvars
+import importlib.util
+import inspect
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from datetime import datetime, timedelta
+from types import ModuleType
+from typing import Dict, Any, Callable, Tuple
+import boto3
+from botocore.exceptions import ClientError
+import metrics
+from fetcher import load_latency_history, remaining_time, set_deadline, start_budget
+from raw_store import put_module_data
+from run_tracker import claim_aggregation, record_completion, release_aggregation
+
+# Function directories sit next to this one both in the repo and in the deployment package
+LAMBDAS_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# module name -> (function directory, fetch function)
+INGESTORS = {
+    'fuel': ('ingestor-fuel', 'fetch_fuel_prices'),
+    'freight': ('ingestor-freight', 'fetch_freight_rates'),
+    'traffic': ('ingestor-traffic', 'fetch_traffic_alerts'),
+    'weather': ('ingestor-weather', 'fetch_weather_forecasts'),
+    'border-wait-times': ('ingestor-border-wait-times', 'fetch_border_wait_times'),
+    'economic-data': ('ingestor-economic-data', 'fetch_economic_indicators'),
+    'air-traffic': ('ingestor-air-traffic', 'fetch_air_traffic_data'),
+    'ais-data': ('ingestor-ais-data', 'fetch_maritime_data'),
+    'global-events': ('ingestor-global-events', 'fetch_global_events'),
+    'global-event-counts': ('ingestor-global-events', 'fetch_event_counts'),
+}
+
+DEFAULT_MODULE_DEADLINE_SECONDS = float(os.environ.get('MODULE_DEADLINE_SECONDS', '45'))
+# Held back from ingestion for the aggregation pass (OpenAI call plus brief writes)
+AGGREGATION_RESERVE_MS = int(os.environ.get('AGGREGATION_RESERVE_MS', '45000'))
+MODULE_DEADLINE_SECONDS = {
+    'global-events': 120,
+    'global-event-counts': 120,
+}
+
+_loaded: Dict[str, ModuleType] = {}
+
+@metrics.instrumented('orchestrator')
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    start_budget(context, reserve_ms=AGGREGATION_RESERVE_MS)
+    session = boto3.Session()
+    table = session.resource('dynamodb').Table(os.environ['RAW_DATA_TABLE'])
+    today = datetime.utcnow().strftime('%Y-%m-%d')
+    started_at = datetime.utcnow()
+
+    load_latency_history(table)
+    with metrics.timer('FetchTime'):
+        results, failed, timings = run_ingestors()
+
+    with metrics.timer('StorageTime'):
+        for module, data in results.items():
+            # Same conditional write as the ingestors, so the latest pointer never moves backwards
+            try:
+                put_module_data(table, today, module, data)
+            except ClientError as e:
+                print(f"Failed to store {module}: {e}")
+                failed[module] = f"storage error: {e}"
+
+    for module in INGESTORS:
+        module_started, module_completed = timings.get(module, (started_at, None))
+        record_completion(table, today, module, 'failed' if module in failed else 'ok',
+                          module_started, module_completed)
+
+    # Claim the day so the scheduled deadline trigger does not aggregate a second time
+    if claim_aggregation(table, today, 'orchestrator'):
+        # Modules that failed are left out of `fresh`, so the aggregator falls back to stored data
+        fresh = {module: data for module, data in results.items() if module not in failed}
+        aggregator = load_function_module('aggregator')
+        start_budget(context)
+        aggregation_started = datetime.utcnow()
+        try:
+            with metrics.timer('AggregateTime'):
+                aggregator.run_aggregation(session, fresh=fresh)
+        except Exception as e:
+            # Release the day so the deadline trigger retries from the stored module data
+            print(f"Aggregation for {today} failed: {e}")
+            metrics.count('AggregationErrors')
+            record_completion(table, today, 'aggregator', 'failed', aggregation_started)
+            release_aggregation(table, today)
+        else:
+            record_completion(table, today, 'aggregator', 'ok', aggregation_started)
+            aggregator.report_timeline(table, today)
+    else:
+        metrics.count('AggregationSkipped')
+        print(f"Aggregation for {today} already claimed by another trigger")
+
+    # Yesterday's partition is final now: roll up, archive and expire it
+    yesterday = (datetime.utcnow() - timedelta(days=1)).strftime('%Y-%m-%d')
+    try:
+        with metrics.timer('CompactTime'):
+            load_function_module('compactor').compact_day(table, session.client('s3'), os.environ['DATA_BUCKET'], yesterday)
+    except Exception as e:
+        print(f"Compaction of {yesterday} failed: {e}")
+
+    metrics.count('ModulesFailed', len(failed))
+    return {'statusCode': 200, 'body': json.dumps({'fetched': sorted(results), 'failed': sorted(failed)})}
+
+def run_ingestors() -> Tuple[Dict[str, Any], Dict[str, str], Dict[str, Tuple[datetime, datetime]]]:
+    """
+    Runs every ingestor's fetch function concurrently, each bounded by its own deadline.
+    Also returns the (started, completed) wall-clock times of every fetch that finished.
+    """
+    results: Dict[str, Any] = {}
+    failed: Dict[str, str] = {}
+    timings: Dict[str, Tuple[datetime, datetime]] = {}
+    fetchers = {}
+
+    for module, (directory, function) in INGESTORS.items():
+        try:
+            fetch = getattr(load_function_module(directory), function)
+            fetchers[module] = (fetch, 'table' in inspect.signature(fetch).parameters)
+        except Exception as e:
+            print(f"Failed to load {directory}: {e}")
+            failed[module] = f"load error: {e}"
+
+    executor = ThreadPoolExecutor(max_workers=len(fetchers) or 1, thread_name_prefix='ingestor')
+    started = time.monotonic()
+    futures = {}
+
+    for module, (fetch, takes_table) in fetchers.items():
+        deadline = _module_deadline(module)
+        ctx = contextvars.copy_context()
+        futures[module] = (executor.submit(ctx.run, _run_ingestor, module, fetch, takes_table, deadline), deadline)
+
+    for module, (future, deadline) in futures.items():
+        try:
+            results[module], timings[module] = future.result(timeout=max(0, started + deadline - time.monotonic()))
+        except FutureTimeout:
+            metrics.count('ModuleTimeouts', Source=module)
+            print(f"{module} missed its {deadline:.0f}s deadline")
+            failed[module] = 'deadline exceeded'
+        except Exception as e:
+            print(f"{module} failed: {e}")
+            failed[module] = str(e)
+
+    # Stragglers are abandoned; their fetches are already bounded by the per-module deadline
+    executor.shutdown(wait=False)
+    return results, failed, timings
+
+def _run_ingestor(module: str, fetch: Callable[..., Any], takes_table: bool,
+                  deadline: float) -> Tuple[Any, Tuple[datetime, datetime]]:
+    metrics.configure(module)
+    set_deadline(deadline)
+    started_at = datetime.utcnow()
+    kwargs = {}
+    if takes_table:
+        # boto3 sessions and resources are not thread-safe: every worker gets its own
+        kwargs['table'] = boto3.Session().resource('dynamodb').Table(os.environ['RAW_DATA_TABLE'])
+    with metrics.timer('FetchTime'):
+        data = fetch(**kwargs)
+    return data, (started_at, datetime.utcnow())
+
+def _module_deadline(module: str) -> float:
+    deadline = MODULE_DEADLINE_SECONDS.get(module, DEFAULT_MODULE_DEADLINE_SECONDS)
+    remaining = remaining_time()
+    return deadline if remaining is None else max(0.0, min(deadline, remaining))
+
+def load_function_module(directory: str) -> ModuleType:
+    """ Imports <directory>/index.py under a unique name; every function's entry point is called index. """
+    if directory not in _loaded:
+        path = os.path.join(LAMBDAS_ROOT, directory)
+        # Sibling helpers such as traffic_apis.py are imported by bare name
+        if path not in sys.path:
+            sys.path.append(path)
+        spec = importlib.util.spec_from_file_location(directory.replace('-', '_'), os.path.join(path, 'index.py'))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _loaded[directory] = module
+    return _loaded[directory]
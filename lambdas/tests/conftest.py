@@ -0,0 +1,42 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+LAMBDAS_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(LAMBDAS_ROOT, 'layer', 'python'))
+os.environ.setdefault('METRICS_SINK', 'none')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+_loaded = {}
+
+def load_function(directory):
+    """ Imports <directory>/index.py the way the orchestrator does; sibling helpers resolve by bare name. """
+    if directory not in _loaded:
+        path = os.path.join(LAMBDAS_ROOT, directory)
+        if path not in sys.path:
+            sys.path.append(path)
+        spec = importlib.util.spec_from_file_location(f"test_{directory.replace('-', '_')}", os.path.join(path, 'index.py'))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _loaded[directory] = module
+    return _loaded[directory]
+
+@pytest.fixture
+def function_module():
+    return load_function
+
+@pytest.fixture
+def raw_table():
+    """ An empty raw-data table (date/module keys) in a moto-mocked DynamoDB. """
+    moto = pytest.importorskip('moto')
+    import boto3
+    with moto.mock_aws():
+        os.environ.setdefault('RAW_DATA_TABLE', 'raw')
+        yield boto3.resource('dynamodb').create_table(
+            TableName=os.environ['RAW_DATA_TABLE'],
+            KeySchema=[{'AttributeName': 'date', 'KeyType': 'HASH'}, {'AttributeName': 'module', 'KeyType': 'RANGE'}],
+            AttributeDefinitions=[{'AttributeName': 'date', 'AttributeType': 'S'}, {'AttributeName': 'module', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
@@ -0,0 +1,23 @@
+import urllib.request
+
+import pytest
+
+@pytest.fixture
+def aggregator(function_module):
+    return function_module('aggregator')
+
+class Parameters:
+    def get_parameter(self, **kwargs):
+        return {'Parameter': {'Value': 'sk-test'}}
+
+def test_insight_falls_back_after_one_timed_out_request(aggregator, monkeypatch):
+    requests = []
+
+    def urlopen(request, timeout=None):
+        requests.append(request.full_url)
+        raise TimeoutError('The read operation timed out')
+
+    monkeypatch.setattr(urllib.request, 'urlopen', urlopen)
+    insight = aggregator.generate_ai_insight(Parameters(), {'fuel': {'diesel': 3.91}, 'freight': {'dry_van': 2.1}})
+    assert insight.startswith('Market conditions show diesel at $3.91')
+    assert requests == ['https://api.openai.com/v1/chat/completions']
@@ -0,0 +1,56 @@
+import pytest
+
+@pytest.fixture
+def alerts(function_module, monkeypatch):
+    monkeypatch.setenv('RAW_DATA_TABLE', 'raw')
+    function_module('ingestor-traffic')
+    import alerts
+    return alerts
+
+def alert(key, severity='moderate', updated=None, source='a'):
+    return {'id': key, 'severity': severity, 'updated': updated, 'sources': [source]}
+
+def test_offer_keeps_the_top_k_strongest(alerts):
+    selection = alerts.new_selection(2)
+    alerts.offer(selection, alert('old', updated='2024-01-01T00:00:00Z'))
+    alerts.offer(selection, alert('major', severity='major'))
+    alerts.offer(selection, alert('new', updated='2024-01-02T00:00:00Z'))
+    alerts.offer(selection, alert('undated'))
+    assert [a['id'] for a in alerts.selected(selection)] == ['major', 'new']
+    assert selection['offered'] == 4
+
+def test_ties_go_to_the_alert_seen_first(alerts):
+    selection = alerts.new_selection(1)
+    alerts.offer(selection, alert('first'))
+    alerts.offer(selection, alert('second'))
+    assert [a['id'] for a in alerts.selected(selection)] == ['first']
+
+def test_duplicates_merge_severity_update_and_sources(alerts):
+    selection = alerts.new_selection(2)
+    alerts.offer(selection, alert('x', updated='2024-01-01T00:00:00Z', source='wsdot'))
+    alerts.offer(selection, alert('y', updated='2024-01-03T00:00:00Z'))
+    alerts.offer(selection, alert('x', severity='major', updated=1704240000, source='511ny'))
+    merged = alerts.selected(selection)[0]
+    assert merged['id'] == 'x'
+    assert merged['severity'] == 'major'
+    assert merged['updated'] == 1704240000
+    assert merged['sources'] == ['511ny', 'wsdot']
+
+def test_merge_matches_offering_everything_to_one_selection(alerts):
+    items = [alert(f'a{i}', severity='major' if i % 3 == 0 else 'moderate', updated=1704067200 + i * 60) for i in range(12)]
+    single = alerts.new_selection(4)
+    for item in items:
+        alerts.offer(single, dict(item))
+    left, right = alerts.new_selection(4), alerts.new_selection(4)
+    for i, item in enumerate(items):
+        alerts.offer(left if i % 2 else right, dict(item))
+    alerts.merge(left, right)
+    assert [a['id'] for a in alerts.selected(left)] == [a['id'] for a in alerts.selected(single)]
+    assert left['offered'] == single['offered'] == 12
+
+def test_parse_timestamp_formats(alerts):
+    assert alerts.parse_timestamp('/Date(1704067200000-0500)/') == 1704067200
+    assert alerts.parse_timestamp('1704067200') == 1704067200
+    assert alerts.parse_timestamp(1704067200000) == 1704067200
+    assert alerts.parse_timestamp('2024-01-01T00:00:00Z') == 1704067200
+    assert alerts.parse_timestamp('soon') is None
@@ -0,0 +1,42 @@
+import urllib.error
+
+import pytest
+
+import fred
+
+@pytest.fixture
+def backfill(function_module, monkeypatch):
+    module = function_module('backfill')
+    monkeypatch.delenv('EIA_API_KEY', raising=False)
+    monkeypatch.setattr(fred, 'get_api_key', lambda: 'key')
+    written = {}
+    monkeypatch.setattr(module, 'append_rows', lambda s3, bucket, name, rows: written.update({name: rows}))
+    return module, written
+
+def test_one_failing_series_keeps_the_others(backfill, monkeypatch):
+    module, written = backfill
+    first, second = fred.INDICATORS[0], fred.INDICATORS[1]
+    def backfill_fred(api_key, indicator, start, end):
+        if indicator['series'] == first['series']:
+            raise urllib.error.HTTPError('https://api.stlouisfed.org', 503, 'Service Unavailable', {}, None)
+        if indicator['series'] == second['series']:
+            raise TimeoutError('timed out')
+        return {'2024-01-02': {indicator['series']: 1.0}}
+    monkeypatch.setattr(module, 'backfill_fred', backfill_fred)
+
+    summary = module.run_backfill(None, 'data', '2024-01-01', '2024-01-31', ['fred'])
+    assert summary == {'economic-data': 1}
+    assert set(written['economic-data']['2024-01-02']) == {
+        indicator['series'] for indicator in fred.INDICATORS[2:]}
+
+def test_rows_collected_so_far_are_written_on_unexpected_errors(backfill, monkeypatch):
+    module, written = backfill
+    def backfill_fred(api_key, indicator, start, end):
+        if indicator['series'] == fred.INDICATORS[-1]['series']:
+            raise RuntimeError('bug')
+        return {'2024-01-02': {indicator['series']: 1.0}}
+    monkeypatch.setattr(module, 'backfill_fred', backfill_fred)
+
+    with pytest.raises(RuntimeError):
+        module.run_backfill(None, 'data', '2024-01-01', '2024-01-31', ['fred'], workers=1)
+    assert len(written['economic-data']['2024-01-02']) == len(fred.INDICATORS) - 1
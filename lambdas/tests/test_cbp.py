@@ -0,0 +1,98 @@
+import json
+
+import pytest
+
+import cbp
+
+def port(number='380001', status='Open', standard=None, fast=None, date='1/2/2024', time='14:05:00'):
+    return {
+        'port_number': number, 'port_name': 'Detroit', 'crossing_name': 'Ambassador Bridge', 'border': 'Canadian Border',
+        'port_status': status, 'date': date, 'time': time,
+        'commercial_vehicle_lanes': {'standard_lanes': standard or {}, 'FAST_lanes': fast or {}},
+    }
+
+@pytest.mark.parametrize('lane, delay', [
+    ({'operational_status': 'no delay', 'delay_minutes': ''}, 0),
+    ({'operational_status': 'delay', 'delay_minutes': '25'}, 25),
+    ({'operational_status': 'Lanes Closed', 'delay_minutes': '0'}, None),
+    ({'operational_status': 'Update Pending', 'delay_minutes': '10'}, None),
+    ({'operational_status': 'delay', 'delay_minutes': 'n/a'}, None),
+    (None, None),
+])
+def test_lane_delay(lane, delay):
+    assert cbp.lane_delay(lane) == delay
+
+def test_commercial_lanes_prefers_standard_then_fast():
+    lanes = cbp.commercial_lanes(port(standard={'operational_status': 'delay', 'delay_minutes': '30', 'lanes_open': '4'},
+                                      fast={'operational_status': 'no delay'}))
+    assert lanes == {'commercial_wait': 30, 'fast_wait': 0, 'lanes_open': 4, 'lane_state': 'open'}
+    only_fast = cbp.commercial_lanes(port(fast={'operational_status': 'delay', 'delay_minutes': '12'}))
+    assert (only_fast['commercial_wait'], only_fast['lane_state']) == (12, 'open')
+
+def test_commercial_lanes_states():
+    assert cbp.commercial_lanes(port(status='Closed'))['lane_state'] == 'closed'
+    assert cbp.commercial_lanes(port(standard={'operational_status': 'Lanes Closed'}))['lane_state'] == 'closed'
+    assert cbp.commercial_lanes(port())['lane_state'] == 'no data'
+
+def test_port_updated_and_index():
+    assert cbp.port_updated(port()) == '2024-01-02 14:05'
+    assert cbp.port_updated(port(date='', time='')) is None
+    assert list(cbp.index_ports([port(), port(number=' '), port(number='090101')])) == ['380001', '090101']
+
+@pytest.fixture
+def border(function_module):
+    return function_module('ingestor-border-wait-times')
+
+def test_live_and_fallback_rows_share_the_timestamp_format(border):
+    crossings = border.configured_crossings('ambassador-bridge,380001,999999,nowhere')
+    assert [c['id'] for c in crossings] == ['ambassador-bridge', 'cbp-999999']
+    ports = border.parse_ports([port(standard={'operational_status': 'delay', 'delay_minutes': '40'})])
+    live = border.select_crossings(ports, crossings)
+    assert [(row['crossing_id'], row['status'], row['last_updated'], row['last_updated_tz']) for row in live] == [
+        ('ambassador-bridge', 'DELAYED', '2024-01-02 14:05', 'local')
+    ]
+    fallback = border._mock_results(crossings[:1])[0]
+    assert fallback['last_updated_tz'] == 'UTC'
+    assert len(fallback['last_updated']) == len('2024-01-02 14:05') and fallback['last_updated'][10] == ' '
+
+def test_unreachable_state_table_falls_back_to_the_feed(border, monkeypatch):
+    from botocore.exceptions import EndpointConnectionError
+
+    class UnreachableTable:
+        def get_item(self, **kwargs):
+            raise EndpointConnectionError(endpoint_url='https://dynamodb.us-east-1.amazonaws.com')
+        put_item = get_item
+
+    payload = b'[' + json.dumps(port(standard={'operational_status': 'no delay'})).encode() + b']'
+    monkeypatch.setattr(border, 'fetch_bytes', lambda url, timeout: payload)
+    monkeypatch.setattr(border, 'BORDER_CROSSINGS', 'ambassador-bridge')
+    rows = border.fetch_border_wait_times(UnreachableTable())
+    assert [(row['crossing_id'], row['commercial_wait'], row['status']) for row in rows] == [('ambassador-bridge', 0, 'NORMAL')]
+
+def test_feed_updated_is_the_newest_report():
+    assert cbp.feed_updated([port(time='09:00:00'), port(date='1/3/2024', time='08:00:00'), 'junk']) == '2024-01-03 08:00'
+    assert cbp.feed_updated([]) is None
+
+def test_unchanged_report_time_reuses_the_parsed_ports(border, raw_table, monkeypatch):
+    from state_store import get_state, put_state
+    cached_ports = border.parse_ports([port(standard={'operational_status': 'delay', 'delay_minutes': '40'})])
+    put_state(raw_table, border.CBP_STATE_KEY, {'digest': 'old', 'updated': '2024-01-02 14:05',
+                                                 'fetched_at': '2000-01-01T00:00:00', 'ports': cached_ports})
+    monkeypatch.setattr(border, 'BORDER_CROSSINGS', 'ambassador-bridge')
+    parsed = []
+    monkeypatch.setattr(border, 'parse_ports', lambda feed: parsed.append(feed) or {})
+
+    # Different bytes, same CBP report time: the cached ports are served
+    same_time = json.dumps([port(standard={'operational_status': 'delay', 'delay_minutes': '40'}), {'note': 'reordered'}]).encode()
+    monkeypatch.setattr(border, 'fetch_bytes', lambda url, timeout: same_time)
+    assert border.fetch_border_wait_times(raw_table)[0]['commercial_wait'] == 40
+    assert parsed == []
+    assert get_state(raw_table, border.CBP_STATE_KEY)['updated'] == '2024-01-02 14:05'
+
+    # A newer report is parsed
+    newer = json.dumps([port(time='15:05:00')]).encode()
+    monkeypatch.setattr(border, 'fetch_bytes', lambda url, timeout: newer)
+    put_state(raw_table, border.CBP_STATE_KEY, {**get_state(raw_table, border.CBP_STATE_KEY), 'fetched_at': '2000-01-01T00:00:00'})
+    border.fetch_border_wait_times(raw_table)
+    assert len(parsed) == 1
+    assert get_state(raw_table, border.CBP_STATE_KEY)['updated'] == '2024-01-02 15:05'
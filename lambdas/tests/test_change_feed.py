@@ -0,0 +1,30 @@
+from change_feed import coalesce_changes, is_stream_event, item_data, stream_record
+
+def record(module, timestamp, data='{}', date='2024-01-15', event_name='MODIFY'):
+    return stream_record({'date': date, 'module': module, 'data': data, 'timestamp': timestamp}, event_name)
+
+def test_keeps_newest_image_per_date_and_module():
+    event = {'Records': [
+        record('traffic', '2024-01-15T10:00:00', '{"n": 1}'),
+        record('traffic', '2024-01-15T10:15:00', '{"n": 2}'),
+        record('traffic', '2024-01-15T10:05:00', '{"n": 3}'),
+        record('fuel', '2024-01-15T09:00:00'),
+    ]}
+    changes = coalesce_changes(event)
+    assert sorted(changes) == [('2024-01-15', 'fuel'), ('2024-01-15', 'traffic')]
+    assert item_data(changes[('2024-01-15', 'traffic')]) == {'n': 2}
+
+def test_ignores_bookkeeping_snapshots_and_deletes():
+    event = {'Records': [
+        record('cbp#bwt', '2024-01-15T10:00:00', date='state'),
+        record('run#traffic', '2024-01-15T10:00:00'),
+        record('traffic#10:15', '2024-01-15T10:15:00'),
+        record('traffic#daily', '2024-01-16T01:00:00'),
+        record('traffic', '2024-01-15T10:15:00', event_name='REMOVE'),
+    ]}
+    assert coalesce_changes(event) == {}
+
+def test_is_stream_event():
+    assert is_stream_event({'Records': [record('fuel', 't')]})
+    assert not is_stream_event({'trigger': 'deadline'})
+    assert not is_stream_event({'Records': []})
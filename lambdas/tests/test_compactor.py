@@ -0,0 +1,63 @@
+import gzip
+import json
+
+import pytest
+
+@pytest.fixture
+def compactor(function_module):
+    return function_module('compactor')
+
+@pytest.fixture
+def bucket(raw_table):
+    import boto3
+    s3 = boto3.client('s3')
+    s3.create_bucket(Bucket='data')
+    return s3
+
+def put(table, module, data, date='2024-01-15', **extra):
+    table.put_item(Item={'date': date, 'module': module, 'data': json.dumps(data), 'timestamp': '2024-01-15T10:00:00', **extra})
+
+def test_rollup_merges_numbers_lists_and_dicts(compactor):
+    assert compactor.rollup([1, 3, 2]) == {'min': 1, 'max': 3, 'mean': 2.0, 'last': 2}
+    assert compactor.rollup([[{'a': 1}], [{'a': 1}, {'a': 2}]]) == [{'a': 1}, {'a': 2}]
+    assert compactor.rollup([{'price': 1.0, 'status': 'ok'}, {'price': 3.0, 'status': 'late'}]) == {
+        'price': {'min': 1.0, 'max': 3.0, 'mean': 2.0, 'last': 3.0}, 'status': 'late'}
+    assert compactor.rollup([None, None]) is None
+
+def test_compact_day_archives_rolls_up_and_sets_ttl(compactor, raw_table, bucket):
+    put(raw_table, 'fuel', {'diesel': 4.0})
+    put(raw_table, 'fuel#09:00', {'diesel': 3.0})
+    put(raw_table, 'fuel#10:00', {'diesel': 4.0})
+
+    summary = compactor.compact_day(raw_table, bucket, 'data', '2024-01-15')
+    assert summary['archived'] and summary['rolled_up'] == ['fuel']
+
+    archive = gzip.decompress(bucket.get_object(Bucket='data', Key='archive/raw/2024-01-15.jsonl.gz')['Body'].read())
+    assert len(archive.decode().splitlines()) == 3
+    daily = raw_table.get_item(Key={'date': '2024-01-15', 'module': 'fuel#daily'})['Item']
+    assert json.loads(daily['data']) == {'diesel': {'min': 3.0, 'max': 4.0, 'mean': 3.5, 'last': 4.0}}
+    latest = raw_table.get_item(Key={'date': '2024-01-15', 'module': 'fuel'})['Item']
+    assert 'expires_at' in latest and json.loads(latest['data']) == {'diesel': 4.0}
+
+def test_existing_ttl_is_not_overwritten(compactor, raw_table, bucket):
+    put(raw_table, 'fuel', {'diesel': 4.0}, expires_at=123)
+    compactor.compact_day(raw_table, bucket, 'data', '2024-01-15')
+    assert raw_table.get_item(Key={'date': '2024-01-15', 'module': 'fuel'})['Item']['expires_at'] == 123
+
+def test_rerun_keeps_the_archive_and_rollup(compactor, raw_table, bucket):
+    put(raw_table, 'fuel#09:00', {'diesel': 3.0})
+    put(raw_table, 'fuel#10:00', {'diesel': 4.0})
+    compactor.compact_day(raw_table, bucket, 'data', '2024-01-15')
+    archive = bucket.get_object(Bucket='data', Key='archive/raw/2024-01-15.jsonl.gz')['Body'].read()
+
+    # The snapshots expire; a late item arrives without a TTL
+    raw_table.delete_item(Key={'date': '2024-01-15', 'module': 'fuel#09:00'})
+    raw_table.delete_item(Key={'date': '2024-01-15', 'module': 'fuel#10:00'})
+    put(raw_table, 'traffic', [])
+
+    summary = compactor.compact_day(raw_table, bucket, 'data', '2024-01-15')
+    assert summary['skipped']
+    assert bucket.get_object(Bucket='data', Key='archive/raw/2024-01-15.jsonl.gz')['Body'].read() == archive
+    daily = raw_table.get_item(Key={'date': '2024-01-15', 'module': 'fuel#daily'})['Item']
+    assert daily['snapshots'] == 2
+    assert 'expires_at' in raw_table.get_item(Key={'date': '2024-01-15', 'module': 'traffic'})['Item']
@@ -0,0 +1,35 @@
+import random
+
+import pytest
+
+import corridors
+
+def test_nearest_segments_matches_every_corridor_in_range():
+    los_angeles, middle_of_nevada = (34.05, -118.24), (38.5, -117.0)
+    near, far = corridors.nearest_segments([los_angeles, middle_of_nevada], vectorized=False)
+    assert {match['corridor'] for match in near} >= {'I-5', 'I-10'}
+    assert all(match['state'] == 'CA' and match['distance_km'] < 1 for match in near if match['corridor'] in ('I-5', 'I-10'))
+    assert far == []
+
+def test_state_comes_from_the_closer_segment_end():
+    near_eugene, near_redding = (43.9, -123.0), (40.7, -122.4)
+    states = [next(m['state'] for m in matches if m['corridor'] == 'I-5')
+              for matches in corridors.nearest_segments([near_eugene, near_redding], vectorized=False)]
+    assert states == ['OR', 'CA']
+
+def test_vectorized_and_pure_paths_agree():
+    pytest.importorskip('numpy')
+    rng = random.Random(3)
+    points = [(rng.uniform(25, 49), rng.uniform(-124, -67)) for _ in range(300)]
+    assert corridors.nearest_segments(points) == corridors.nearest_segments(points, vectorized=False)
+
+def test_join_groups_items_by_corridor_and_state():
+    view = corridors.join({
+        'traffic': [{'road': 'I-10', 'state': 'TX'}, {'road': 'I-10', 'state': 'WA'}],
+        'weather': [{'name': 'Houston', 'coordinates': {'lat': 29.76, 'lon': -95.37}}],
+        'border': [{'crossing_id': 'nowhere'}],
+    }, max_km=corridors.MAX_DISTANCE_KM)
+    assert view[0]['corridor'] == 'I-10' and view[0]['state'] == 'TX'
+    assert view[0]['traffic'] == [{'road': 'I-10', 'state': 'TX'}]
+    assert [item['name'] for item in view[0]['weather']] == ['Houston']
+    assert all(entry['state'] != 'WA' or entry['corridor'] != 'I-10' for entry in view)
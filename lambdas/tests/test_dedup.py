@@ -0,0 +1,25 @@
+from dedup import cluster_titles, dedupe, normalize_title
+
+def test_normalize_title_strips_bylines_and_punctuation():
+    assert normalize_title('Port Strike Ends! - Reuters') == 'port strike ends'
+    assert normalize_title('Port strike ends | AP News') == 'port strike ends'
+
+def test_cluster_titles_groups_near_duplicates():
+    titles = [
+        'Dockworkers strike at East Coast ports over automation',
+        'Diesel prices fall for third week',
+        'Dockworkers Strike At East Coast Ports Over Automation - Bloomberg',
+        'Dockworkers strike at East Coast port over automation',
+    ]
+    assert cluster_titles(titles) == [[0, 2, 3], [1]]
+
+def test_dedupe_counts_sources_and_keeps_the_lowest_rank():
+    items = [
+        {'title': 'Rail union talks collapse', 'source': 'x', 'rank': 2},
+        {'title': 'Rail union talks collapse - CNBC', 'source': 'y', 'rank': 1},
+        {'title': 'Rail union talks collapse', 'source': 'x', 'rank': 3},
+    ]
+    assert dedupe(items)[0]['source_count'] == 2
+    assert dedupe(items)[0]['rank'] == 2
+    assert dedupe(items, rank=lambda item: item['rank'])[0]['source'] == 'y'
+    assert dedupe(items, source_key=None)[0] is items[0]
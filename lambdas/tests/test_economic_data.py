@@ -0,0 +1,30 @@
+import urllib.error
+
+import pytest
+
+import fred
+
+@pytest.fixture
+def economic(function_module):
+    return function_module('ingestor-economic-data')
+
+CACHED = {'observations': [['2024-01-01', 3.7], ['2024-02-01', 3.9]], 'checked_on': '2000-01-01'}
+
+@pytest.mark.parametrize('error', [
+    urllib.error.HTTPError('https://api.stlouisfed.org', 500, 'Internal Server Error', {}, None),
+    urllib.error.URLError('connection refused'),
+    TimeoutError('timed out'),
+])
+def test_transport_errors_fall_back_to_the_cache(economic, monkeypatch, error):
+    def fetch_observations(*args, **kwargs):
+        raise error
+    monkeypatch.setattr(fred, 'fetch_observations', fetch_observations)
+
+    assert economic.sync_series('key', 'UNRATE', CACHED, {}) == (CACHED, False, False)
+
+def test_new_observations_extend_the_cache(economic, monkeypatch):
+    monkeypatch.setattr(fred, 'fetch_observations', lambda *args, **kwargs: [{'date': '2024-03-01', 'value': 3.8}])
+
+    cache, fetched, released = economic.sync_series('key', 'UNRATE', CACHED, {})
+    assert fetched and released
+    assert cache['observations'][-1] == ['2024-03-01', 3.8]
@@ -0,0 +1,138 @@
+import http.client
+import time
+import urllib.error
+
+import pytest
+
+import fetcher
+
+HOST = 'api.example.com'
+URL = f'https://{HOST}/data'
+
+@pytest.fixture(autouse=True)
+def clean_state(monkeypatch):
+    fetcher._breakers.clear()
+    fetcher._histograms.clear()
+    fetcher.set_deadline(None)
+    monkeypatch.setattr(fetcher.random, 'uniform', lambda low, high: 0.0)
+    yield
+    fetcher._breakers.clear()
+    fetcher._histograms.clear()
+    fetcher.set_deadline(None)
+
+def half_open():
+    """ A breaker whose cooldown has passed, so the next request is the single trial. """
+    fetcher._breakers[HOST] = {
+        'failures': fetcher.BREAKER_FAILURE_THRESHOLD,
+        'opened_at': time.monotonic() - fetcher.BREAKER_COOLDOWN_SECONDS - 1,
+        'trial_in_flight': False,
+    }
+
+def test_retries_then_succeeds(monkeypatch):
+    responses = [urllib.error.URLError('reset'), b'ok']
+    def request(url, headers, data, timeout):
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+    monkeypatch.setattr(fetcher, '_request', request)
+
+    assert fetcher.fetch_bytes(URL) == b'ok'
+    assert HOST not in fetcher._breakers
+
+def test_breaker_opens_after_threshold(monkeypatch):
+    def request(url, headers, data, timeout):
+        raise urllib.error.URLError('down')
+    monkeypatch.setattr(fetcher, '_request', request)
+
+    for _ in range(fetcher.BREAKER_FAILURE_THRESHOLD):
+        with pytest.raises(urllib.error.URLError):
+            fetcher.fetch_bytes(URL, attempts=1)
+    with pytest.raises(fetcher.CircuitOpenError):
+        fetcher.fetch_bytes(URL, attempts=1)
+
+def test_http_exception_fails_the_trial_and_reopens(monkeypatch):
+    half_open()
+    def request(url, headers, data, timeout):
+        raise http.client.IncompleteRead(b'partial')
+    monkeypatch.setattr(fetcher, '_request', request)
+
+    with pytest.raises(http.client.IncompleteRead):
+        fetcher.fetch_bytes(URL)
+    breaker = fetcher._breakers[HOST]
+    assert breaker['trial_in_flight'] is False
+    assert time.monotonic() - breaker['opened_at'] < 1
+
+def test_deadline_does_not_claim_the_trial(monkeypatch):
+    half_open()
+    monkeypatch.setattr(fetcher, '_request', lambda *args: pytest.fail('no request expected'))
+    fetcher.set_deadline(-1)
+
+    with pytest.raises(fetcher.DeadlineExceeded):
+        fetcher.fetch_bytes(URL)
+    assert fetcher._breakers[HOST]['trial_in_flight'] is False
+
+def test_unexpected_error_releases_the_trial(monkeypatch):
+    half_open()
+    def request(url, headers, data, timeout):
+        raise ValueError('unknown url type')
+    monkeypatch.setattr(fetcher, '_request', request)
+
+    with pytest.raises(ValueError):
+        fetcher.fetch_bytes(URL)
+    assert fetcher._breakers[HOST]['trial_in_flight'] is False
+    # The next caller gets the trial instead of a permanently open circuit
+    monkeypatch.setattr(fetcher, '_request', lambda *args: b'ok')
+    assert fetcher.fetch_bytes(URL) == b'ok'
+    assert HOST not in fetcher._breakers
+
+def test_open_stream_releases_the_trial_on_http_exception(monkeypatch):
+    half_open()
+    def urlopen(request, timeout):
+        raise http.client.BadStatusLine('garbage')
+    monkeypatch.setattr(fetcher.urllib.request, 'urlopen', urlopen)
+
+    with pytest.raises(http.client.BadStatusLine):
+        with fetcher.open_stream(URL):
+            pass
+    assert fetcher._breakers[HOST]['trial_in_flight'] is False
+
+class FakeResponse:
+    def __init__(self, body):
+        self.body = body
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        return False
+    def read(self):
+        return self.body
+
+def samples(host=HOST):
+    return sum(fetcher._histograms.get(host, []))
+
+def test_timed_out_attempt_is_recorded_at_its_timeout(monkeypatch):
+    def urlopen(request, timeout):
+        raise urllib.error.URLError(TimeoutError('timed out'))
+    monkeypatch.setattr(fetcher.urllib.request, 'urlopen', urlopen)
+
+    with pytest.raises(urllib.error.URLError):
+        fetcher._request(URL, None, None, 5)
+    assert samples() == 1
+    assert fetcher.latency_percentile(HOST, 50, min_samples=1) >= 5000
+
+def test_hedged_request_records_one_sample(monkeypatch):
+    calls = []
+    def urlopen(request, timeout):
+        calls.append(timeout)
+        if len(calls) == 1:
+            time.sleep(0.3)
+        return FakeResponse(b'ok')
+    monkeypatch.setattr(fetcher.urllib.request, 'urlopen', urlopen)
+    monkeypatch.setattr(fetcher, '_hedge_delay', lambda host: 0.02)
+    monkeypatch.setattr(fetcher, '_hedges_remaining', 1)
+
+    assert fetcher._hedged_request(URL, None, 5) == b'ok'
+    # Wait for the slow primary to finish so a stray sample from it would show up
+    time.sleep(0.4)
+    assert len(calls) == 2
+    assert samples() == 1
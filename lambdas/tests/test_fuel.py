@@ -0,0 +1,28 @@
+import urllib.request
+
+import pytest
+
+from state_store import put_state
+
+@pytest.fixture
+def fuel(function_module, raw_table, monkeypatch):
+    module = function_module('ingestor-fuel')
+    monkeypatch.setenv('EIA_API_KEY', 'test-key')
+    monkeypatch.setattr(module, 'get_news_items', lambda url, count: [])
+
+    def urlopen(request, timeout=None):
+        raise TimeoutError('The read operation timed out')
+
+    monkeypatch.setattr(urllib.request, 'urlopen', urlopen)
+    return module
+
+def test_read_timeout_falls_back_to_the_cached_matrix(fuel, raw_table):
+    put_state(raw_table, fuel.EIA_STATE_KEY, {'period': '2000-01-03', 'matrix': {'us': {'diesel': 3.99, 'gasoline': 3.1}},
+                                              'checked_on': '2000-01-03'})
+    result = fuel.fetch_fuel_prices(raw_table)
+    assert (result['diesel'], result['as_of']) == (3.99, '2000-01-03')
+
+def test_read_timeout_without_a_cache_serves_the_mock_matrix(fuel, raw_table):
+    result = fuel.fetch_fuel_prices(raw_table)
+    assert result['as_of'] is None
+    assert result['regions'] == {region: prices for region, prices in fuel.MOCK_REGIONS.items() if region != 'us'}
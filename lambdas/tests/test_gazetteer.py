@@ -0,0 +1,28 @@
+import pytest
+
+from gazetteer import build_index, tag
+
+@pytest.mark.parametrize('title', [
+    'Dockworkers at LA port walk out',
+    'PORT STRIKE IN OAKLAND OR LA',
+    'Washington weighs new tariffs',
+    'Savannah Bananas sell out',
+    'Memphis Grizzlies win in overtime',
+])
+def test_common_words_and_bare_city_names_are_not_entities(title):
+    assert tag(title) == []
+
+def test_bare_city_names_count_next_to_a_logistics_word():
+    assert tag('Savannah port volumes climb') == ['port:USSAV']
+    assert tag('FedEx hub in Memphis expands') == ['hub:MEM']
+    assert tag('Trucks back up at Laredo crossing') == ['crossing:laredo-world-trade-bridge']
+
+def test_longest_alias_wins_and_codes_match_in_mixed_case():
+    assert tag('Port of New York and New Jersey backlog') == ['port:USNYC']
+    assert tag('Storm closes I-95 in NC') == ['interstate:I-95', 'state:NC']
+    assert tag('STORM CLOSES I-95 IN NC') == ['interstate:I-95']
+    assert tag('Washington State ferries halted') == ['state:WA']
+
+def test_custom_index():
+    index = build_index({'port:XYZ': ['Port Xyz'], 'state:TX': ['Texas', 'TX']})
+    assert tag('Port Xyz reopens after TX storm', index) == ['port:XYZ', 'state:TX']
@@ -0,0 +1,65 @@
+import http.client
+import io
+import zipfile
+from contextlib import contextmanager
+
+import pytest
+
+import gdelt_export
+
+def zipped(text, method=zipfile.ZIP_DEFLATED):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w', method) as zf:
+        zf.writestr('20240101000000.export.CSV', text)
+    return archive.getvalue()
+
+def event_row(code, country, adm1):
+    fields = [''] * 61
+    fields[gdelt_export.EVENT_CODE_COLUMN] = code
+    fields[gdelt_export.ACTION_COUNTRY_COLUMN] = country
+    fields[gdelt_export.ACTION_ADM1_COLUMN] = adm1
+    return '\t'.join(fields)
+
+LINES = [f'row {i}\twith\ttabs' for i in range(2000)]
+
+@pytest.mark.parametrize('method', [zipfile.ZIP_DEFLATED, zipfile.ZIP_STORED])
+@pytest.mark.parametrize('chunk_size', [1, 7, 64 * 1024])
+def test_iter_zip_lines_matches_zipfile(method, chunk_size):
+    data = zipped('\r\n'.join(LINES), method)
+    assert list(gdelt_export.iter_zip_lines(io.BytesIO(data), chunk_size)) == [line.encode() for line in LINES]
+
+def test_iter_zip_lines_rejects_truncated_and_foreign_streams():
+    data = zipped('\n'.join(LINES))
+    with pytest.raises(ValueError):
+        list(gdelt_export.iter_zip_lines(io.BytesIO(data[:len(data) // 2])))
+    with pytest.raises(ValueError):
+        list(gdelt_export.iter_zip_lines(io.BytesIO(b'not a zip file at all, just text')))
+
+def test_aggregate_lines_counts_disruptions_per_region():
+    lines = [
+        event_row('1431', 'US', 'USCA'),
+        event_row('143', 'US', 'USCA'),
+        event_row('191', 'CH', 'CH30'),
+        event_row('042', 'US', 'USTX'),   # not a disruption
+        event_row('145', 'UK', 'UKH9'),   # country not covered
+        'short\trow',
+    ]
+    summary = gdelt_export.aggregate_lines(line.encode() for line in lines)
+    assert summary['regions'] == {'USCA': {'strike': 2}, 'CH': {'blockade': 1}}
+    assert summary['rows_scanned'] == 6 and summary['rows_matched'] == 3
+
+def test_fetch_export_counts_skips_a_broken_download(monkeypatch):
+    good = zipped(event_row('143', 'US', 'USCA'))
+
+    class Dropped(io.BytesIO):
+        def read(self, size=-1):
+            raise http.client.IncompleteRead(b'', 100)
+
+    @contextmanager
+    def open_stream(url, timeout):
+        yield Dropped() if 'broken' in url else io.BytesIO(good)
+    monkeypatch.setattr(gdelt_export, 'open_stream', open_stream)
+
+    summary = gdelt_export.fetch_export_counts(['http://x/broken.export.CSV.zip', 'http://x/ok.export.CSV.zip'])
+    assert summary['files'] == 1
+    assert summary['regions'] == {'USCA': {'strike': 1}}
@@ -0,0 +1,46 @@
+from botocore.exceptions import EndpointConnectionError
+import pytest
+
+import gdelt_export
+
+class UnreachableTable:
+    def get_item(self, **kwargs):
+        raise EndpointConnectionError(endpoint_url='https://dynamodb.us-east-1.amazonaws.com')
+    def put_item(self, **kwargs):
+        raise EndpointConnectionError(endpoint_url='https://dynamodb.us-east-1.amazonaws.com')
+
+@pytest.fixture
+def global_events(function_module):
+    return function_module('ingestor-global-events')
+
+def test_event_counts_survive_an_unreachable_state_table(global_events, monkeypatch):
+    monkeypatch.setattr(gdelt_export, 'export_urls', lambda kind, windows: ['http://x/20240101000000.export.CSV.zip'])
+    monkeypatch.setattr(gdelt_export, 'fetch_export_counts', lambda urls, kind: {'regions': {'USCA': {'strike': 1}}, 'files': 1})
+    counts = global_events.fetch_event_counts(UnreachableTable(), 1)
+    assert counts['regions'] == {'USCA': {'strike': 1}}
+
+def test_event_counts_fall_back_to_the_cache(global_events, raw_table, monkeypatch):
+    from state_store import put_state
+    put_state(raw_table, global_events.GDELT_EXPORT_STATE_KEY, {'urls': ['old'], 'counts': {'regions': {'CH': {'blockade': 2}}}})
+    monkeypatch.setattr(gdelt_export, 'export_urls', lambda kind, windows: ['new'])
+    monkeypatch.setattr(gdelt_export, 'fetch_export_counts', lambda urls, kind: {'regions': {}, 'files': 0})
+    assert global_events.fetch_event_counts(raw_table, 1) == {'regions': {'CH': {'blockade': 2}}}
+
+def test_select_events_keeps_the_authoritative_copy(global_events):
+    articles = [
+        {'title': 'Port strike halts cargo at Rotterdam - Daily Blog', 'domain': 'dailyblog.net', 'seendate': '20240101T090000Z'},
+        {'title': 'Port strike halts cargo at Rotterdam - Reuters', 'domain': 'www.reuters.com', 'seendate': '20240101T110000Z'},
+        {'title': 'Port strike halts cargo at Rotterdam', 'domain': 'aggregator.io', 'seendate': '20240101T080000Z'},
+    ]
+    events = global_events.select_events(articles, '20240101T000000Z')
+    assert len(events) == 1
+    assert events[0]['source'] == 'www.reuters.com'
+    assert events[0]['source_count'] == 3
+
+def test_select_events_prefers_the_earliest_copy_among_equals(global_events):
+    articles = [
+        {'title': 'Shipping rates jump on canal delays', 'domain': 'a.example', 'seendate': '20240101T120000Z'},
+        {'title': 'Shipping rates jump on canal delays', 'domain': 'b.example', 'seendate': '20240101T070000Z'},
+        {'title': 'Shipping rates jump on canal delays', 'domain': 'c.example'},
+    ]
+    assert global_events.select_events(articles, 'now')[0]['source'] == 'b.example'
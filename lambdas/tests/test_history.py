@@ -0,0 +1,48 @@
+import io
+
+import pytest
+
+from history_store import extract_series, read_history
+
+class MemoryS3:
+    def __init__(self):
+        self.objects = {}
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.objects[Key] = Body if isinstance(Body, bytes) else Body.encode()
+    def get_object(self, Bucket, Key):
+        from botocore.exceptions import ClientError
+        if Key not in self.objects:
+            raise ClientError({'Error': {'Code': 'NoSuchKey'}}, 'GetObject')
+        return {'Body': io.BytesIO(self.objects[Key])}
+
+@pytest.fixture
+def aggregator(function_module):
+    return function_module('aggregator')
+
+def test_extract_series_reads_fields_matrices_and_rows():
+    assert extract_series('fuel', {'diesel': 3.9, 'national_avg': 3.1, 'regions': {'padd1': {'diesel': 4.0}}, 'as_of': '2024-01-01'}) == {
+        'national_avg': 3.1, 'diesel': 3.9, 'padd1.diesel': 4.0
+    }
+    assert extract_series('economic-data', [{'name': 'WTI Crude Oil', 'value': 71.2}]) == {'wti_crude_oil.value': 71.2}
+
+def test_fallback_payloads_and_rows_are_not_archived(function_module, monkeypatch):
+    fuel = function_module('ingestor-fuel')
+    monkeypatch.delenv('EIA_API_KEY', raising=False)
+    monkeypatch.setattr(fuel, 'get_news_items', lambda url, count: [])
+    assert extract_series('fuel', fuel.fetch_fuel_prices()) == {}
+
+    border = function_module('ingestor-border-wait-times')
+    assert extract_series('border-wait-times', border._mock_results(border.configured_crossings('otay-mesa'))) == {}
+    assert extract_series('air-traffic', {'total_flights_in_bbox': 4250, 'data_source': 'Mock Data'}) == {}
+    mixed = [{'name': 'Otay Mesa', 'commercial_wait': 35, 'data_source': 'Mock Data'}, {'name': 'Peace Bridge', 'commercial_wait': 10}]
+    assert extract_series('border-wait-times', mixed) == {'peace_bridge.commercial_wait': 10.0}
+
+def test_archive_history_skips_mock_modules(aggregator):
+    s3 = MemoryS3()
+    aggregator.archive_history(s3, 'data', '2024-01-02', {
+        'fuel': {'national_avg': 3.45, 'diesel': 4.12, 'regions': {}, 'as_of': None, 'data_source': 'Mock Data'},
+        'freight': {'dry_van': 2.15, 'reefer': 2.68, 'flatbed': 2.92},
+    })
+    assert not [key for key in s3.objects if key.startswith('history/fuel/')]
+    history = read_history(s3, 'data', 'freight', ['dry_van'], '2024-01-01', '2024-01-31')
+    assert list(history['dry_van']) == [2.15]
@@ -0,0 +1,24 @@
+from keywords import classify, compile_terms, find_terms, word_forms
+
+def test_word_forms_only_adds_real_inflections():
+    assert word_forms('war') == {'war', 'wars', 'warring'}
+    assert word_forms('closure') == {'closure', 'closures'}
+    assert word_forms('shortage') == {'shortage', 'shortages'}
+    assert word_forms('blocked') == {'blocked'}
+    assert word_forms('ports') == {'ports'}
+
+def test_classify_ignores_words_that_merely_start_with_a_term():
+    assert classify('Ward wins election')['impact_level'] == 'LOW'
+    assert classify('Warehouse wares on display')['impact_level'] == 'LOW'
+    assert classify('Warring factions close the strait')['impact_level'] == 'HIGH'
+
+def test_classify_sums_weights_and_takes_the_highest_level():
+    result = classify('Striking dockworkers cause delays and congestion')
+    assert result['terms'] == ['strike', 'delay', 'congestion']
+    assert result['weight'] == 5.0
+    assert result['impact_level'] == 'HIGH'
+
+def test_find_terms_prefers_the_longest_term():
+    lexicon = compile_terms(dict.fromkeys(['war', 'trade war', 'supply chain']))
+    assert find_terms('Trade wars squeeze supply chains', lexicon) == ['trade war', 'supply chain']
+    assert find_terms('War in the supplies chain', lexicon) == ['war']
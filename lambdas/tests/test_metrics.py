@@ -0,0 +1,42 @@
+import pytest
+
+import metrics
+
+@pytest.fixture(autouse=True)
+def local_sink():
+    metrics.configure('test', sink='local')
+    yield
+    metrics.flush()
+    metrics.configure('unknown', sink='none')
+
+def test_instrumented_flushes_when_handler_raises(capsys):
+    @metrics.instrumented('failing')
+    def handler(event, context):
+        metrics.count('Started')
+        raise RuntimeError('boom')
+
+    with pytest.raises(RuntimeError):
+        handler({}, None)
+
+    output = capsys.readouterr().out
+    assert 'Module=failing' in output
+    assert 'Started=1' in output
+    assert 'HandlerErrors=1' in output
+    assert metrics.flush() == []
+
+def test_instrumented_flushes_on_return(capsys):
+    @metrics.instrumented('ok')
+    def handler(event, context):
+        metrics.count('Done')
+        return {'statusCode': 200}
+
+    assert handler({}, None) == {'statusCode': 200}
+    output = capsys.readouterr().out
+    assert 'Done=1' in output
+    assert 'HandlerErrors' not in output
+
+def test_flush_splits_values_into_records_of_100():
+    for value in range(250):
+        metrics.put('Latency', value, 'Milliseconds')
+    records = metrics.flush()
+    assert [len(record['Latency']) for record in records] == [100, 100, 50]
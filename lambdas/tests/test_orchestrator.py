@@ -0,0 +1,79 @@
+import json
+import os
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from run_tracker import claim_aggregation
+
+@pytest.fixture
+def orchestrator(function_module, raw_table, monkeypatch):
+    monkeypatch.setenv('DATA_BUCKET', 'data')
+    orch = function_module('orchestrator')
+    calls = []
+    stubs = {
+        'aggregator': SimpleNamespace(
+            run_aggregation=lambda session, fresh: calls.append(('aggregate', sorted(fresh))),
+            report_timeline=lambda table, date: None
+        ),
+        'compactor': SimpleNamespace(compact_day=lambda *args: calls.append(('compact',))),
+    }
+    monkeypatch.setattr(orch, 'load_function_module', lambda directory: stubs[directory])
+    monkeypatch.setattr(orch, 'run_ingestors', lambda: ({'fuel': {'diesel': 3.9}}, {}, {}))
+    return orch, calls
+
+def today():
+    return datetime.utcnow().strftime('%Y-%m-%d')
+
+def test_aggregates_when_it_wins_the_claim(orchestrator):
+    orch, calls = orchestrator
+    orch.handler({}, {})
+    assert ('aggregate', ['fuel']) in calls
+
+def test_skips_aggregation_when_the_day_is_already_claimed(orchestrator, raw_table):
+    orch, calls = orchestrator
+    assert claim_aggregation(raw_table, today(), 'deadline')
+    orch.handler({}, {})
+    assert not [call for call in calls if call[0] == 'aggregate']
+    # Compaction of yesterday still runs
+    assert ('compact',) in calls
+
+def test_latest_pointer_never_moves_backwards(orchestrator, raw_table):
+    orch, _ = orchestrator
+    newer = {'date': today(), 'module': 'fuel', 'data': json.dumps({'diesel': 4.1}), 'timestamp': '9999-01-01T00:00:00'}
+    raw_table.put_item(Item=newer)
+
+    orch.handler({}, {})
+    assert raw_table.get_item(Key={'date': today(), 'module': 'fuel'})['Item']['data'] == newer['data']
+    snapshots = raw_table.query(
+        KeyConditionExpression='#d = :d AND begins_with(#m, :m)',
+        ExpressionAttributeNames={'#d': 'date', '#m': 'module'},
+        ExpressionAttributeValues={':d': today(), ':m': 'fuel#'}
+    )['Items']
+    assert [json.loads(item['data']) for item in snapshots] == [{'diesel': 3.9}]
+
+def test_fetchers_taking_a_table_get_their_own(function_module, raw_table, monkeypatch):
+    orch = function_module('orchestrator')
+    seen = []
+    def fetch(table=None):
+        seen.append(table)
+        return []
+    data, _ = orch._run_ingestor('fuel', fetch, True, 10)
+    assert data == [] and seen[0] is not None and seen[0].name == os.environ['RAW_DATA_TABLE']
+
+def test_failed_aggregation_releases_the_day_and_still_compacts(orchestrator, raw_table, monkeypatch):
+    orch, calls = orchestrator
+    def fail(session, fresh):
+        raise TimeoutError('The read operation timed out')
+    stubs = {
+        'aggregator': SimpleNamespace(run_aggregation=fail, report_timeline=lambda table, date: None),
+        'compactor': SimpleNamespace(compact_day=lambda *args: calls.append(('compact',))),
+    }
+    monkeypatch.setattr(orch, 'load_function_module', lambda directory: stubs[directory])
+    orch.handler({}, {})
+    assert ('compact',) in calls
+    marker = json.loads(raw_table.get_item(Key={'date': today(), 'module': 'run#aggregator'})['Item']['data'])
+    assert marker['status'] == 'failed'
+    # The deadline trigger can claim the day again
+    assert claim_aggregation(raw_table, today(), 'deadline')
@@ -0,0 +1,32 @@
+import pytest
+
+from roads import extract, merge
+
+@pytest.mark.parametrize('text, road, direction, milepost', [
+    ('Crash on I-5 northbound near MP 12', 'I-5', 'North', 12.0),
+    ('I-5 North at Main St', 'I-5', 'North', None),
+    ('North I-5 closed', 'I-5', 'North', None),
+    ('US Highway 101 S/B lane closure at mile marker 45.5', 'US-101', 'South', 45.5),
+    ('Hwy 17 EB closed', 'SR-17', 'East', None),
+    ('Interstate 80 WESTBOUND', 'I-80', 'West', None),
+])
+def test_extract(text, road, direction, milepost):
+    ref = extract(text)
+    assert (ref['road'], ref['direction'], ref['milepost']) == (road, direction, milepost)
+
+@pytest.mark.parametrize('text', [
+    'Crash on I-40 in North Carolina',
+    'I-95 South Carolina welcome center closed',
+    'West Main St closed near I-84',
+    'Crash on I-40 West Memphis',
+])
+def test_place_names_are_not_directions(text):
+    assert extract(text)['direction'] is None
+
+def test_direction_after_the_route_wins():
+    assert extract('Southbound detour: I-5 North closed')['direction'] == 'North'
+
+def test_merge_fills_missing_fields():
+    ref = merge(extract('I-5'), extract('northbound near milepost 7'))
+    assert (ref['road'], ref['direction'], ref['milepost']) == ('I-5', 'North', 7.0)
+    assert extract(None)['road'] is None
@@ -0,0 +1,61 @@
+import pytest
+
+@pytest.fixture
+def traffic_apis(function_module, monkeypatch):
+    monkeypatch.setenv('RAW_DATA_TABLE', 'raw')
+    function_module('ingestor-traffic')
+    import traffic_apis
+    return traffic_apis
+
+def provider(key_env, url, **overrides):
+    return {
+        'state': 'CA', 'key_env': key_env, 'url': url, 'auth': ('query', 'key'), 'params': {},
+        'records': 'events', 'pagination': None,
+        'fields': {'road': 'road', 'description': 'text', 'severity': 'severity', 'updated': 'updated'},
+        **overrides,
+    }
+
+def test_offset_pagination_stops_on_a_short_page(traffic_apis, monkeypatch):
+    pages = {0: [{'n': 1}, {'n': 2}], 2: [{'n': 3}]}
+    requested = []
+
+    def fetch_json(url, headers=None, timeout=None):
+        requested.append(url)
+        return {'events': pages[int(url.split('offset=')[1].split('&')[0])]}
+
+    monkeypatch.setattr(traffic_apis, 'fetch_json', fetch_json)
+    feed = provider('X', 'https://feed.example/events', pagination=('offset', 'offset', 'limit', 2))
+    assert [event['n'] for event in traffic_apis.iter_events(feed, 'k')] == [1, 2, 3]
+    assert len(requested) == 2 and all('key=k' in url for url in requested)
+
+def test_feeds_merge_into_one_alert_and_failures_are_reported(traffic_apis, monkeypatch):
+    responses = {
+        'https://a.example/events?key=ka': {'events': [
+            {'road': 'I-5 North', 'text': 'Crash near MP 12', 'severity': 'Major', 'updated': '2024-01-01T10:00:00Z'},
+            {'road': 'I-5 North', 'text': 'Pothole', 'severity': 'Minor'},
+        ]},
+        'https://b.example/events?key=kb': {'events': [
+            {'road': None, 'text': 'Collision on I-5 northbound at milepost 12.4', 'severity': 'Moderate',
+             'updated': '2024-01-01T10:05:00Z'},
+        ]},
+    }
+
+    def fetch_json(url, headers=None, timeout=None):
+        if url not in responses:
+            raise OSError('connection refused')
+        return responses[url]
+
+    monkeypatch.setattr(traffic_apis, 'fetch_json', fetch_json)
+    for key, value in (('A_KEY', 'ka'), ('B_KEY', 'kb'), ('C_KEY', 'kc')):
+        monkeypatch.setenv(key, value)
+    providers = {
+        'a': provider('A_KEY', 'https://a.example/events'),
+        'b': provider('B_KEY', 'https://b.example/events', fields={'road': None, 'description': 'text', 'severity': 'severity', 'updated': 'updated'}),
+        'c': provider('C_KEY', 'https://c.example/events'),
+        'unset': provider('UNSET_KEY', 'https://d.example/events'),
+    }
+    alerts, failed = traffic_apis.fetch_all_alerts(providers, top_k=5)
+    assert [(a['id'], a['severity'], a['updated'], a['sources']) for a in alerts] == [
+        ('CA:I-5:North:mp12', 'major', '2024-01-01T10:05:00Z', ['a', 'b'])
+    ]
+    assert list(failed) == ['c']
@@ -240,6 +240,16 @@ resource "aws_dynamodb_table" "raw_data" {
   hash_key     = "date"
   range_key    = "module"
 
+  # Feeds incremental re-aggregation of published briefs
+  stream_enabled   = true
+  stream_view_type = "NEW_IMAGE"
+
+  # Set by the compactor once a day's items are archived to S3
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
   attribute {
     name = "date"
     type = "S"
@@ -365,7 +375,10 @@ resource "aws_iam_role_policy" "lambda_ingestor" {
       {
         Effect = "Allow"
         Action = [
-          "dynamodb:PutItem"
+          "dynamodb:GetItem",
+          "dynamodb:PutItem",
+          "dynamodb:DeleteItem",
+          "dynamodb:Query"
         ]
         Resource = aws_dynamodb_table.raw_data.arn
       },
@@ -375,6 +388,13 @@ resource "aws_iam_role_policy" "lambda_ingestor" {
           "ssm:GetParameter"
         ]
         Resource = "arn:aws:ssm:${var.aws_region}:*:parameter/logistix/fred-api-key"
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "lambda:InvokeFunction"
+        ]
+        Resource = aws_lambda_function.aggregator.arn
       }
     ]
   })
@@ -395,13 +415,19 @@ resource "aws_iam_role_policy" "lambda_aggregator" {
           "logs:CreateLogStream",
           "logs:PutLogEvents"
         ]
-        Resource = "arn:aws:logs:${var.aws_region}:*:log-group:/aws/lambda/${var.project_name}-aggregator-*"
+        Resource = [
+          "arn:aws:logs:${var.aws_region}:*:log-group:/aws/lambda/${var.project_name}-aggregator-*",
+          "arn:aws:logs:${var.aws_region}:*:log-group:/aws/lambda/${var.project_name}-orchestrator-*"
+        ]
       },
       {
         Effect = "Allow"
         Action = [
           "dynamodb:GetItem",
-          "dynamodb:PutItem"
+          "dynamodb:PutItem",
+          "dynamodb:UpdateItem",
+          "dynamodb:BatchWriteItem",
+          "dynamodb:Query"
         ]
         Resource = [
           aws_dynamodb_table.raw_data.arn,
@@ -411,16 +437,38 @@ resource "aws_iam_role_policy" "lambda_aggregator" {
       {
         Effect = "Allow"
         Action = [
+          "dynamodb:DescribeStream",
+          "dynamodb:GetRecords",
+          "dynamodb:GetShardIterator",
+          "dynamodb:ListStreams"
+        ]
+        Resource = aws_dynamodb_table.raw_data.stream_arn
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "s3:GetObject",
           "s3:PutObject"
         ]
         Resource = "${aws_s3_bucket.data.arn}/*"
       },
+      {
+        # Lets a missing history partition read as NoSuchKey rather than AccessDenied
+        Effect = "Allow"
+        Action = [
+          "s3:ListBucket"
+        ]
+        Resource = aws_s3_bucket.data.arn
+      },
       {
         Effect = "Allow"
         Action = [
           "ssm:GetParameter"
         ]
-        Resource = "arn:aws:ssm:${var.aws_region}:*:parameter/logistix/openai-api-key"
+        Resource = [
+          "arn:aws:ssm:${var.aws_region}:*:parameter/logistix/openai-api-key",
+          "arn:aws:ssm:${var.aws_region}:*:parameter/logistix/fred-api-key"
+        ]
       }
     ]
   })
@@ -508,8 +556,9 @@ resource "aws_lambda_function" "ingestor_fuel" {
 
   environment {
     variables = {
-      RAW_DATA_TABLE = aws_dynamodb_table.raw_data.name
-      EIA_API_KEY    = var.eia_api_key
+      RAW_DATA_TABLE      = aws_dynamodb_table.raw_data.name
+      EIA_API_KEY         = var.eia_api_key
+      AGGREGATOR_FUNCTION = aws_lambda_function.aggregator.function_name
     }
   }
 }
@@ -526,7 +575,8 @@ resource "aws_lambda_function" "ingestor_freight" {
 
   environment {
     variables = {
-      RAW_DATA_TABLE = aws_dynamodb_table.raw_data.name
+      RAW_DATA_TABLE      = aws_dynamodb_table.raw_data.name
+      AGGREGATOR_FUNCTION = aws_lambda_function.aggregator.function_name
     }
   }
 }
@@ -542,8 +592,12 @@ resource "aws_lambda_function" "ingestor_traffic" {
 
   environment {
     variables = {
-      RAW_DATA_TABLE  = aws_dynamodb_table.raw_data.name
-      TRAFFIC_511_KEY = var.traffic_511_key
+      RAW_DATA_TABLE      = aws_dynamodb_table.raw_data.name
+      TRAFFIC_511_KEY     = var.traffic_511_key
+      AZ_511_KEY          = var.az_511_key
+      UTAH_511_KEY        = var.utah_511_key
+      NY_511_KEY          = var.ny_511_key
+      AGGREGATOR_FUNCTION = aws_lambda_function.aggregator.function_name
     }
   }
 }
@@ -559,7 +613,8 @@ resource "aws_lambda_function" "ingestor_weather" {
 
   environment {
     variables = {
-      RAW_DATA_TABLE = aws_dynamodb_table.raw_data.name
+      RAW_DATA_TABLE      = aws_dynamodb_table.raw_data.name
+      AGGREGATOR_FUNCTION = aws_lambda_function.aggregator.function_name
     }
   }
 }
@@ -571,6 +626,7 @@ resource "aws_lambda_function" "aggregator" {
   handler       = "index.handler"
   runtime       = "python3.11"
   timeout       = 300
+  layers        = [aws_lambda_layer_version.news_layer.arn]
   source_code_hash = filebase64sha256("aggregator.zip")
 
   environment {
@@ -582,6 +638,70 @@ resource "aws_lambda_function" "aggregator" {
   }
 }
 
+# Raw-table changes made after the brief is published (e.g. an intraday traffic
+# refresh) rebuild only the affected sections. The batching window debounces bursts.
+resource "aws_lambda_event_source_mapping" "raw_changes" {
+  event_source_arn                   = aws_dynamodb_table.raw_data.stream_arn
+  function_name                      = aws_lambda_function.aggregator.arn
+  starting_position                  = "LATEST"
+  batch_size                         = 100
+  maximum_batching_window_in_seconds = 60
+  maximum_retry_attempts             = 2
+
+  # Only latest-pointer writes of the brief's modules invoke the aggregator; state,
+  # run# markers, snapshots, the compactor's TTL updates and TTL deletes are filtered
+  # out before they reach it
+  filter_criteria {
+    filter {
+      pattern = jsonencode({
+        eventName = ["INSERT", "MODIFY"]
+        dynamodb = {
+          NewImage = {
+            expires_at = [{ exists = false }]
+          }
+          Keys = {
+            module = {
+              S = [
+                "fuel", "freight", "traffic", "weather", "border-wait-times",
+                "economic-data", "air-traffic", "ais-data", "global-events", "global-event-counts"
+              ]
+            }
+          }
+        }
+      })
+    }
+  }
+}
+
+resource "aws_lambda_function" "orchestrator" {
+  filename      = "orchestrator.zip"
+  function_name = "${var.project_name}-orchestrator-${var.environment}"
+  role          = aws_iam_role.lambda_aggregator.arn
+  handler       = "orchestrator/index.handler"
+  runtime       = "python3.11"
+  timeout       = 300
+  memory_size   = 512
+  layers        = [aws_lambda_layer_version.news_layer.arn]
+  source_code_hash = filebase64sha256("orchestrator.zip")
+
+  # Every ingestor runs in this process, so it needs each ingestor's settings (but not
+  # AGGREGATOR_FUNCTION: it aggregates in-process instead of through the barrier)
+  environment {
+    variables = {
+      RAW_DATA_TABLE          = aws_dynamodb_table.raw_data.name
+      BRIEFS_TABLE            = aws_dynamodb_table.daily_briefs.name
+      DATA_BUCKET             = aws_s3_bucket.data.id
+      EIA_API_KEY             = var.eia_api_key
+      FRED_API_KEY_PARAM_NAME = aws_ssm_parameter.fred_api_key.name
+      TRAFFIC_511_KEY         = var.traffic_511_key
+      AZ_511_KEY              = var.az_511_key
+      UTAH_511_KEY            = var.utah_511_key
+      NY_511_KEY              = var.ny_511_key
+      GDELT_EXPORT_WINDOWS    = "4"
+    }
+  }
+}
+
 resource "aws_lambda_function" "email_sender" {
   filename      = "placeholder.zip"
   function_name = "${var.project_name}-email-sender-${var.environment}"
@@ -589,6 +709,7 @@ resource "aws_lambda_function" "email_sender" {
   handler       = "index.handler"
   runtime       = "python3.11"
   timeout       = 300
+  layers        = [aws_lambda_layer_version.news_layer.arn]
 
   environment {
     variables = {
@@ -607,6 +728,14 @@ resource "aws_cloudwatch_event_rule" "ingestion" {
   schedule_expression = "cron(0 10 * * ? *)"
 }
 
+# Fallback for the completion barrier: aggregates whatever has arrived if the
+# ingestors have not all reported in by 5:30 AM ET
+resource "aws_cloudwatch_event_rule" "aggregation_deadline" {
+  name                = "${var.project_name}-aggregation-deadline-${var.environment}"
+  description         = "Aggregate with partial data at 5:30 AM ET"
+  schedule_expression = "cron(30 10 * * ? *)"
+}
+
 resource "aws_cloudwatch_event_rule" "email_delivery" {
   name                = "${var.project_name}-email-${var.environment}"
   description         = "Trigger email delivery at 6:00 AM ET"
@@ -614,34 +743,19 @@ resource "aws_cloudwatch_event_rule" "email_delivery" {
 }
 
 # EventBridge targets for ingestion
-resource "aws_cloudwatch_event_target" "fuel" {
-  rule      = aws_cloudwatch_event_rule.ingestion.name
-  target_id = "fuel"
-  arn       = aws_lambda_function.ingestor_fuel.arn
-}
-
-resource "aws_cloudwatch_event_target" "freight" {
-  rule      = aws_cloudwatch_event_rule.ingestion.name
-  target_id = "freight"
-  arn       = aws_lambda_function.ingestor_freight.arn
-}
-
-resource "aws_cloudwatch_event_target" "traffic" {
+# A single orchestrator runs every ingestor and then aggregates, so the brief never
+# races the ingestors. Individual ingestor functions remain for manual/intraday runs.
+resource "aws_cloudwatch_event_target" "orchestrator" {
   rule      = aws_cloudwatch_event_rule.ingestion.name
-  target_id = "traffic"
-  arn       = aws_lambda_function.ingestor_traffic.arn
+  target_id = "orchestrator"
+  arn       = aws_lambda_function.orchestrator.arn
 }
 
-resource "aws_cloudwatch_event_target" "weather" {
-  rule      = aws_cloudwatch_event_rule.ingestion.name
-  target_id = "weather"
-  arn       = aws_lambda_function.ingestor_weather.arn
-}
-
-resource "aws_cloudwatch_event_target" "aggregator" {
-  rule      = aws_cloudwatch_event_rule.ingestion.name
+resource "aws_cloudwatch_event_target" "aggregation_deadline" {
+  rule      = aws_cloudwatch_event_rule.aggregation_deadline.name
   target_id = "aggregator"
   arn       = aws_lambda_function.aggregator.arn
+  input     = jsonencode({ trigger = "deadline" })
 }
 
 resource "aws_cloudwatch_event_target" "email" {
@@ -651,44 +765,20 @@ resource "aws_cloudwatch_event_target" "email" {
 }
 
 # Lambda permissions for EventBridge
-resource "aws_lambda_permission" "fuel" {
+resource "aws_lambda_permission" "orchestrator" {
   statement_id  = "AllowEventBridge"
   action        = "lambda:InvokeFunction"
-  function_name = aws_lambda_function.ingestor_fuel.function_name
+  function_name = aws_lambda_function.orchestrator.function_name
   principal     = "events.amazonaws.com"
   source_arn    = aws_cloudwatch_event_rule.ingestion.arn
 }
 
-resource "aws_lambda_permission" "freight" {
-  statement_id  = "AllowEventBridge"
-  action        = "lambda:InvokeFunction"
-  function_name = aws_lambda_function.ingestor_freight.function_name
-  principal     = "events.amazonaws.com"
-  source_arn    = aws_cloudwatch_event_rule.ingestion.arn
-}
-
-resource "aws_lambda_permission" "traffic" {
-  statement_id  = "AllowEventBridge"
-  action        = "lambda:InvokeFunction"
-  function_name = aws_lambda_function.ingestor_traffic.function_name
-  principal     = "events.amazonaws.com"
-  source_arn    = aws_cloudwatch_event_rule.ingestion.arn
-}
-
-resource "aws_lambda_permission" "weather" {
-  statement_id  = "AllowEventBridge"
-  action        = "lambda:InvokeFunction"
-  function_name = aws_lambda_function.ingestor_weather.function_name
-  principal     = "events.amazonaws.com"
-  source_arn    = aws_cloudwatch_event_rule.ingestion.arn
-}
-
-resource "aws_lambda_permission" "aggregator" {
+resource "aws_lambda_permission" "aggregation_deadline" {
   statement_id  = "AllowEventBridge"
   action        = "lambda:InvokeFunction"
   function_name = aws_lambda_function.aggregator.function_name
   principal     = "events.amazonaws.com"
-  source_arn    = aws_cloudwatch_event_rule.ingestion.arn
+  source_arn    = aws_cloudwatch_event_rule.aggregation_deadline.arn
 }
 
 resource "aws_lambda_permission" "email" {
@@ -708,10 +798,12 @@ resource "aws_lambda_function" "ingestor_border_wait_times" {
   handler       = "index.handler"
   runtime       = "python3.11"
   timeout       = 60
+  layers        = [aws_lambda_layer_version.news_layer.arn]
 
   environment {
     variables = {
-      RAW_DATA_TABLE = aws_dynamodb_table.raw_data.name
+      RAW_DATA_TABLE      = aws_dynamodb_table.raw_data.name
+      AGGREGATOR_FUNCTION = aws_lambda_function.aggregator.function_name
     }
   }
 }
@@ -723,11 +815,13 @@ resource "aws_lambda_function" "ingestor_economic_data" {
   handler       = "index.handler"
   runtime       = "python3.11"
   timeout       = 60
+  layers        = [aws_lambda_layer_version.news_layer.arn]
 
   environment {
     variables = {
       RAW_DATA_TABLE          = aws_dynamodb_table.raw_data.name
       FRED_API_KEY_PARAM_NAME = aws_ssm_parameter.fred_api_key.name
+      AGGREGATOR_FUNCTION     = aws_lambda_function.aggregator.function_name
     }
   }
 }
@@ -739,10 +833,12 @@ resource "aws_lambda_function" "ingestor_air_traffic" {
   handler       = "index.handler"
   runtime       = "python3.11"
   timeout       = 60
+  layers        = [aws_lambda_layer_version.news_layer.arn]
 
   environment {
     variables = {
-      RAW_DATA_TABLE = aws_dynamodb_table.raw_data.name
+      RAW_DATA_TABLE      = aws_dynamodb_table.raw_data.name
+      AGGREGATOR_FUNCTION = aws_lambda_function.aggregator.function_name
     }
   }
 }
@@ -754,10 +850,12 @@ resource "aws_lambda_function" "ingestor_ais_data" {
   handler       = "index.handler"
   runtime       = "python3.11"
   timeout       = 120 # Increased timeout for potential file download/processing
+  layers        = [aws_lambda_layer_version.news_layer.arn]
 
   environment {
     variables = {
-      RAW_DATA_TABLE = aws_dynamodb_table.raw_data.name
+      RAW_DATA_TABLE      = aws_dynamodb_table.raw_data.name
+      AGGREGATOR_FUNCTION = aws_lambda_function.aggregator.function_name
     }
   }
 }
@@ -769,84 +867,13 @@ resource "aws_lambda_function" "ingestor_global_events" {
   handler       = "index.handler"
   runtime       = "python3.11"
   timeout       = 300 # Increased timeout for large file download/processing
+  layers        = [aws_lambda_layer_version.news_layer.arn]
 
   environment {
     variables = {
-      RAW_DATA_TABLE = aws_dynamodb_table.raw_data.name
+      RAW_DATA_TABLE       = aws_dynamodb_table.raw_data.name
+      AGGREGATOR_FUNCTION  = aws_lambda_function.aggregator.function_name
+      GDELT_EXPORT_WINDOWS = "4"
     }
   }
 }
-
-# New EventBridge targets for ingestion
-
-resource "aws_cloudwatch_event_target" "border_wait_times" {
-  rule      = aws_cloudwatch_event_rule.ingestion.name
-  target_id = "border_wait_times"
-  arn       = aws_lambda_function.ingestor_border_wait_times.arn
-}
-
-resource "aws_cloudwatch_event_target" "economic_data" {
-  rule      = aws_cloudwatch_event_rule.ingestion.name
-  target_id = "economic_data"
-  arn       = aws_lambda_function.ingestor_economic_data.arn
-}
-
-resource "aws_cloudwatch_event_target" "air_traffic" {
-  rule      = aws_cloudwatch_event_rule.ingestion.name
-  target_id = "air_traffic"
-  arn       = aws_lambda_function.ingestor_air_traffic.arn
-}
-
-resource "aws_cloudwatch_event_target" "ais_data" {
-  rule      = aws_cloudwatch_event_rule.ingestion.name
-  target_id = "ais_data"
-  arn       = aws_lambda_function.ingestor_ais_data.arn
-}
-
-resource "aws_cloudwatch_event_target" "global_events" {
-  rule      = aws_cloudwatch_event_rule.ingestion.name
-  target_id = "global_events"
-  arn       = aws_lambda_function.ingestor_global_events.arn
-}
-
-# New Lambda permissions for EventBridge
-
-resource "aws_lambda_permission" "border_wait_times" {
-  statement_id  = "AllowEventBridge"
-  action        = "lambda:InvokeFunction"
-  function_name = aws_lambda_function.ingestor_border_wait_times.function_name
-  principal     = "events.amazonaws.com"
-  source_arn    = aws_cloudwatch_event_rule.ingestion.arn
-}
-
-resource "aws_lambda_permission" "economic_data" {
-  statement_id  = "AllowEventBridge"
-  action        = "lambda:InvokeFunction"
-  function_name = aws_lambda_function.ingestor_economic_data.function_name
-  principal     = "events.amazonaws.com"
-  source_arn    = aws_cloudwatch_event_rule.ingestion.arn
-}
-
-resource "aws_lambda_permission" "air_traffic" {
-  statement_id  = "AllowEventBridge"
-  action        = "lambda:InvokeFunction"
-  function_name = aws_lambda_function.ingestor_air_traffic.function_name
-  principal     = "events.amazonaws.com"
-  source_arn    = aws_cloudwatch_event_rule.ingestion.arn
-}
-
-resource "aws_lambda_permission" "ais_data" {
-  statement_id  = "AllowEventBridge"
-  action        = "lambda:InvokeFunction"
-  function_name = aws_lambda_function.ingestor_ais_data.function_name
-  principal     = "events.amazonaws.com"
-  source_arn    = aws_cloudwatch_event_rule.ingestion.arn
-}
-
-resource "aws_lambda_permission" "global_events" {
-  statement_id  = "AllowEventBridge"
-  action        = "lambda:InvokeFunction"
-  function_name = aws_lambda_function.ingestor_global_events.function_name
-  principal     = "events.amazonaws.com"
-  source_arn    = aws_cloudwatch_event_rule.ingestion.arn
-}
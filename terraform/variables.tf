@@ -41,6 +41,27 @@ variable "traffic_511_key" {
   default     = ""
 }
 
+variable "az_511_key" {
+  description = "AZ 511 API key for traffic data"
+  type        = string
+  sensitive   = true
+  default     = ""
+}
+
+variable "utah_511_key" {
+  description = "UDOT Traffic API key for traffic data"
+  type        = string
+  sensitive   = true
+  default     = ""
+}
+
+variable "ny_511_key" {
+  description = "511NY API key for traffic data"
+  type        = string
+  sensitive   = true
+  default     = ""
+}
+
 variable "fred_api_key" {
   description = "FRED API key for economic data"
   type        = string
@@ -768,7 +768,7 @@ function renderBorderWaitTimes(data) {
         html += `
             <div class="metric">
                 <span class="metric-label">${crossing.name}</span>
-                <span class="metric-value">${crossing.commercial_wait}min <span style="color:${statusColor};">${crossing.status}</span></span>
+                <span class="metric-value">${crossing.commercial_wait === null || crossing.commercial_wait === undefined ? '--' : crossing.commercial_wait + 'min'} <span style="color:${statusColor};">${crossing.status}</span></span>
             </div>
         `;
     });